@@ -0,0 +1,125 @@
+import os
+import glob
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from SentimentModel import build_features
+from WebscrapingFunc import load_ignored_headlines
+
+#############################
+# ACTIVE LEARNING FUNCTIONS
+#############################
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scraped headline files making up the unlabelled corpus
+SCRAPED_HEADLINES_DIR = os.path.join(BASE_DIR, "Scraped Headlines")
+
+# Headline corpus SentimentAnalysisV2 trains on, read from the folder the training script is run in
+TRAINING_DATASET = os.path.join(BASE_DIR, "Model Training", "Code", "DatasetTesting.xlsx")
+TRAINING_SHEET = "Dataset"
+
+# Every label given through the queue is logged with the model's view of the headline at the time
+# SentimentAnalysisV2 adds these labels on top of the training corpus (its ACTIVE_LABELS)
+LABEL_LOG = os.path.join(BASE_DIR, "Model Training", "TrainingTestingDatasets", "Active Labels.csv")
+
+# Headlines are featurised and scored in batches so memory stays flat for large corpora
+SCORING_BATCH_SIZE = 5000
+
+# Normalise headline text so the same headline from two files is only counted once
+def normalise_headline(text):
+    return " ".join(str(text).lower().split())
+
+# Load every scraped headline file into one de-duplicated corpus
+def load_headline_corpus(folder=SCRAPED_HEADLINES_DIR, exclude_labelled=True):
+    frames = []
+
+    # Scraped files are CSVs, some saved without an extension
+    for file_path in glob.glob(os.path.join(folder, "*")):
+        if os.path.isdir(file_path) or os.path.splitext(file_path)[1] not in ("", ".csv"):
+            continue
+        try:
+            df = pd.read_csv(file_path, encoding="utf-8", on_bad_lines="skip")
+        except (UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError):
+            continue
+
+        # Files use either "headline" or "Headline" as the column name
+        headline_column = next((column for column in df.columns if column.lower() == "headline"), None)
+        if headline_column is None:
+            continue
+
+        frames.append(pd.DataFrame({
+            "Headline": df[headline_column].dropna().astype(str),
+            "Source File": os.path.basename(file_path),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["Headline", "Source File"])
+
+    corpus = pd.concat(frames, ignore_index=True)
+    corpus["Normalised"] = corpus["Headline"].map(normalise_headline)
+    corpus = corpus.drop_duplicates("Normalised")
+
+    # Irrelevant headlines flagged in the dashboard are never worth labelling
+    ignored = {normalise_headline(headline) for headline in load_ignored_headlines()}
+    corpus = corpus[~corpus["Normalised"].isin(ignored)]
+
+    # Skip anything already in the training corpus or labelled through the queue
+    if exclude_labelled:
+        labelled = set()
+        if os.path.exists(TRAINING_DATASET):
+            labelled.update(pd.read_excel(TRAINING_DATASET, sheet_name=TRAINING_SHEET)["Statement"].map(normalise_headline))
+        if os.path.exists(LABEL_LOG):
+            labelled.update(pd.read_csv(LABEL_LOG)["Headline"].map(normalise_headline))
+        corpus = corpus[~corpus["Normalised"].isin(labelled)]
+
+    return corpus.drop(columns=["Normalised"]).reset_index(drop=True)
+
+# Score the whole corpus with the model and work out how uncertain it is about each headline
+def score_corpus(corpus_df, bundle, batch_size=SCORING_BATCH_SIZE):
+    headlines = corpus_df["Headline"].tolist()
+    classes = bundle["label_encoder"].classes_
+
+    if not headlines:
+        return corpus_df.assign(Predicted=[], Margin=[], Entropy=[])
+
+    # Batches are featurised and passed to predict_proba in one call each
+    probs = np.vstack([
+        bundle["model"].predict_proba(build_features(headlines[start:start + batch_size], bundle))
+        for start in range(0, len(headlines), batch_size)
+    ])
+
+    # Margin between the two most likely classes, small margins mean the model is torn
+    sorted_probs = np.sort(probs, axis=1)
+    margin = sorted_probs[:, -1] - sorted_probs[:, -2]
+
+    # Entropy over all three classes, high entropy means the model is unsure across the board
+    entropy = -(probs * np.log(np.clip(probs, 1e-12, 1.0))).sum(axis=1)
+
+    scored = corpus_df.copy()
+    for i, label in enumerate(classes):
+        scored[f"P({label})"] = probs[:, i]
+    scored["Predicted"] = classes[np.argmax(probs, axis=1)]
+    scored["Margin"] = margin
+    scored["Entropy"] = entropy
+
+    return scored
+
+# Order the scored corpus so the most informative headlines to label come first
+def rank_by_uncertainty(scored_df, strategy="margin"):
+    if strategy == "entropy":
+        return scored_df.sort_values("Entropy", ascending=False).reset_index(drop=True)
+    return scored_df.sort_values("Margin", ascending=True).reset_index(drop=True)
+
+# Append newly labelled headlines to the label log, the next training run adds them to the corpus
+# labelled_rows is a list of dictionaries with "Headline" and "Label" plus optional model scores
+def append_labels(labelled_rows, log_file=LABEL_LOG):
+    if not labelled_rows:
+        return 0
+
+    # The CSV log keeps when each label was given and how unsure the model was
+    log_rows = pd.DataFrame(labelled_rows)
+    log_rows["Labelled At"] = datetime.now().isoformat(timespec="seconds")
+    log_rows.to_csv(log_file, mode="a", header=not os.path.exists(log_file), index=False)
+
+    return len(log_rows)
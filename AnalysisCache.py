@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import threading
+import pandas as pd
+from StatsCube import source_signature
+from TournamentIndex import resolve_tournament_key
+from SharedCache import ANALYSES
+
+#############################
+# ANALYSIS RESULTS CACHE
+#############################
+
+# Completed dashboard analyses are saved to disk so returning to a (player, tournament, year)
+# renders straight from the saved results instead of repeating the scrape, sentiment and stats steps
+# Entries are keyed by the analysis parameters, the sentiment model version and the match data version,
+# so a new model or new match data never serves an old analysis
+ANALYSIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scraped Headlines", "analyses")
+ANALYSIS_INDEX = os.path.join(ANALYSIS_DIR, "index.json")
+
+# Saved analyses older than this are treated as missing, headlines keep arriving after a tournament
+DEFAULT_TTL_HOURS = 24 * 7
+
+# Index and entry files are read and written by one session at a time
+# Entries already read are kept in the bounded ANALYSES shared cache, tied to the time they were saved
+_analyses_lock = threading.Lock()
+
+def entry_path(key):
+    return os.path.join(ANALYSIS_DIR, f"{key}.pkl")
+
+def read_index():
+    if not os.path.exists(ANALYSIS_INDEX):
+        return {}
+    with open(ANALYSIS_INDEX, encoding="utf-8") as file:
+        return json.load(file)
+
+def write_index(index):
+    tmp_path = ANALYSIS_INDEX + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(index, file, indent=1)
+    os.replace(tmp_path, ANALYSIS_INDEX)
+
+# Hash of the ignored headlines, ignoring a headline changes which headlines an analysis scores
+def ignored_version(ignored_headlines):
+    return hashlib.sha1("\n".join(sorted(ignored_headlines)).encode("utf-8")).hexdigest()[:16]
+
+def analysis_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+# Parameters of one analysis, the headline filters applied before scoring, the versions it was computed with,
+# and its cache key
+def analysis_params(player_name, tournament, year, max_pages, source, model_version, mentions_only=False,
+                    collapse_clusters=True, ignored_headlines=()):
+    params = {
+        "player_name": player_name,
+        "tournament_key": resolve_tournament_key(tournament),
+        "tournament": tournament,
+        "year": int(year),
+        "max_pages": int(max_pages),
+        "source": source,
+        "mentions_only": bool(mentions_only),
+        "collapse_clusters": bool(collapse_clusters),
+        "ignored_version": ignored_version(ignored_headlines),
+        "model_version": None if model_version is None else str(model_version),
+        "data_version": [list(entry) for entry in source_signature()],
+    }
+    return analysis_key(params), params
+
+# Same analysis after more headlines have been ignored, so it is saved under a key matching its headlines
+def with_ignored(params, ignored_headlines):
+    params = {**params, "ignored_version": ignored_version(ignored_headlines)}
+    return analysis_key(params), params
+
+def is_expired(saved_at, ttl_hours):
+    return ttl_hours is not None and time.time() - saved_at > ttl_hours * 3600
+
+# Saved analysis for a key, None if there isn't one or it has expired
+# An analysis is a dict with scraped_headlines, sentiment_results, player_stats and bias (results per baseline scope)
+def load_analysis(key, ttl_hours=DEFAULT_TTL_HOURS):
+    with _analyses_lock:
+        record = read_index().get(key)
+        if record is None or is_expired(record["saved_at"], ttl_hours) or not os.path.exists(entry_path(key)):
+            ANALYSES.invalidate((key,))
+            return None
+
+        def read_entry():
+            with open(entry_path(key), "rb") as file:
+                return pickle.load(file)
+        return ANALYSES.get((key,), record["saved_at"], read_entry)
+
+# Save an analysis, saving again under the same key replaces it as later steps complete
+def save_analysis(key, params, analysis):
+    with _analyses_lock:
+        os.makedirs(ANALYSIS_DIR, exist_ok=True)
+        tmp_path = entry_path(key) + ".tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(analysis, file)
+        os.replace(tmp_path, entry_path(key))
+
+        saved_at = time.time()
+        index = read_index()
+        index[key] = {**params, "saved_at": saved_at}
+        write_index(index)
+        ANALYSES.get((key,), saved_at, lambda: analysis)
+
+# Delete every analysis older than the expiry, returns how many were removed
+def purge_expired(ttl_hours=DEFAULT_TTL_HOURS):
+    with _analyses_lock:
+        index = read_index()
+        expired = [key for key, record in index.items() if is_expired(record["saved_at"], ttl_hours)]
+        for key in expired:
+            index.pop(key)
+            ANALYSES.invalidate((key,))
+            if os.path.exists(entry_path(key)):
+                os.remove(entry_path(key))
+        if expired:
+            write_index(index)
+    return len(expired)
+
+# One row per saved analysis and baseline scope, with its parameters, headline counts,
+# tournament stats and bias results flattened into columns for reporting
+def analyses_table(ttl_hours=None):
+    rows = []
+    for key, record in read_index().items():
+        analysis = load_analysis(key, ttl_hours)
+        if analysis is None:
+            continue
+        base = {
+            "analysis_key": key,
+            **{name: value for name, value in record.items() if name != "data_version"},
+            **{sentiment: len(headlines) for sentiment, headlines in (analysis.get("sentiment_results") or {}).items()},
+        }
+        tournament_stats = (analysis.get("player_stats") or {}).get("tournament_stats") or {}
+        base.update({name: value for name, value in tournament_stats.items() if pd.api.types.is_scalar(value)})
+
+        bias = analysis.get("bias") or {}
+        if not bias:
+            rows.append(base)
+        for scope, results in bias.items():
+            uncertainty = results.get("uncertainty") or {}
+            rows.append({
+                **base,
+                "baseline_scope": scope,
+                "sentiment_score": results["sentiment_score"],
+                "performance_score": results["performance_score"],
+                "bias_score": results["bias_score"],
+                "bias_level": results["bias_level"],
+                "bias_ci_low": uncertainty.get("bias_ci", (None, None))[0],
+                "bias_ci_high": uncertainty.get("bias_ci", (None, None))[1],
+                "significant": uncertainty.get("significant"),
+            })
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table["saved_at"] = pd.to_datetime(table["saved_at"], unit="s")
+    return table
+
+def export_analyses(path, ttl_hours=None):
+    table = analyses_table(ttl_hours)
+    table.to_parquet(path, index=False)
+    return len(table)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage saved dashboard analyses")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="Show saved analyses")
+
+    export_parser = commands.add_parser("export", help="Write every saved analysis to a Parquet file")
+    export_parser.add_argument("path")
+
+    purge_parser = commands.add_parser("purge", help="Delete expired analyses")
+    purge_parser.add_argument("--ttl", type=float, default=DEFAULT_TTL_HOURS, help="Expiry in hours")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        for key, record in read_index().items():
+            print(f"{key}: {record['player_name']} at {record['tournament']} {record['year']} (model {record['model_version']})")
+    elif args.command == "export":
+        print(f"Exported {export_analyses(args.path)} rows to {args.path}")
+    else:
+        print(f"Removed {purge_expired(args.ttl)} expired analyses")
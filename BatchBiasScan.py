@@ -0,0 +1,110 @@
+import argparse
+import numpy as np
+import pandas as pd
+from BiasDetection import performance_scores, sentiment_scores, bias_levels
+from DrawSimulator import round_distribution, ROUND_NAMES
+from EloRatings import get_elo, SNAPSHOTS_FILE
+from StatsCube import get_cube
+from TournamentIndex import grand_slam_tournaments
+from HeadlineStore import sentiment_history
+
+#############################
+# BATCH BIAS SCAN
+#############################
+
+# Latest sentiment for every stored headline of every analysis, one row per story
+# Rewordings of the same story in one analysis are clustered in the headline store and counted once
+def load_sentiment_history():
+    history = sentiment_history(collapse_clusters=True)
+    history = history.dropna(subset=["tournament_key"])
+    history["tournament_key"] = history["tournament_key"].astype(int)
+    return history
+
+# Headline counts and sentiment score per (player_name, tournament_key, year)
+def sentiment_table(history):
+    counts = pd.crosstab(
+        [history["player_name"], history["tournament_key"], history["year"]], history["Sentiment"]
+    ).reindex(columns=["Positive", "Neutral", "Negative"], fill_value=0)
+    counts["Headlines"] = counts.sum(axis=1)
+    counts["sentiment_score"] = sentiment_scores(counts["Positive"], counts["Negative"])
+    return counts.reset_index()
+
+def grand_slam_names():
+    return {record["tournament_key"]: record["name"] for record in grand_slam_tournaments()}
+
+# Round percentiles for every player in the scanned tournaments, one simulation per tournament
+def round_percentiles(keys):
+    frames = []
+    for tournament_key, year in keys.itertuples(index=False):
+        name = grand_slam_names().get(tournament_key)
+        distribution = round_distribution(name, year) if name else None
+        if distribution is None:
+            continue
+        probabilities = distribution[ROUND_NAMES].to_numpy()
+        # Percentile of ending in each round, with half the weight of the round itself
+        percentiles = np.cumsum(probabilities, axis=1) - probabilities / 2
+        frame = pd.DataFrame(percentiles, columns=ROUND_NAMES, index=distribution.index).reset_index()
+        frame = frame.melt(id_vars="player_name", var_name="Round Reached", value_name="Round Percentile")
+        frame["tournament_key"] = tournament_key
+        frame["year"] = year
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["player_name", "Round Reached", "Round Percentile", "tournament_key", "year"])
+    return pd.concat(frames, ignore_index=True)
+
+# Bias for every (player, Grand Slam, year) that has both stats in the cube and scored headlines
+# Every score is computed as a column operation over the joined table
+# Returns one row per analysis, ordered from the most positively to the most negatively covered
+def scan_bias(history=None, simulate=True):
+    history = load_sentiment_history() if history is None else history
+    sentiment = sentiment_table(history)
+    slam_keys = list(grand_slam_names())
+    sentiment = sentiment[sentiment["tournament_key"].isin(slam_keys)]
+
+    cube = get_cube()
+    keys = ["player_name", "tournament_key", "year"]
+    scan = sentiment.merge(cube["player_tournament"].reset_index(), on=keys, how="inner")
+    scan = scan.merge(cube["tour_averages"].reset_index(), on=["tournament_key", "year"], how="inner")
+
+    # Pre-tournament Elo rank sets expectations for unseeded players
+    get_elo()
+    elo = pd.read_parquet(SNAPSHOTS_FILE, columns=keys + ["elo_rank"]).rename(columns={"elo_rank": "Elo Rank"})
+    elo["tournament_key"] = elo["tournament_key"].astype(int)
+    scan = scan.merge(elo, on=keys, how="left")
+
+    if simulate and not scan.empty:
+        percentiles = round_percentiles(scan[["tournament_key", "year"]].drop_duplicates())
+        scan = scan.merge(percentiles, on=keys + ["Round Reached"], how="left")
+
+    scan["performance_score"] = performance_scores(scan)
+    scan["bias_score"] = scan["sentiment_score"] - scan["performance_score"]
+    scan["bias_level"] = bias_levels(scan["bias_score"])
+    scan["tournament"] = scan["tournament_key"].map(grand_slam_names())
+
+    columns = [
+        "player_name", "tournament", "year", "Headlines", "Positive", "Neutral", "Negative",
+        "Round Reached", "sentiment_score", "performance_score", "bias_score", "bias_level",
+    ]
+    return scan.sort_values("bias_score", ascending=False)[columns].reset_index(drop=True)
+
+# Most positively and most negatively covered analyses
+def ranked_coverage(scan, top=10):
+    return scan.head(top), scan.tail(top).iloc[::-1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score media bias for every player, Grand Slam and year with stored headlines")
+    parser.add_argument("--top", type=int, default=10, help="Players to show at each end of the ranking")
+    parser.add_argument("--output", help="Write the full scan to this CSV")
+    parser.add_argument("--no-simulation", action="store_true", help="Score round reached from seeds instead of draw simulations")
+    args = parser.parse_args()
+
+    scan = scan_bias(simulate=not args.no_simulation)
+    most_positive, most_negative = ranked_coverage(scan, args.top)
+    print(f"Scanned {len(scan)} player x tournament x year analyses")
+    print("\nMost positively covered:")
+    print(most_positive.to_string(index=False))
+    print("\nMost negatively covered:")
+    print(most_negative.to_string(index=False))
+
+    if args.output:
+        scan.to_csv(args.output, index=False)
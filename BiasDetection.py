@@ -1,12 +1,123 @@
 import math
-import pandas as pd
-import streamlit as st
+import logging
+import warnings
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 #############################
 # BIAS DETECTION #
 #############################
 
-def bias_detection(tournament_stats, tour_averages, sentiment_results):
+# Bias magnitude below the first threshold is Low, below the second Moderate, otherwise High
+BIAS_THRESHOLDS = (0.3, 0.7)
+
+ROUND_VALUES = {
+    "R128": 1, "R64": 2, "R32": 3, "R16": 4,
+    "QF": 5, "SF": 6, "F": 7, "W": 8
+}
+
+# Same scoring as bias_detection as whole column operations, one row per player x tournament
+# stats needs the tournament stats columns (Tournament Aces, Seed, Round Reached, ...) and the tour averages
+# (aces, double_faults, break_points_saved_pct) side by side, Elo Rank and Round Percentile are used when present
+def performance_scores(stats):
+    points = (
+        np.where(stats["Tournament Aces"] > stats["aces"], 1, -1)
+        + np.where(stats["Tournament Double Faults"] < stats["double_faults"], 1, -1)
+        + np.where(stats["Break Points Saved Percentage"] > stats["break_points_saved_pct"], 1, -1)
+    ).astype(float)
+
+    # Expected round from the seed, or the Elo rank within the draw for unseeded players, otherwise R64
+    seed = stats["Seed"].fillna(0).to_numpy(dtype=float)
+    elo_rank = stats["Elo Rank"].to_numpy(dtype=float) if "Elo Rank" in stats else np.full(len(stats), np.nan)
+    basis = np.where(seed > 0, seed, elo_rank)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected_round = np.where(np.isnan(basis), 2, np.maximum(1, 8 - np.floor(np.log2(basis))))
+    round_reached = stats["Round Reached"].map(ROUND_VALUES).fillna(0).to_numpy(dtype=float)
+    seed_points = np.where(round_reached >= expected_round, 1, -1)
+
+    # Simulated draw percentile replaces the seed rule wherever it is available
+    if "Round Percentile" in stats:
+        percentile = stats["Round Percentile"].to_numpy(dtype=float)
+        percentile_points = np.select([percentile > 0.6, percentile >= 0.4], [1, 0.5], -1)
+        points += np.where(np.isnan(percentile), seed_points, percentile_points)
+    else:
+        points += seed_points
+
+    # 4 metrics to rank players off
+    return points / 4
+
+# (pos - neg) / (pos + neg) for whole columns of counts, 0 where there are no positive or negative headlines
+def sentiment_scores(positive_counts, negative_counts):
+    positive_counts = np.asarray(positive_counts, dtype=float)
+    negative_counts = np.asarray(negative_counts, dtype=float)
+    total = positive_counts + negative_counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (positive_counts - negative_counts) / total, 0.0)
+
+# Bootstrap resamples behind the confidence intervals, all drawn at once as one matrix
+BOOTSTRAP_RESAMPLES = 5000
+CONFIDENCE_LEVEL = 0.95
+
+# Column order of the per-headline probabilities passed to bootstrap_bias
+SENTIMENT_CLASSES = ["Positive", "Neutral", "Negative"]
+
+# Confidence intervals for the sentiment, performance and bias scores
+# headline_probabilities is one row per headline of classifier probabilities in SENTIMENT_CLASSES order,
+# each resample redraws the headlines with replacement and then each drawn headline's label from its probabilities
+# so uncertain classifications widen the interval. match_stats has one row per match (aces, dfs, bpSaved, bpFaced)
+# and is resampled the same way, round_points is the fixed round reached score
+# Without match_stats the performance score is held at its point estimate
+def bootstrap_bias(headline_probabilities, tour_averages, round_points, performance_score, match_stats=None,
+                   resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE_LEVEL, seed=None):
+    rng = np.random.default_rng(seed)
+
+    probabilities = np.asarray(headline_probabilities, dtype=float)
+    headlines = len(probabilities)
+    picks = rng.integers(0, headlines, (resamples, headlines))
+    cumulative = np.cumsum(probabilities, axis=1)[picks]
+    draws = rng.random((resamples, headlines, 1))
+    # 0 is Positive, 1 Neutral and 2 Negative
+    labels = (draws > cumulative[..., :2]).sum(axis=2)
+    sentiment = sentiment_scores((labels == 0).sum(axis=1), (labels == 2).sum(axis=1))
+
+    if match_stats is not None and len(match_stats) > 0:
+        stats = match_stats[["aces", "dfs", "bpSaved", "bpFaced"]].to_numpy(dtype=float)
+        match_picks = rng.integers(0, len(stats), (resamples, len(stats)))
+        # Resamples with no recorded stats average to NaN, which scores -1 like the point estimate
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            aces, dfs, bp_saved, bp_faced = np.nanmean(stats[match_picks], axis=1).T
+            bp_saved_pct = bp_saved / bp_faced * 100
+        points = (
+            np.where(aces > tour_averages["aces"], 1, -1)
+            + np.where(dfs < tour_averages["double_faults"], 1, -1)
+            + np.where(bp_saved_pct > tour_averages["break_points_saved_pct"], 1, -1)
+            + round_points
+        )
+        performance = points / 4
+    else:
+        performance = np.full(resamples, performance_score)
+
+    bias = sentiment - performance
+    bounds = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    bias_ci = np.percentile(bias, bounds)
+    return {
+        "sentiment_ci": tuple(np.percentile(sentiment, bounds)),
+        "performance_ci": tuple(np.percentile(performance, bounds)),
+        "bias_ci": tuple(bias_ci),
+        # Significant when the whole interval is on one side of zero
+        "significant": bool(bias_ci[0] > 0 or bias_ci[1] < 0),
+        "confidence": confidence,
+        "resamples": resamples,
+    }
+
+def bias_levels(bias_scores):
+    magnitude = np.abs(np.asarray(bias_scores, dtype=float))
+    return np.select([magnitude < BIAS_THRESHOLDS[0], magnitude < BIAS_THRESHOLDS[1]], ["Low", "Moderate"], "High")
+
+# headline_probabilities and match_stats are optional, when given the result includes bootstrap confidence intervals
+def bias_detection(tournament_stats, tour_averages, sentiment_results, headline_probabilities=None, match_stats=None):
    
     # Step 1: Calculate performance score based on comparison with tour averages
     # Performance score also takes into account how far player progressed in tournament
@@ -24,7 +135,7 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
         performance_factors.append({"metric": "Aces", "value": player_aces, 
                                    "tour_avg": tour_averages["aces"], "score": -1})
         
-    print(f"Performance score after aces:{performance_points}")
+    logger.debug(f"Performance score after aces:{performance_points}")
     
     # Double faults comparison 
     player_dfs = tournament_stats.get("Tournament Double Faults", 0)
@@ -37,7 +148,7 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
         performance_factors.append({"metric": "Double Faults", "value": player_dfs, 
                                    "tour_avg": tour_averages["double_faults"], "score": -1})
     
-    print(f"Performance score after dfs:{performance_points}")
+    logger.debug(f"Performance score after dfs:{performance_points}")
     # Break points saved percentage
     player_bp_saved_pct = tournament_stats.get("Break Points Saved Percentage", 0)
     if player_bp_saved_pct > tour_averages["break_points_saved_pct"]:
@@ -49,62 +160,82 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
         performance_factors.append({"metric": "Break Points Saved %", "value": player_bp_saved_pct, 
                                    "tour_avg": tour_averages["break_points_saved_pct"], "score": -1})
     
-    print(f"Performance score after bp saved:{performance_points}")
+    logger.debug(f"Performance score after bp saved:{performance_points}")
     # Progression in tournament compared to seed
     player_seed = tournament_stats.get("Seed", None)
-    print("Debugging: Player seed is:", player_seed)
+    logger.debug(f"Player seed is: {player_seed}")
     tournament_round = tournament_stats.get("Round Reached", None)
 
+    round_percentile = tournament_stats.get("Round Percentile", None)
+
+    # When the draw has been simulated the round reached is scored against the player's simulated distribution
+    # Above 0.6 means they went further than most simulations, 0.4 to 0.6 is roughly as expected
+    if round_percentile is not None and tournament_round is not None:
+        expected_round_name = tournament_stats.get("Expected Round")
+        factor = {"metric": "Seed Performance", "value": f"Reached {tournament_round} ({round_percentile:.0%} percentile)",
+                  "tour_avg": f"Expected round {expected_round_name} from {tournament_stats.get('Simulations', 0):,} simulated draws"}
+        if round_percentile > 0.6:
+            performance_points += 1
+            performance_factors.append({**factor, "score": 1})
+        elif round_percentile >= 0.4:
+            performance_points += 0.5
+            performance_factors.append({**factor, "score": 0.5})
+        else:
+            performance_points -= 1
+            performance_factors.append({**factor, "score": -1})
+
     # Only evaluate if theres is both seed and round information
-    if player_seed is not None and tournament_round is not None:
+    elif player_seed is not None and tournament_round is not None:
         # Convert tournament round to a numeric value
-        print("DEBUGGING: converting tournament round to numbers")
-        round_values = {
-            "R128": 1, "R64": 2, "R32": 3, "R16": 4,
-            "QF": 5, "SF": 6, "F": 7, "W": 8
-        }
-        
-        round_numeric = round_values.get(tournament_round, 0)
+        round_numeric = ROUND_VALUES.get(tournament_round, 0)
         
         # Calculate expected round based on seed
         # log2(seed) gives roughly the round a player should reach
         # E.g., seed 2 should reach finals (round 7)
         # Log2(2) = 1 , expected round = 8-1 = 7
         # Therefore expected round is 7 or finals
+        # Unseeded players are ranked within the field by their pre-tournament Elo rating instead
+        # so a strong unseeded player isn't expected to lose as early as a qualifier
+        elo_rank = tournament_stats.get("Elo Rank", None)
         if player_seed > 0:
-            print("Debugging: Player seed is above 0")
+            logger.debug("Player seed is above 0")
             expected_round = max(1, 8 - math.floor(math.log2(player_seed)))
+            expectation_basis = f"Seed {player_seed}"
+        elif elo_rank is not None:
+            expected_round = max(1, 8 - math.floor(math.log2(elo_rank)))
+            expectation_basis = f"Unseeded, Elo rank {elo_rank} in draw"
         else:
             # Unseeded players (below 32 seed, qualifiers, wildcards)
             # Expected to reach R64
             # Could change to lose first round?
-            print("Debugging: Player is unseeded")
+            logger.debug("Player is unseeded")
             expected_round = 2  
+            expectation_basis = f"Seed {player_seed}"
         
         # Converting back to round name
         # Create reverse mapping pf round values to get the name from the round number
-        round_names = {value: key for key, value in round_values.items()}
+        round_names = {value: key for key, value in ROUND_VALUES.items()}
         expected_round_name = round_names.get(expected_round, str(expected_round))
         # Compare actual vs expected performance
         if round_numeric >= expected_round:
-            print("Debugging: Player exceeded their expected round")
+            logger.debug("Player exceeded their expected round")
             performance_points += 1
-            performance_factors.append({"metric": "Seed Performance", "value": f"Seed {player_seed} reached {tournament_round}", 
+            performance_factors.append({"metric": "Seed Performance", "value": f"{expectation_basis} reached {tournament_round}", 
                                 "tour_avg": f"Expected round {expected_round_name}", "score": 1})
         elif round_numeric == expected_round:
-            print("Debugging: Player reached their expected round")
+            logger.debug("Player reached their expected round")
             performance_points += 0.5
-            performance_factors.append({"metric": "Seed Performance", "value": f"Seed {player_seed} reached {tournament_round}", 
+            performance_factors.append({"metric": "Seed Performance", "value": f"{expectation_basis} reached {tournament_round}", 
                                 "tour_avg": f"Expected round {expected_round_name}", "score": 1})
         else:
-            print("Player did not reach their expected round")
+            logger.debug("Player did not reach their expected round")
             performance_points -= 1
-            performance_factors.append({"metric": "Seed Performance", "value": f"Seed {player_seed} reached {tournament_round}", 
+            performance_factors.append({"metric": "Seed Performance", "value": f"{expectation_basis} reached {tournament_round}", 
                                 "tour_avg": f"Expected round {expected_round_name}", "score": -1})
 
     # Normalise performance score between -1 and 1
     # 4 metrics to rank players off
-    print(f"Performance score: {performance_points}")
+    logger.debug(f"Performance score: {performance_points}")
     max_points = 4 
     normalised_performance_score = performance_points / max_points
     
@@ -123,10 +254,10 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
     bias_magnitude = abs(bias_score)
     
     # Determine bias level based on magnitude
-    if bias_magnitude < 0.3:
+    if bias_magnitude < BIAS_THRESHOLDS[0]:
         bias_level = "Low"
         bias_description = "Media sentiment generally aligns with player performance."
-    elif bias_magnitude < 0.7:
+    elif bias_magnitude < BIAS_THRESHOLDS[1]:
         bias_level = "Moderate"
         if bias_score > 0:
             bias_description = "Media sentiment is somewhat more positive than performance suggests."
@@ -159,7 +290,15 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
             "Sentiment": "Negative",
         })
     
+    # Step 4: Uncertainty in the bias score from resampling the headlines and matches
+    uncertainty = None
+    if headline_probabilities is not None and len(headline_probabilities) > 0:
+        round_points = sum(factor["score"] for factor in performance_factors if factor["metric"] == "Seed Performance")
+        uncertainty = bootstrap_bias(headline_probabilities, tour_averages, round_points,
+                                     normalised_performance_score, match_stats)
+
     return {
+        "uncertainty": uncertainty,
         "performance_score": normalised_performance_score,
         "performance_factors": performance_factors,
         "sentiment_score": sentiment_score,
@@ -168,190 +307,3 @@ def bias_detection(tournament_stats, tour_averages, sentiment_results):
         "bias_description": bias_description,
         "sentiment_details": sentiment_details
     }
-
-def display_bias_analysis(tournament_stats, tour_averages, sentiment_results, player_name, tournament, year):
-    
-    # Run bias detection algorithm
-    bias_results = bias_detection(tournament_stats, tour_averages, sentiment_results)
-    
-    # Create tabs for different sections of the analysis
-    bias_tabs = st.tabs(["How It Works", "Performance Score", "Sentiment Analysis", "Bias Assessment"])
-    
-    # Tab 1: How the Algorithm Works
-    with bias_tabs[0]:
-        st.markdown("### How the Bias Detection Algorithm Works")
-        st.markdown("""
-        The bias detection algorithm works by comparing player performance metrics with tour averages 
-        and then contrasting this with media sentiment. Here's how it's calculated:
-        
-        **Performance Scoring:**
-        - Player's aces > tour average: +1 point
-        - Player's aces < tour average: -1 point
-        - Player's double faults < tour average: +1 point
-        - Player's double faults > tour average: -1 point
-        - Player's break points saved % > tour average: +1 point
-        - Player's break points saved % < tour average: -1 point
-                    
-        The players seed going into the tournament along with the round they reached is also taken into account. 
-        For example if an unseeded player makes it into the final this is more impressive than if the 1st seed won the tournament.
-        If the performance:
-                    - Exceeds the expected round reached: +1 point
-                    - Matches the expected round reached: +0.5 points
-                    - Is worse than the expected round reached: -1 point
-                    
-        The total performance score is normalised to a scale from -1 (significantly below average) 
-        to +1 (significantly above average), with 0 representing average performance.
-        
-        **Sentiment Scoring:**
-        - Calculated as: (Positive headlines - Negative headlines) / Total headlines
-        - Ranges from -1 (all negative) to +1 (all positive)
-        
-        **Bias Assessment:**
-        - Bias score = Sentiment score - Performance score
-        - A large positive score indicates generic media is more positive than performance warrants
-        - A large negative score indicates generic media is more negative than performance warrants
-        - Scores near zero suggest generic media sentiment aligns with player performance
-        """)
-    
-    # Tab 2: Performance Score
-    with bias_tabs[1]:
-        st.markdown("### Player Performance Analysis")
-        
-        # Display normalised performance score
-        perf_score = bias_results["performance_score"]
-        perf_color = "green" if perf_score > 0 else "red" if perf_score < 0 else "gray"
-        st.markdown(f"#### Overall Performance Score: <span style='color:{perf_color}'>{perf_score:.2f}</span>", unsafe_allow_html=True)
-        
-        if perf_score > 0.3:
-            st.markdown(f"✅ {player_name}'s performance at {tournament} {year} was **above average** compared to tour standards.")
-        elif perf_score < -0.3:
-            st.markdown(f"❌ {player_name}'s performance at {tournament} {year} was **below average** compared to tour standards.")
-        else:
-            st.markdown(f"➖ {player_name}'s performance at {tournament} {year} was **about average** compared to tour standards.")
-        
-        # SEED COMPARISON to performance
-        # Add seed performance insight
-        for factor in bias_results["performance_factors"]:
-            if factor["metric"] == "Seed Performance":
-                if factor["score"] > 0:
-                    st.markdown(f"🔼 Based on their seed, {player_name} **progressed further** than expected in the tournament.")
-                else:
-                    st.markdown(f"🔽 Based on their seed, {player_name} **progressed less far** than expected in the tournament.")
-        
-        # Display performance factors in a table
-        st.markdown("#### Performance Metrics Breakdown")
-        performance_data = {
-            "Metric": [],
-            f"{player_name}": [],
-            "Tour Average": [],
-            "Score": []
-        }
-        
-        for factor in bias_results["performance_factors"]:
-            performance_data["Metric"].append(factor["metric"])
-           
-           # For the player's value
-           # Check if value is number/float befor applying float formatting
-            if isinstance(factor['value'], (int, float)):
-                performance_data[f"{player_name}"].append(f"{factor['value']:.1f}")
-            else:
-                performance_data[f"{player_name}"].append(f"{factor['value']}")
-
-            # For the tour average
-            if isinstance(factor['tour_avg'], (int, float)):
-                performance_data["Tour Average"].append(f"{factor['tour_avg']:.1f}")
-            else:
-                performance_data["Tour Average"].append(f"{factor['tour_avg']}")
-                        
-            score_text = "+1" if factor["score"] > 0 else "-1"
-            score_color = "green" if factor["score"] > 0 else "red"
-            performance_data["Score"].append(f"<span style='color:{score_color}'>{score_text}</span>")
-        
-        # Create a DataFrame for display
-        perf_df = pd.DataFrame(performance_data)
-        
-        # Display with HTML formatting for score column
-        st.write(perf_df.to_html(escape=False, index=False), unsafe_allow_html=True)
-    
-    # Tab 3: Sentiment Analysis
-    with bias_tabs[2]:
-        st.markdown("### Media Sentiment Analysis")
-        
-        # Display sentiment score
-        sentiment_score = bias_results["sentiment_score"]
-        sentiment_color = "green" if sentiment_score > 0 else "red" if sentiment_score < 0 else "gray"
-        st.markdown(f"#### Overall Sentiment Score: <span style='color:{sentiment_color}'>{sentiment_score:.2f}</span>", unsafe_allow_html=True)
-        
-        # Count positive and negative headlines
-        pos_count = len(sentiment_results["Positive"])
-        neg_count = len(sentiment_results["Negative"])
-        total_count = pos_count + neg_count
-        
-        if total_count > 0:
-            st.markdown(f"• Positive headlines: {pos_count} ({pos_count/total_count:.0%})")
-            st.markdown(f"• Negative headlines: {neg_count} ({neg_count/total_count:.0%})")
-            
-            # Display sentiment summary
-            if sentiment_score > 0.3:
-                st.markdown(f"✅ Media coverage of {player_name} at {tournament} {year} was **predominantly positive**.")
-            elif sentiment_score < -0.3:
-                st.markdown(f"❌ Media coverage of {player_name} at {tournament} {year} was **predominantly negative**.")
-            else:
-                st.markdown(f"➖ Media coverage of {player_name} at {tournament} {year} was **relatively balanced**.")
-        else:
-            st.warning("No positive or negative headlines found for sentiment analysis.")
-        
-        # Display headlines with sentiment and agreement with stats
-        if bias_results["sentiment_details"]:
-            st.markdown("#### Headlines Sentiment Details")
-            
-            sentiment_data = {
-                "Headline": [],
-                "Sentiment": [],
-            }
-            
-            for detail in bias_results["sentiment_details"]:
-                sentiment_data["Headline"].append(detail["Headline"])
-                
-                # Format sentiment with colors
-                sentiment_text = detail["Sentiment"]
-                sentiment_color = "green" if sentiment_text == "Positive" else "red"
-                sentiment_data["Sentiment"].append(f"<span style='color:{sentiment_color}'>{sentiment_text}</span>")
-                
-            # Create DataFrame for display
-            sentiment_df = pd.DataFrame(sentiment_data)
-            
-            # Display with HTML formatting
-            st.write(sentiment_df.to_html(escape=False, index=False), unsafe_allow_html=True)
-    
-    # Tab 4: Bias Assessment
-    with bias_tabs[3]:
-        st.markdown("### Media Bias Assessment")
-        
-        # Display bias score and level
-        bias_score = bias_results["bias_score"]
-        bias_level = bias_results["bias_level"]
-        bias_description = bias_results["bias_description"]
-        
-        # Determine color based on bias magnitude (not direction)
-        bias_magnitude = abs(bias_score)
-        bias_color = "green" if bias_magnitude < 0.3 else "orange" if bias_magnitude < 0.7 else "red"
-        
-        st.markdown(f"#### Bias Score: <span style='color:{bias_color}'>{bias_score:.2f}</span>", unsafe_allow_html=True)
-        st.markdown(f"#### Bias Level: <span style='color:{bias_color}'>{bias_level}</span>", unsafe_allow_html=True)
-        
-        # Display bias description
-        st.markdown(f"**Assessment**: {bias_description}")
-        
-        # Show interpretation
-        st.markdown("#### Interpretation")
-        if bias_score > 0.7:
-            st.markdown("⚠️ The media coverage appears to be **significantly more positive** than the player's performance metrics would suggest, indicating potential positive bias.")
-        elif bias_score < -0.7:
-            st.markdown("⚠️ The media coverage appears to be **significantly more negative** than the player's performance metrics would suggest, indicating potential negative bias.")
-        elif bias_score > 0.3:
-            st.markdown("ℹ️ The media coverage is **somewhat more positive** than the player's performance metrics would suggest.")
-        elif bias_score < -0.3:
-            st.markdown("ℹ️ The media coverage is **somewhat more negative** than the player's performance metrics would suggest.")
-        else:
-            st.markdown("✅ The media coverage appears to be **fairly balanced** and aligns well with the player's actual performance.")
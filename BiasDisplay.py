@@ -0,0 +1,216 @@
+import pandas as pd
+import streamlit as st
+from BiasDetection import bias_detection
+
+#############################
+# BIAS ANALYSIS DISPLAY
+#############################
+
+# Streamlit rendering of a bias analysis, the scoring itself lives in BiasDetection
+def display_bias_analysis(tournament_stats, tour_averages, sentiment_results, player_name, tournament, year,
+                          headline_probabilities=None, match_stats=None, bias_results=None):
+    
+    # Run bias detection algorithm, unless results saved from an earlier run of the analysis are passed in
+    if bias_results is None:
+        bias_results = bias_detection(tournament_stats, tour_averages, sentiment_results, headline_probabilities, match_stats)
+    
+    # Create tabs for different sections of the analysis
+    bias_tabs = st.tabs(["How It Works", "Performance Score", "Sentiment Analysis", "Bias Assessment"])
+    
+    # Tab 1: How the Algorithm Works
+    with bias_tabs[0]:
+        st.markdown("### How the Bias Detection Algorithm Works")
+        st.markdown("""
+        The bias detection algorithm works by comparing player performance metrics with tour averages 
+        and then contrasting this with media sentiment. Here's how it's calculated:
+        
+        **Performance Scoring:**
+        - Player's aces > tour average: +1 point
+        - Player's aces < tour average: -1 point
+        - Player's double faults < tour average: +1 point
+        - Player's double faults > tour average: -1 point
+        - Player's break points saved % > tour average: +1 point
+        - Player's break points saved % < tour average: -1 point
+                    
+        The players seed going into the tournament along with the round they reached is also taken into account (unseeded players are placed by their pre-tournament Elo rank in the draw). 
+        Where the full draw is available it is simulated 100,000 times from each player's Elo rating, and the round reached is scored against the player's simulated outcomes instead. 
+        For example if an unseeded player makes it into the final this is more impressive than if the 1st seed won the tournament.
+        If the performance:
+                    - Exceeds the expected round reached: +1 point
+                    - Matches the expected round reached: +0.5 points
+                    - Is worse than the expected round reached: -1 point
+                    
+        The total performance score is normalised to a scale from -1 (significantly below average) 
+        to +1 (significantly above average), with 0 representing average performance.
+        
+        **Sentiment Scoring:**
+        - Calculated as: (Positive headlines - Negative headlines) / Total headlines
+        - Ranges from -1 (all negative) to +1 (all positive)
+        
+        **Bias Assessment:**
+        - Bias score = Sentiment score - Performance score
+        - A large positive score indicates generic media is more positive than performance warrants
+        - A large negative score indicates generic media is more negative than performance warrants
+        - Scores near zero suggest generic media sentiment aligns with player performance
+        
+        **Confidence Interval:**
+        - The headlines are resampled thousands of times, with each headline's sentiment redrawn from the model's confidence in it
+        - The player's matches are resampled the same way to recalculate the performance score
+        - The bias is flagged as significant when the 95% interval of the resampled bias scores does not include zero
+        """)
+    
+    # Tab 2: Performance Score
+    with bias_tabs[1]:
+        st.markdown("### Player Performance Analysis")
+        
+        # Display normalised performance score
+        perf_score = bias_results["performance_score"]
+        perf_color = "green" if perf_score > 0 else "red" if perf_score < 0 else "gray"
+        st.markdown(f"#### Overall Performance Score: <span style='color:{perf_color}'>{perf_score:.2f}</span>", unsafe_allow_html=True)
+        
+        if perf_score > 0.3:
+            st.markdown(f"✅ {player_name}'s performance at {tournament} {year} was **above average** compared to tour standards.")
+        elif perf_score < -0.3:
+            st.markdown(f"❌ {player_name}'s performance at {tournament} {year} was **below average** compared to tour standards.")
+        else:
+            st.markdown(f"➖ {player_name}'s performance at {tournament} {year} was **about average** compared to tour standards.")
+        
+        # SEED COMPARISON to performance
+        # Add seed performance insight
+        for factor in bias_results["performance_factors"]:
+            if factor["metric"] == "Seed Performance":
+                if factor["score"] > 0:
+                    st.markdown(f"🔼 Based on their seed, {player_name} **progressed further** than expected in the tournament.")
+                else:
+                    st.markdown(f"🔽 Based on their seed, {player_name} **progressed less far** than expected in the tournament.")
+        
+        # Display performance factors in a table
+        st.markdown("#### Performance Metrics Breakdown")
+        performance_data = {
+            "Metric": [],
+            f"{player_name}": [],
+            "Tour Average": [],
+            "Score": []
+        }
+        
+        for factor in bias_results["performance_factors"]:
+            performance_data["Metric"].append(factor["metric"])
+           
+           # For the player's value
+           # Check if value is number/float befor applying float formatting
+            if isinstance(factor['value'], (int, float)):
+                performance_data[f"{player_name}"].append(f"{factor['value']:.1f}")
+            else:
+                performance_data[f"{player_name}"].append(f"{factor['value']}")
+
+            # For the tour average
+            if isinstance(factor['tour_avg'], (int, float)):
+                performance_data["Tour Average"].append(f"{factor['tour_avg']:.1f}")
+            else:
+                performance_data["Tour Average"].append(f"{factor['tour_avg']}")
+                        
+            score_text = f"{factor['score']:+g}"
+            score_color = "green" if factor["score"] > 0 else "red"
+            performance_data["Score"].append(f"<span style='color:{score_color}'>{score_text}</span>")
+        
+        # Create a DataFrame for display
+        perf_df = pd.DataFrame(performance_data)
+        
+        # Display with HTML formatting for score column
+        st.write(perf_df.to_html(escape=False, index=False), unsafe_allow_html=True)
+    
+    # Tab 3: Sentiment Analysis
+    with bias_tabs[2]:
+        st.markdown("### Media Sentiment Analysis")
+        
+        # Display sentiment score
+        sentiment_score = bias_results["sentiment_score"]
+        sentiment_color = "green" if sentiment_score > 0 else "red" if sentiment_score < 0 else "gray"
+        st.markdown(f"#### Overall Sentiment Score: <span style='color:{sentiment_color}'>{sentiment_score:.2f}</span>", unsafe_allow_html=True)
+        
+        # Count positive and negative headlines
+        pos_count = len(sentiment_results["Positive"])
+        neg_count = len(sentiment_results["Negative"])
+        total_count = pos_count + neg_count
+        
+        if total_count > 0:
+            st.markdown(f"• Positive headlines: {pos_count} ({pos_count/total_count:.0%})")
+            st.markdown(f"• Negative headlines: {neg_count} ({neg_count/total_count:.0%})")
+            
+            # Display sentiment summary
+            if sentiment_score > 0.3:
+                st.markdown(f"✅ Media coverage of {player_name} at {tournament} {year} was **predominantly positive**.")
+            elif sentiment_score < -0.3:
+                st.markdown(f"❌ Media coverage of {player_name} at {tournament} {year} was **predominantly negative**.")
+            else:
+                st.markdown(f"➖ Media coverage of {player_name} at {tournament} {year} was **relatively balanced**.")
+        else:
+            st.warning("No positive or negative headlines found for sentiment analysis.")
+        
+        # Display headlines with sentiment and agreement with stats
+        if bias_results["sentiment_details"]:
+            st.markdown("#### Headlines Sentiment Details")
+            
+            sentiment_data = {
+                "Headline": [],
+                "Sentiment": [],
+            }
+            
+            for detail in bias_results["sentiment_details"]:
+                sentiment_data["Headline"].append(detail["Headline"])
+                
+                # Format sentiment with colors
+                sentiment_text = detail["Sentiment"]
+                sentiment_color = "green" if sentiment_text == "Positive" else "red"
+                sentiment_data["Sentiment"].append(f"<span style='color:{sentiment_color}'>{sentiment_text}</span>")
+                
+            # Create DataFrame for display
+            sentiment_df = pd.DataFrame(sentiment_data)
+            
+            # Display with HTML formatting
+            st.write(sentiment_df.to_html(escape=False, index=False), unsafe_allow_html=True)
+    
+    # Tab 4: Bias Assessment
+    with bias_tabs[3]:
+        st.markdown("### Media Bias Assessment")
+        
+        # Display bias score and level
+        bias_score = bias_results["bias_score"]
+        bias_level = bias_results["bias_level"]
+        bias_description = bias_results["bias_description"]
+        
+        # Determine color based on bias magnitude (not direction)
+        bias_magnitude = abs(bias_score)
+        bias_color = "green" if bias_magnitude < 0.3 else "orange" if bias_magnitude < 0.7 else "red"
+        
+        st.markdown(f"#### Bias Score: <span style='color:{bias_color}'>{bias_score:.2f}</span>", unsafe_allow_html=True)
+        st.markdown(f"#### Bias Level: <span style='color:{bias_color}'>{bias_level}</span>", unsafe_allow_html=True)
+        
+        # Confidence interval from resampling the headlines and matches
+        uncertainty = bias_results["uncertainty"]
+        if uncertainty is not None:
+            lower, upper = uncertainty["bias_ci"]
+            st.markdown(f"**{uncertainty['confidence']:.0%} Confidence Interval**: {lower:.2f} to {upper:.2f} "
+                        f"({uncertainty['resamples']:,} bootstrap resamples)")
+            if uncertainty["significant"]:
+                st.markdown("📊 The interval does not include zero, so the bias is **statistically significant**.")
+            else:
+                st.markdown("📊 The interval includes zero, so the headlines and matches are **not enough to rule out no bias**.")
+        
+        # Display bias description
+        st.markdown(f"**Assessment**: {bias_description}")
+        
+        # Show interpretation
+        st.markdown("#### Interpretation")
+        if bias_score > 0.7:
+            st.markdown("⚠️ The media coverage appears to be **significantly more positive** than the player's performance metrics would suggest, indicating potential positive bias.")
+        elif bias_score < -0.7:
+            st.markdown("⚠️ The media coverage appears to be **significantly more negative** than the player's performance metrics would suggest, indicating potential negative bias.")
+        elif bias_score > 0.3:
+            st.markdown("ℹ️ The media coverage is **somewhat more positive** than the player's performance metrics would suggest.")
+        elif bias_score < -0.3:
+            st.markdown("ℹ️ The media coverage is **somewhat more negative** than the player's performance metrics would suggest.")
+        else:
+            st.markdown("✅ The media coverage appears to be **fairly balanced** and aligns well with the player's actual performance.")
+
+    return bias_results
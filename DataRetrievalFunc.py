@@ -1,5 +1,11 @@
+import logging
 import pandas as pd
-import streamlit as st
+from MatchStore import MatchSchemaError, load_year, store_path
+from SharedCache import GRAND_SLAM_PLAYERS, path_fingerprint
+from TournamentIndex import resolve_tournament_key
+from PlayerIndex import get_player_index, furthest_round, summarise_block, baseline_sums, averages_from_sums
+
+logger = logging.getLogger(__name__)
 
 #############################
 # STATS RETRIEVAL FUNCTIONS
@@ -8,196 +14,97 @@ import streamlit as st
 def load_match_data(year):
     try:
         # Takes in specific year to load up
-        file_path = f"C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Statistics/atp_matches_{year}.csv"
-        return pd.read_csv(file_path)
+        # Served from the typed match store, the CSV is only parsed the first time or when it changes
+        return load_year(year)
     except FileNotFoundError:
-        st.error(f"ATP {year} match data file not found. Please ensure the CSV is in the correct directory.")
+        logger.error(f"ATP {year} match data file not found. Please ensure the CSV is in the correct directory.")
+        return pd.DataFrame()
+    except MatchSchemaError as e:
+        logger.error(f"ATP {year} match data file is malformed: {e}")
         return pd.DataFrame()
 
-def get_player_tournament_stats(df, player_name, tournament):
-    # Filter matches where player is winner in the tournament
-    player_winner_matches = df[
-        (df["winner_name"] == player_name) & 
-        (df["tourney_name"].str.contains(tournament, case=False, na=False))
-    ]
-    
-    # Filter matches where player is loser in the tournament
-    player_loser_matches = df[
-        (df["loser_name"] == player_name) & 
-        (df["tourney_name"].str.contains(tournament, case=False, na=False))
-    ]
+# Sorted names of everyone who played a Grand Slam match in the year, built once per version of the year's data
+# and shared by every session, empty if there is no data for the year
+def grand_slam_players(year, dataset="atp"):
+    df = load_match_data(year)
+    if df.empty:
+        return []
+
+    def build():
+        # G is the code for grand slam tournament
+        grand_slam_df = df[df["tourney_level"] == "G"]
+        return sorted(set(grand_slam_df["winner_name"].unique()) | set(grand_slam_df["loser_name"].unique()))
+
+    return GRAND_SLAM_PLAYERS.get((dataset, year), path_fingerprint(store_path(year, dataset)), build)
+
+# The player's matches at a tournament from their point of view, one row per match
+# Empty if the player didn't play the tournament
+def get_player_tournament_block(df, player_name, tournament):
+    # The player's matches are one contiguous block of the player index
+    # so only their own rows are scanned for the tournament rather than the whole year
+    player_block = get_player_index(df).player_matches(player_name)
+
+    # Tournament names and aliases resolve to one integer key, e.g. "French Open" -> Roland Garros
+    tournament_key = resolve_tournament_key(tournament)
+    if tournament_key is None:
+        return player_block.iloc[0:0]
+    return player_block[player_block["tournament_key"] == tournament_key]
 
-    # Combine winner and loser matches
-    player_matches = pd.concat([player_winner_matches, player_loser_matches])
+def get_player_tournament_stats(df, player_name, tournament):
+    index = get_player_index(df)
+    tournament_block = get_player_tournament_block(df, player_name, tournament)
 
     # Return None if no matches found
-    if player_matches.empty:
+    if tournament_block.empty:
         return None, None
-    
-    # Determine player's seed in the tournament
-    seed = None
-    # USing iloc to select the first row of player winner matches
-    if not player_winner_matches.empty and not pd.isna(player_winner_matches["winner_seed"].iloc[0]):
-        seed = player_winner_matches["winner_seed"].iloc[0]
-    elif not player_loser_matches.empty and not pd.isna(player_loser_matches["loser_seed"].iloc[0]):
-        seed = player_loser_matches["loser_seed"].iloc[0]
 
+    # Determine player's seed in the tournament, taken from their first match
     # If no seed is retrieved from the dataset then mark seed as 0
-    if seed is None:
-        seed = 0
+    seeds = tournament_block["seed"].dropna()
+    seed = int(seeds.iloc[0]) if not seeds.empty else 0
+
     # Determine the furthest round reached by the player
-    round_order = {
-        "R128": 1, "R64": 2, "R32": 3, "R16": 4,
-        "QF": 5, "SF": 6, "F": 7, "W": 8
-    }
-
-    # Initialise with the lowest round
-    furthest_round = "R128"
-    furthest_round_value = 1
-
-    # Special check for tournament winner (reached W)
-    if not player_winner_matches.empty and "F" in player_winner_matches["round"].values:
-        furthest_round = "W"
-        furthest_round_value = round_order["W"]
-    # Otherwise, check for runner-up
-    elif not player_loser_matches.empty and "F" in player_loser_matches["round"].values:
-        furthest_round = "F"
-        furthest_round_value = round_order["F"]
-    else:
-        # Check regular rounds for winners
-        if not player_winner_matches.empty:
-            for round_name in player_winner_matches["round"].unique():
-                if round_order.get(round_name, 0) > furthest_round_value:
-                    furthest_round = round_name
-                    furthest_round_value = round_order.get(round_name, 0)
-        
-        # Check regular rounds for losers
-        if not player_loser_matches.empty:
-            for round_name in player_loser_matches["round"].unique():
-                if round_order.get(round_name, 0) > furthest_round_value:
-                    furthest_round = round_name
-                    furthest_round_value = round_order.get(round_name, 0)
-
-    print("Debugging furthest round", furthest_round)
-    # Compute tournament-specific statistics
-    tournament_stats = {
-        "Total Matches": len(player_matches),
-        "Wins": len(player_winner_matches),
-        "Losses": len(player_loser_matches),
-        "Win Rate": len(player_winner_matches) / len(player_matches) * 100,
-        "Avg Match Duration": player_matches["minutes"].mean(),
-        "Seed": seed,
-        "Round Reached": furthest_round,
-        
-        # Both matches where the selcted player won and lost are retrieved
-        "Tournament Aces": player_matches[
-            player_matches["winner_name"] == player_name]["w_ace"].mean() 
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_ace"].mean(),
-        
-        "Tournament Double Faults": player_matches[
-            player_matches["winner_name"] == player_name]["w_df"].mean()
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_df"].mean(),
-        
-        "Break Points Faced": player_matches[
-            player_matches["winner_name"] == player_name]["w_bpFaced"].mean() 
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_bpFaced"].mean(),
-        
-        # Calculated by dividing amount of break points saved by amount of break points faced
-        "Break Points Saved Percentage": (
-            (player_matches[player_matches["winner_name"] == player_name]["w_bpSaved"].mean() 
-            / player_matches[player_matches["winner_name"] == player_name]["w_bpFaced"].mean() * 100) 
-            if not player_winner_matches.empty 
-            else (player_matches[player_matches["loser_name"] == player_name]["l_bpSaved"].mean()
-            / player_matches[player_matches["loser_name"] == player_name]["l_bpFaced"].mean() * 100)
-        )
-    }
+    round_reached = furthest_round(tournament_block)
+
+    # Compute tournament-specific statistics over both the matches the player won and lost
+    tournament_stats = summarise_block(tournament_block, "Tournament")
+    tournament_stats["Seed"] = seed
+    tournament_stats["Round Reached"] = round_reached
+
+    # Raw match rows for the matches table
+    player_matches = index.source_rows(tournament_block)
 
     return player_matches, tournament_stats
 
 def get_player_yearly_stats(df, player_name):
-    # Filter matches where player is winner
-    player_winner_matches = df[df["winner_name"] == player_name]
-    # Filter matches where player is loser
-    player_loser_matches = df[df["loser_name"] == player_name]
-
-    # Combine winner and loser matches
-    player_matches = pd.concat([player_winner_matches, player_loser_matches])
+    # Every match the player played this year
+    player_block = get_player_index(df).player_matches(player_name)
 
     # Return None if no matches found
-    if player_matches.empty:
+    if player_block.empty:
         return None
 
     # Compute yearly statistics
-    yearly_stats = {
-        "Total Matches": len(player_matches),
-        "Wins": len(player_winner_matches),
-        "Losses": len(player_loser_matches),
-        "Win Rate": len(player_winner_matches) / len(player_matches) * 100,
-        "Avg Match Duration": player_matches["minutes"].mean(),
-        
-        "Yearly Aces": player_matches[
-            player_matches["winner_name"] == player_name]["w_ace"].mean() 
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_ace"].mean(),
-        
-        "Yearly Double Faults": player_matches[
-            player_matches["winner_name"] == player_name]["w_df"].mean() 
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_df"].mean(),
-        
-        "Break Points Faced": player_matches[
-            player_matches["winner_name"] == player_name]["w_bpFaced"].mean()
-            if not player_winner_matches.empty 
-            else player_matches[player_matches["loser_name"] == player_name]["l_bpFaced"].mean(),
-        
-        "Break Points Saved Percentage": (
-            (player_matches[player_matches["winner_name"] == player_name]["w_bpSaved"].mean()
-            / player_matches[player_matches["winner_name"] == player_name]["w_bpFaced"].mean() * 100) 
-            if not player_winner_matches.empty 
-            else (player_matches[player_matches["loser_name"] == player_name]["l_bpSaved"].mean() 
-            / player_matches[player_matches["loser_name"] == player_name]["l_bpFaced"].mean() * 100)
-        )
-    }
-
-    return yearly_stats
+    return summarise_block(player_block, "Yearly")
 
 ############################
 #TOURNAMENT AVERAGES COMPARISON
 #############################
 def calculate_tour_averages(df, tournament):
 
-    # Filter matches for the specific tournament
-    tournament_matches = df[df["tourney_name"].str.contains(tournament, case=False, na=False)]
-    
-    if tournament_matches.empty:
+    # Filter matches for the specific tournament by its integer key
+    tournament_key = resolve_tournament_key(tournament)
+    if tournament_key is None:
         return {}
+    long_df = get_player_index(df).matches_df
+    tournament_rows = long_df[long_df["tournament_key"] == tournament_key]
     
-    # Calculate averages for winners
-    winners_aces = tournament_matches["w_ace"].mean()
-    winners_double_faults = tournament_matches["w_df"].mean()
-    winners_bp_faced = tournament_matches["w_bpFaced"].mean()
-    winners_bp_saved = tournament_matches["w_bpSaved"].mean()
-    
-    # Calculate averages for losers
-    losers_aces = tournament_matches["l_ace"].mean()
-    losers_double_faults = tournament_matches["l_df"].mean()
-    losers_bp_faced = tournament_matches["l_bpFaced"].mean()
-    losers_bp_saved = tournament_matches["l_bpSaved"].mean()
+    if tournament_rows.empty:
+        return {}
     
-    # Calculate overall tour averages
-    tour_averages = {
-        "aces": (winners_aces + losers_aces) / 2,
-        "double_faults": (winners_double_faults + losers_double_faults) / 2,
-        "break_points_faced": (winners_bp_faced + losers_bp_faced) / 2,
-        "break_points_saved": (winners_bp_saved + losers_bp_saved) / 2,
-        "break_points_saved_pct": (
-            (winners_bp_saved / winners_bp_faced * 100 if winners_bp_faced > 0 else 0) + 
-            (losers_bp_saved / losers_bp_faced * 100 if losers_bp_faced > 0 else 0)
-        ) / 2
-    }
+    # Every player-match counts once, winners and losers alike
+    averages = averages_from_sums(baseline_sums(tournament_rows, ["tournament_key"]))
+    tour_averages = averages.iloc[0].to_dict()
+    tour_averages.pop("player_matches")
     
     return tour_averages
-
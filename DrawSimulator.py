@@ -0,0 +1,184 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+from MatchStore import load_year
+from PlayerIndex import ROUND_ORDER
+from EloRatings import get_elo, win_probability, INITIAL_RATING
+from StatsCube import source_signature
+from TournamentIndex import resolve_tournament_key
+
+#############################
+# DRAW SIMULATION
+#############################
+
+# A Grand Slam draw is rebuilt from its first round matches and played out many times
+# Each player's share of simulations ending in each round gives the distribution of rounds they could expect to reach
+DRAW_SIZE = 128
+DEFAULT_SIMULATIONS = 100_000
+
+# Fixed so the same tournament always gives the same distribution
+RANDOM_SEED = 2024
+
+# Round names in order, index 0 is losing in the first round and the last is winning the tournament
+ROUND_NAMES = sorted(ROUND_ORDER, key=ROUND_ORDER.get)
+
+# Simulated distributions shared by every session
+# Keyed by (tournament_key, year, strength, simulations) and dropped when the match files change
+_simulations = {}
+_simulations_signature = None
+_simulations_lock = threading.Lock()
+
+# Main draw rounds from the first round to the final
+DRAW_ROUNDS = ["R128", "R64", "R32", "R16", "QF", "SF", "F"]
+
+# First round matches in bracket order, traced back from the final through the later rounds
+# Each match a player won is preceded by the two matches its players won in the round before,
+# so neighbouring first round matches meet in the second round, neighbouring fours in the third and so on
+# match_num can't be used, its order doesn't follow the draw at every tournament (e.g. Roland Garros 2024)
+# Returns None when a round is missing a match, e.g. for a tournament still in progress
+def first_round_order(draw_matches):
+    # The match each player won in each round
+    won = {round_name: {} for round_name in DRAW_ROUNDS}
+    for row in draw_matches.itertuples(index=False):
+        if row.round in won:
+            won[row.round][int(row.winner_id)] = row
+
+    final = list(won["F"].values())
+    if len(final) != 1:
+        return None
+
+    order = []
+    pending = [(int(final[0].winner_id), len(DRAW_ROUNDS) - 1)]
+    while pending:
+        player_id, round_index = pending.pop()
+        row = won[DRAW_ROUNDS[round_index]].get(player_id)
+        if row is None:
+            return None
+        if round_index == 0:
+            order.append(row)
+        else:
+            # Pushed bottom first so the top half is traced first
+            pending.append((int(row.loser_id), round_index - 1))
+            pending.append((int(row.winner_id), round_index - 1))
+
+    if len(order) != DRAW_SIZE // 2:
+        return None
+    return pd.DataFrame(order)
+
+# First round players in bracket order, neighbouring pairs meet in the first round
+# Returns None when the tournament doesn't have a complete draw in the data
+def draw_bracket(tournament, year):
+    tournament_key = resolve_tournament_key(tournament)
+    if tournament_key is None:
+        return None
+
+    df = load_year(year)
+    draw_matches = df[(df["tournament_key"] == tournament_key).fillna(False) & df["round"].isin(DRAW_ROUNDS)]
+    if (draw_matches["round"] == "R128").sum() != DRAW_SIZE // 2:
+        return None
+    first_round = first_round_order(draw_matches)
+    if first_round is None:
+        return None
+
+    bracket = pd.DataFrame(index=range(DRAW_SIZE))
+    for column, (winner_column, loser_column) in {
+        "player_name": ("winner_name", "loser_name"),
+        "rank_points": ("winner_rank_points", "loser_rank_points"),
+    }.items():
+        values = np.empty(DRAW_SIZE, dtype=object)
+        values[0::2] = first_round[winner_column].to_numpy()
+        values[1::2] = first_round[loser_column].to_numpy()
+        bracket[column] = values
+
+    bracket["player_name"] = bracket["player_name"].astype(str)
+    bracket["tournament_key"] = tournament_key
+    return bracket
+
+# Probability that the row player beats the column player, for every pair in the draw
+# "elo" averages each player's overall and surface Elo going into the tournament, as in the FiveThirtyEight model
+# "rank_points" uses each player's share of the pair's ranking points, unranked players count as 1 point
+def win_probability_matrix(bracket, year, strength="elo"):
+    if strength == "rank_points":
+        points = pd.to_numeric(bracket["rank_points"], errors="coerce").fillna(1).clip(lower=1).to_numpy(dtype=float)
+        matrix = points[:, None] / (points[:, None] + points[None, :])
+    else:
+        snapshots = get_elo()["snapshots"]
+        tournament_key = int(bracket["tournament_key"].iloc[0])
+        ratings = np.array([
+            (lambda snapshot: (snapshot["elo"] + snapshot["surface_elo"]) / 2 if snapshot else INITIAL_RATING)(
+                snapshots.get((player_name, tournament_key, year)))
+            for player_name in bracket["player_name"]
+        ])
+        matrix = win_probability(ratings[:, None], ratings[None, :])
+    return matrix.astype(np.float32)
+
+# Play the draw out simulations times at once
+# Every round is one vectorised step over all simulations: neighbouring survivors are paired,
+# one random draw per pair decides the winner, and winners are counted with a bincount
+# Returns an array of shape (rounds + 1, players) counting the simulations in which each player reached each round
+def simulate_draw(probabilities, simulations=DEFAULT_SIMULATIONS, seed=RANDOM_SEED):
+    rng = np.random.default_rng(seed)
+    players = len(probabilities)
+    rounds = int(math.log2(players))
+
+    survivors = np.tile(np.arange(players, dtype=np.int16), (simulations, 1))
+    reached = np.zeros((rounds + 1, players), dtype=np.int64)
+    reached[0] = simulations
+
+    for round_index in range(rounds):
+        top, bottom = survivors[:, 0::2], survivors[:, 1::2]
+        top_wins = rng.random(top.shape, dtype=np.float32) < probabilities[top, bottom]
+        survivors = np.where(top_wins, top, bottom)
+        reached[round_index + 1] = np.bincount(survivors.ravel(), minlength=players)
+
+    return reached
+
+# Share of simulations in which each player's tournament ended in each round, one row per player
+def round_distribution(tournament, year, simulations=DEFAULT_SIMULATIONS, strength="elo"):
+    global _simulations_signature
+    tournament_key = resolve_tournament_key(tournament)
+    key = (tournament_key, year, strength, simulations)
+
+    with _simulations_lock:
+        signature = source_signature()
+        if _simulations_signature != signature:
+            _simulations.clear()
+            _simulations_signature = signature
+        if key in _simulations:
+            return _simulations[key]
+
+    bracket = draw_bracket(tournament, year)
+    if bracket is None:
+        return None
+
+    reached = simulate_draw(win_probability_matrix(bracket, year, strength), simulations)
+
+    # Ending in a round means reaching it and not reaching the next one
+    ended = (reached - np.vstack([reached[1:], np.zeros((1, reached.shape[1]), dtype=np.int64)])) / simulations
+    distribution = pd.DataFrame(ended.T, columns=ROUND_NAMES)
+    distribution["Expected Round"] = ended.T @ np.arange(1, len(ROUND_NAMES) + 1)
+    distribution.index = pd.Index(bracket["player_name"], name="player_name")
+
+    with _simulations_lock:
+        _simulations[key] = distribution
+    return distribution
+
+# Where the round a player actually reached sits in their simulated distribution
+# Percentile counts half of the simulations ending in the same round, so 0.5 is exactly as expected
+# Returns {} when the draw couldn't be rebuilt or the player wasn't in it
+def round_percentile(player_name, tournament, year, round_reached, simulations=DEFAULT_SIMULATIONS, strength="elo"):
+    distribution = round_distribution(tournament, year, simulations, strength)
+    if distribution is None or player_name not in distribution.index or round_reached not in ROUND_ORDER:
+        return {}
+
+    probabilities = distribution.loc[player_name, ROUND_NAMES].to_numpy(dtype=float)
+    reached_index = ROUND_ORDER[round_reached] - 1
+    percentile = probabilities[:reached_index].sum() + probabilities[reached_index] / 2
+
+    expected_round = distribution.loc[player_name, "Expected Round"]
+    return {
+        "Round Percentile": float(percentile),
+        "Expected Round": ROUND_NAMES[min(len(ROUND_NAMES), max(1, round(expected_round))) - 1],
+        "Simulations": simulations,
+    }
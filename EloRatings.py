@@ -0,0 +1,282 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from MatchStore import STORE_DIR, available_years, load_year
+from PlayerIndex import ROUND_ORDER
+from StatsCube import year_fingerprint, source_signature
+from TournamentIndex import resolve_tournament_key
+
+logger = logging.getLogger(__name__)
+
+#############################
+# ELO RATINGS
+#############################
+
+# Every match in Statistics is replayed in date order to rate players overall and per surface
+# The ratings every entrant held going into each tournament are kept as snapshots for performance scoring
+ELO_DIR = os.path.join(STORE_DIR, "elo")
+ELO_MANIFEST = os.path.join(ELO_DIR, "manifest.json")
+SNAPSHOTS_FILE = os.path.join(ELO_DIR, "snapshots.parquet")
+
+# Bumped whenever the rating formula or stored layout changes so the ratings are replayed from scratch
+ELO_FORMAT = 1
+
+INITIAL_RATING = 1500.0
+SURFACES = ["Hard", "Clay", "Grass", "Carpet"]
+SURFACE_INDEX = {surface: index for index, surface in enumerate(SURFACES)}
+
+# Round robin matches come before the knockout rounds, the bronze match is played alongside the final
+MATCH_ORDER = {"RR": 0, **ROUND_ORDER, "BR": ROUND_ORDER["F"]}
+
+# Loaded snapshots shared by every session, reloaded when the match files change
+_elo = None
+_elo_lock = threading.Lock()
+
+# K factor shrinks as a player's match count grows, so new players move quickly and established ratings settle
+# Same shape as the FiveThirtyEight tennis model
+def k_factor(matches_played):
+    return 250 / (matches_played + 5) ** 0.4
+
+# Probability player A beats player B, works on single ratings or whole arrays
+def win_probability(rating_a, rating_b):
+    return 1 / (1 + 10 ** ((np.asarray(rating_b) - np.asarray(rating_a)) / 400))
+
+# Ratings for every player seen so far, stored in arrays indexed by a dense player position
+class EloState:
+    def __init__(self):
+        self.player_ids = np.empty(0, dtype=np.int64)
+        self.ratings = np.empty(0)
+        self.matches = np.empty(0, dtype=np.int64)
+        self.surface_ratings = np.empty((len(SURFACES), 0))
+        self.surface_matches = np.empty((len(SURFACES), 0), dtype=np.int64)
+        self.positions = {}
+
+    # Array positions for a set of player IDs, adding players seen for the first time
+    def positions_for(self, player_ids):
+        # dict.fromkeys drops repeats while keeping first-seen order
+        new_ids = list(dict.fromkeys(int(player_id) for player_id in player_ids if int(player_id) not in self.positions))
+        if new_ids:
+            # Positions are assigned in order, so new players are appended to the end of every array
+            start = len(self.player_ids)
+            self.positions.update({player_id: start + offset for offset, player_id in enumerate(new_ids)})
+            count = len(new_ids)
+            self.player_ids = np.append(self.player_ids, np.array(new_ids, dtype=np.int64))
+            self.ratings = np.append(self.ratings, np.full(count, INITIAL_RATING))
+            self.matches = np.append(self.matches, np.zeros(count, dtype=np.int64))
+            self.surface_ratings = np.hstack([self.surface_ratings, np.full((len(SURFACES), count), INITIAL_RATING)])
+            self.surface_matches = np.hstack([self.surface_matches, np.zeros((len(SURFACES), count), dtype=np.int64)])
+        return np.array([self.positions[int(player_id)] for player_id in player_ids], dtype=np.int64)
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, player_ids=self.player_ids, ratings=self.ratings, matches=self.matches,
+                 surface_ratings=self.surface_ratings, surface_matches=self.surface_matches)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        state = cls()
+        with np.load(path) as stored:
+            state.player_ids = stored["player_ids"]
+            state.ratings = stored["ratings"]
+            state.matches = stored["matches"]
+            state.surface_ratings = stored["surface_ratings"]
+            state.surface_matches = stored["surface_matches"]
+        state.positions = {int(player_id): position for position, player_id in enumerate(state.player_ids)}
+        return state
+
+    def update(self, winner, loser, surface):
+        expected = win_probability(self.ratings[winner], self.ratings[loser])
+        self.ratings[winner] += k_factor(self.matches[winner]) * (1 - expected)
+        self.ratings[loser] -= k_factor(self.matches[loser]) * (1 - expected)
+        self.matches[winner] += 1
+        self.matches[loser] += 1
+
+        # Matches without a recorded surface only count towards the overall rating
+        if surface >= 0:
+            ratings = self.surface_ratings[surface]
+            matches = self.surface_matches[surface]
+            expected = win_probability(ratings[winner], ratings[loser])
+            ratings[winner] += k_factor(matches[winner]) * (1 - expected)
+            ratings[loser] -= k_factor(matches[loser]) * (1 - expected)
+            matches[winner] += 1
+            matches[loser] += 1
+
+# Ratings state after each year is checkpointed, so a new or changed year only replays from there
+def state_path(year):
+    return os.path.join(ELO_DIR, f"state_{year}.npz")
+
+# One year's matches in the order they were played
+# Walkovers are dropped as no tennis was played
+def ordered_matches(year):
+    df = load_year(year)
+    df = df[~df["score"].astype(str).str.contains("W/O", na=False)]
+    order = pd.DataFrame({
+        "tourney_date": df["tourney_date"].to_numpy(),
+        "tourney_id": df["tourney_id"].astype(str).to_numpy(),
+        "round_order": df["round"].astype(str).map(MATCH_ORDER).fillna(0).to_numpy(),
+        "match_num": df["match_num"].fillna(0).astype(int).to_numpy(),
+    })
+    positions = order.sort_values(["tourney_date", "tourney_id", "round_order", "match_num"], kind="stable").index
+    return df.iloc[positions.to_numpy()]
+
+# Replay one year's matches into the state, returning the pre-tournament snapshot for every entrant
+def replay_year(state, year):
+    matches = ordered_matches(year)
+    if matches.empty:
+        return pd.DataFrame()
+
+    winner_ids = matches["winner_id"].to_numpy(dtype=np.int64)
+    loser_ids = matches["loser_id"].to_numpy(dtype=np.int64)
+    surfaces = matches["surface"].astype(str).map(SURFACE_INDEX).fillna(-1).astype(int).to_numpy()
+    tourney_ids = matches["tourney_id"].astype(str).to_numpy()
+    tournament_keys = matches["tournament_key"].to_numpy()
+    tourney_dates = matches["tourney_date"].to_numpy()
+
+    player_names = dict(zip(winner_ids, matches["winner_name"].astype(str)))
+    player_names.update(zip(loser_ids, matches["loser_name"].astype(str)))
+
+    winners = state.positions_for(winner_ids)
+    losers = state.positions_for(loser_ids)
+
+    # Each tournament is a contiguous run of rows
+    boundaries = np.flatnonzero(tourney_ids[1:] != tourney_ids[:-1]) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(tourney_ids)]])
+
+    snapshots = []
+    for start, end in zip(starts, ends):
+        # Ratings are captured before any of the tournament's matches are played
+        entrants = np.unique(np.concatenate([winners[start:end], losers[start:end]]))
+        surface = surfaces[start]
+        ratings = state.ratings[entrants]
+        surface_ratings = state.surface_ratings[surface, entrants] if surface >= 0 else ratings
+        entrant_ids = state.player_ids[entrants]
+
+        snapshots.append(pd.DataFrame({
+            "tournament_key": tournament_keys[start],
+            "tourney_id": tourney_ids[start],
+            "tourney_date": tourney_dates[start],
+            "year": year,
+            "player_id": entrant_ids,
+            "player_name": [player_names[player_id] for player_id in entrant_ids],
+            "elo": ratings,
+            "surface_elo": surface_ratings,
+            # Position in the field by overall rating, 1 is the highest rated entrant
+            "elo_rank": (-ratings).argsort().argsort() + 1,
+        }))
+
+        for match in range(start, end):
+            state.update(winners[match], losers[match], surfaces[match])
+
+    return pd.concat(snapshots, ignore_index=True)
+
+def read_manifest():
+    if not os.path.exists(ELO_MANIFEST):
+        return {}
+    with open(ELO_MANIFEST, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("format") != ELO_FORMAT:
+        return {}
+    return manifest["years"]
+
+# Replay the ratings, starting from the first year that is new or whose match file changed
+# Every earlier year is carried over from its checkpoint and snapshots
+def update_ratings(rebuild=False):
+    os.makedirs(ELO_DIR, exist_ok=True)
+    manifest = {} if rebuild else read_manifest()
+
+    years = available_years()
+    for year in years:
+        load_year(year)
+
+    # Ratings depend on every earlier match, so everything from the first changed year on is replayed
+    changed = [year for year in years if manifest.get(str(year)) != year_fingerprint(year)]
+    removed = [int(year) for year in manifest if int(year) not in years]
+    if not changed and not removed:
+        return []
+    # A removed year changes every rating after it, so the whole history is replayed
+    replay_from = min(changed) if changed and not removed else 0
+
+    earlier_years = [year for year in years if year < replay_from]
+    if earlier_years and os.path.exists(state_path(earlier_years[-1])):
+        state = EloState.load(state_path(earlier_years[-1]))
+    else:
+        state, earlier_years = EloState(), []
+
+    frames = []
+    if earlier_years and os.path.exists(SNAPSHOTS_FILE):
+        existing = pd.read_parquet(SNAPSHOTS_FILE)
+        frames.append(existing[existing["year"].isin(earlier_years)])
+
+    replayed = [year for year in years if year not in earlier_years]
+    for year in replayed:
+        frames.append(replay_year(state, year))
+        state.save(state_path(year))
+
+    snapshots = pd.concat(frames, ignore_index=True)
+    tmp_path = SNAPSHOTS_FILE + ".tmp"
+    snapshots.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, SNAPSHOTS_FILE)
+
+    manifest = {"format": ELO_FORMAT, "years": {str(year): year_fingerprint(year) for year in years}}
+    tmp_manifest = ELO_MANIFEST + ".tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_manifest, ELO_MANIFEST)
+
+    logger.info(f"Elo ratings replayed for years {replayed}")
+    return replayed
+
+# Snapshots keyed by (player_name, tournament_key, year) for constant time lookups
+def get_elo():
+    global _elo
+    with _elo_lock:
+        signature = source_signature()
+        if _elo is not None and _elo["source_signature"] == signature:
+            return _elo
+
+        update_ratings()
+        snapshots = pd.read_parquet(SNAPSHOTS_FILE)
+        keys = zip(snapshots["player_name"], snapshots["tournament_key"].astype(int), snapshots["year"].astype(int))
+        ratings = snapshots[["elo", "surface_elo", "elo_rank"]].to_dict("records")
+
+        years = available_years()
+        _elo = {
+            "source_signature": signature,
+            "snapshots": dict(zip(keys, ratings)),
+            "state": EloState.load(state_path(years[-1])) if years else EloState(),
+        }
+        return _elo
+
+# Ratings a player took into a tournament, named like the other tournament stats
+# Returns {} when the player didn't play the tournament
+def lookup_pre_tournament_elo(player_name, tournament, year):
+    tournament_key = resolve_tournament_key(tournament)
+    ratings = get_elo()["snapshots"].get((player_name, tournament_key, year))
+    if ratings is None:
+        return {}
+    return {
+        "Elo": ratings["elo"],
+        "Surface Elo": ratings["surface_elo"],
+        "Elo Rank": int(ratings["elo_rank"]),
+    }
+
+# Latest overall and per surface ratings for a player ID, None if they have never played
+def current_rating(player_id):
+    state = get_elo()["state"]
+    position = state.positions.get(int(player_id))
+    if position is None:
+        return None
+    rating = {"Elo": float(state.ratings[position])}
+    for surface, surface_ratings in zip(SURFACES, state.surface_ratings):
+        rating[f"{surface} Elo"] = float(surface_ratings[position])
+    return rating
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    replayed = update_ratings()
+    print(f"Elo years replayed: {replayed or 'none, ratings are up to date'}")
@@ -0,0 +1,243 @@
+import re
+import sys
+import argparse
+import threading
+import unicodedata
+from collections import deque
+import pandas as pd
+from HeadToHead import get_head_to_head
+from StatsCube import source_signature
+from TournamentIndex import resolve_tournament_key
+
+#############################
+# HEADLINE ENTITY LINKING
+#############################
+
+# Every player name in the match data is compiled into one Aho-Corasick automaton
+# so a headline is tagged with every player it mentions in a single pass over its characters,
+# however many players there are
+
+# Names headlines use that can't be derived from the match data
+PLAYER_ALIASES = {
+    "Rafael Nadal": ["Rafa"],
+    "Novak Djokovic": ["Nole"],
+    "Carlos Alcaraz": ["Carlitos"],
+    "Felix Auger Aliassime": ["FAA"],
+}
+
+# Surnames shorter than this are too likely to match ordinary words
+MIN_SURNAME_LENGTH = 3
+
+# Words that start a surname, e.g. "Juan Martin del Potro" is "Del Potro" in headlines rather than "Martin del Potro"
+SURNAME_PARTICLES = {"da", "de", "del", "della", "der", "di", "dos", "du", "la", "le", "van", "von"}
+
+# Accents removed, lower case, and anything that isn't a letter or digit turned into a single space
+# so "Auger-Aliassime's" and "Auger Aliassime" both become "auger aliassime s"
+def normalise_text(text):
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(character for character in text if not unicodedata.combining(character))
+    return " " + re.sub(r"[^a-z0-9]+", " ", text.lower()).strip() + " "
+
+# Multi pattern matcher over normalised text
+# Patterns are stored with a leading and trailing space so they only match whole words
+class NameAutomaton:
+    def __init__(self, patterns):
+        # Trie of character transitions, node 0 is the root
+        self.transitions = [{}]
+        self.outputs = [[]]
+        self.fail = [0]
+
+        for pattern, value in patterns.items():
+            node = 0
+            for character in pattern:
+                next_node = self.transitions[node].get(character)
+                if next_node is None:
+                    next_node = len(self.transitions)
+                    self.transitions[node][character] = next_node
+                    self.transitions.append({})
+                    self.outputs.append([])
+                    self.fail.append(0)
+                node = next_node
+            self.outputs[node].append((len(pattern), value))
+
+        # Failure links in breadth first order, each node falls back to the longest suffix that is also a prefix
+        # Children of the root fall back to the root, which they already do
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for character, child in self.transitions[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and character not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.transitions[fallback].get(character, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    # Every (start, end, value) match in the text, found in one left to right pass
+    def find_all(self, text):
+        matches = []
+        node = 0
+        for position, character in enumerate(text):
+            while node and character not in self.transitions[node]:
+                node = self.fail[node]
+            node = self.transitions[node].get(character, 0)
+            for length, value in self.outputs[node]:
+                matches.append((position - length + 1, position + 1, value))
+        return matches
+
+# Shorter surname for players with more than one name after their first, e.g. "del potro" for Juan Martin del Potro
+# The suffix from the first particle on, otherwise the last name, None if there's nothing shorter
+def short_surname(tokens):
+    rest = tokens[1:]
+    if len(rest) < 2:
+        return None
+    for position, token in enumerate(rest[:-1]):
+        if token in SURNAME_PARTICLES:
+            return " ".join(rest[position:]) if position else None
+    return rest[-1]
+
+# Name patterns for every player in the match data
+# Full names map to one player, a surname maps to every player who shares it
+def name_patterns(players):
+    patterns = {}
+    short_surnames = {}
+    for player_name in players:
+        tokens = normalise_text(player_name).split()
+        if not tokens:
+            continue
+        names = {" ".join(tokens)}
+        # Everything after the first name is the surname, e.g. "de minaur" or "auger aliassime"
+        if len(tokens) > 1 and len(" ".join(tokens[1:])) >= MIN_SURNAME_LENGTH:
+            names.add(" ".join(tokens[1:]))
+        surname = short_surname(tokens)
+        if surname is not None and len(surname) >= MIN_SURNAME_LENGTH:
+            short_surnames.setdefault(surname, set()).add(player_name)
+        for alias in PLAYER_ALIASES.get(player_name, []):
+            names.add(normalise_text(alias).strip())
+        for name in names:
+            patterns.setdefault(f" {name} ", set()).add(player_name)
+
+    # Shorter surnames are only added when one player has them and no other name already uses them,
+    # so "potro" can't take a headline from anyone else
+    for surname, surname_players in short_surnames.items():
+        if len(surname_players) == 1 and f" {surname} " not in patterns:
+            patterns[f" {surname} "] = surname_players
+    return {pattern: frozenset(players) for pattern, players in patterns.items()}
+
+# Players with more than one name after their first whose short surname is theirs alone in the match data
+# but doesn't link a headline to them, e.g. "Del Potro wins" not tagging Juan Martin del Potro
+def unlinked_surnames(linker=None):
+    linker = get_linker() if linker is None else linker
+    surnames = {}
+    for player_name in linker["match_counts"]:
+        surname = short_surname(normalise_text(player_name).split())
+        if surname is not None and len(surname) >= MIN_SURNAME_LENGTH:
+            surnames.setdefault(surname, []).append(player_name)
+
+    unlinked = []
+    for surname, surname_players in surnames.items():
+        if len(surname_players) > 1 or surname_players[0] in tag_headline(f"{surname} wins", linker=linker):
+            continue
+        # A surname that is another player's whole surname, e.g. "gomez", is theirs to link
+        text = normalise_text(surname)
+        if not any(start == 0 and end == len(text) for start, end, _ in linker["automaton"].find_all(text)):
+            unlinked.append(surname_players[0])
+    return unlinked
+
+# Automaton and the context needed to resolve ambiguous surnames, built once per match data version
+_linker = None
+_linker_lock = threading.Lock()
+
+def get_linker():
+    global _linker
+    with _linker_lock:
+        signature = source_signature()
+        if _linker is None or _linker["signature"] != signature:
+            meetings = get_head_to_head().meetings_df
+            # Players with the most matches come first when a surname is shared, e.g. Alexander over Mischa Zverev
+            match_counts = meetings["player_name"].astype(str).value_counts()
+            _linker = {
+                "signature": signature,
+                "automaton": NameAutomaton(name_patterns(match_counts.index)),
+                "match_counts": match_counts.to_dict(),
+            }
+        return _linker
+
+# Players mentioned in one headline, in order of first mention
+# Overlapping matches keep the longest, so "Alexander Zverev" isn't also counted as "Zverev"
+# Shared surnames resolve to a player in the context (e.g. the tournament's entrants), else the most active player
+def tag_headline(headline, context_players=None, linker=None):
+    linker = get_linker() if linker is None else linker
+    matches = sorted(linker["automaton"].find_all(normalise_text(headline)), key=lambda match: (match[0], -(match[1] - match[0])))
+
+    mentioned = []
+    covered_until = 0
+    for start, end, candidates in matches:
+        # Patterns share their boundary spaces, so a match may start on the previous match's closing space
+        if start + 1 < covered_until:
+            continue
+        covered_until = end
+        if context_players:
+            in_context = [player for player in candidates if player in context_players]
+            candidates = in_context or candidates
+        player = max(candidates, key=lambda name: linker["match_counts"].get(name, 0))
+        if player not in mentioned:
+            mentioned.append(player)
+    return mentioned
+
+# Tag every headline and link it to the tournament match between the players it mentions
+# Adds "Players" (list of names) and the linked match's round, opponent and winner when two entrants are mentioned
+def link_headlines(headlines_df, tournament, year, player_name=None):
+    linker = get_linker()
+    head_to_head = get_head_to_head()
+
+    # Entrants of the tournament resolve shared surnames and are the only players a match can be linked for
+    tournament_key = resolve_tournament_key(tournament)
+    meetings = head_to_head.meetings_df
+    entrants = set()
+    if tournament_key is not None:
+        edition = meetings[(meetings["tournament_key"] == tournament_key) & (meetings["tourney_date"].dt.year == year)]
+        entrants = set(edition["player_name"].astype(str))
+
+    linked = headlines_df.copy()
+    players = [tag_headline(headline, entrants, linker) for headline in linked["Headline"].fillna("")]
+    linked["Players"] = players
+
+    rounds, opponents, winners = [], [], []
+    for mentioned in players:
+        # The searched player's match if they are mentioned, otherwise the first two players mentioned
+        focus = player_name if player_name in mentioned else (mentioned[0] if mentioned else None)
+        opponent = next((name for name in mentioned if name != focus and name in entrants), None)
+        match = pd.DataFrame()
+        if focus in entrants and opponent is not None:
+            match = head_to_head.meetings(focus, opponent)
+            match = match[(match["tournament_key"] == tournament_key) & (match["tourney_date"].dt.year == year)]
+        if match.empty:
+            rounds.append(None)
+            opponents.append(None)
+            winners.append(None)
+        else:
+            meeting = match.iloc[-1]
+            rounds.append(str(meeting["round"]))
+            opponents.append(opponent)
+            winners.append(focus if meeting["won"] else opponent)
+
+    linked["Match Round"] = rounds
+    linked["Match Opponent"] = opponents
+    linked["Match Winner"] = winners
+    return linked
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag headlines with the players they mention")
+    parser.add_argument("headlines", nargs="*", help="Headlines to tag")
+    parser.add_argument("--check", action="store_true", help="List players a headline using their short surname doesn't link to")
+    args = parser.parse_args()
+
+    for headline in args.headlines:
+        print(f"{headline}: {', '.join(tag_headline(headline)) or 'no players'}")
+    if args.check:
+        unlinked = unlinked_surnames()
+        for player_name in unlinked:
+            print(f"Not linked by surname: {player_name}")
+        print(f"{len(unlinked)} players not linked by their surname")
+        sys.exit(1 if unlinked else 0)
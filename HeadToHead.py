@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+import pandas as pd
+from MatchStore import available_years
+from StatsCube import year_player_matches, source_signature
+
+#############################
+# HEAD TO HEAD INDEX
+#############################
+
+# Every player-match row across all years, grouped by (player_id, opponent_id) pair
+# Each pair's meetings are one contiguous block in date order, found through the offsets like PlayerMatchIndex
+# Opponent rank and points are the ones the opponent held at the time of each match
+class HeadToHeadIndex:
+    def __init__(self, long_df):
+        long_df = long_df.sort_values(["player_id", "opponent_id", "tourney_date", "match_num"], kind="stable")
+        self.meetings_df = long_df.reset_index(drop=True)
+
+        # Start and end offsets of each pair's block
+        player_ids = self.meetings_df["player_id"].to_numpy(dtype=np.int64)
+        opponent_ids = self.meetings_df["opponent_id"].to_numpy(dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, (player_ids[1:] != player_ids[:-1]) | (opponent_ids[1:] != opponent_ids[:-1])])
+        ends = np.append(starts[1:], len(player_ids))
+        self.offsets = {
+            (int(player_ids[start]), int(opponent_ids[start])): (int(start), int(end))
+            for start, end in zip(starts, ends)
+        }
+
+        self.name_to_id = dict(zip(self.meetings_df["player_name"].astype(str), player_ids.tolist()))
+
+    def player_id(self, player):
+        return self.name_to_id.get(player) if isinstance(player, str) else player
+
+    # Every meeting between two players from the first player's point of view
+    # before limits it to matches at earlier tournaments, i.e. the head to head going into a match
+    def meetings(self, player, opponent, before=None):
+        key = (self.player_id(player), self.player_id(opponent))
+        start, end = self.offsets.get(key, (0, 0))
+        block = self.meetings_df.iloc[start:end]
+        if before is not None:
+            block = block[block["tourney_date"] < pd.Timestamp(before)]
+        return block
+
+    # Head to head record as plain counts
+    def record(self, player, opponent, before=None):
+        block = self.meetings(player, opponent, before)
+        wins = int(block["won"].sum())
+        return {
+            "Meetings": len(block),
+            "Wins": wins,
+            "Losses": len(block) - wins,
+            "Last Meeting": block["tourney_date"].max() if not block.empty else None,
+        }
+
+# Index over every year in Statistics, shared by every session and rebuilt when the match files change
+_head_to_head = None
+_head_to_head_lock = threading.Lock()
+
+def get_head_to_head():
+    global _head_to_head
+    with _head_to_head_lock:
+        signature = source_signature()
+        if _head_to_head is None or _head_to_head[0] != signature:
+            long_df = pd.concat([year_player_matches(year) for year in available_years()], ignore_index=True)
+            _head_to_head = (signature, HeadToHeadIndex(long_df))
+        return _head_to_head[1]
+
+# Head to head going into each of a player's matches, lined up with the raw match rows
+# e.g. "2-1" means the player had won two and lost one of their earlier meetings
+def head_to_head_before(player_name, matches):
+    index = get_head_to_head()
+    player_id = index.player_id(player_name)
+    records = []
+    for match in matches.itertuples(index=False):
+        opponent_id = match.loser_id if match.winner_id == player_id else match.winner_id
+        record = index.record(player_id, int(opponent_id), before=match.tourney_date)
+        records.append(f"{record['Wins']}-{record['Losses']}")
+    return records
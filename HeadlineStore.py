@@ -0,0 +1,268 @@
+import os
+import re
+import zlib
+import sqlite3
+import argparse
+import threading
+from contextlib import closing
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from TournamentIndex import resolve_tournament_key
+
+#############################
+# HEADLINE CORPUS STORE
+#############################
+
+# Every scraped headline is kept in one append-only SQLite database
+# Headlines are de-duplicated on normalised text, full-text indexed with FTS5,
+# and rewordings of the same story are grouped into clusters with MinHash LSH
+HEADLINE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scraped Headlines", "headlines.db")
+
+# MinHash signature length, split into LSH bands of BAND_ROWS values
+# 16 bands of 4 rows make two headlines with ~50% shingle overlap likely to share a band
+MINHASH_PERMUTATIONS = 64
+BAND_ROWS = 4
+SHINGLE_SIZE = 4
+
+# Estimated Jaccard similarity at or above which two headlines are the same story
+CLUSTER_THRESHOLD = 0.6
+
+# Hash functions h(x) = (a * x + b) mod p, fixed so signatures stay comparable across runs
+# a < 2^31 and 32 bit shingle hashes keep a * x + b inside uint64
+MERSENNE_PRIME = (1 << 61) - 1
+_hash_rng = np.random.default_rng(1)
+HASH_A = _hash_rng.integers(1, 1 << 31, MINHASH_PERMUTATIONS, dtype=np.uint64)
+HASH_B = _hash_rng.integers(0, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS headlines (
+    headline_id INTEGER PRIMARY KEY,
+    normalised TEXT NOT NULL UNIQUE,
+    headline TEXT NOT NULL,
+    url TEXT,
+    source TEXT,
+    first_seen TEXT NOT NULL,
+    cluster_id INTEGER,
+    minhash BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS headline_queries (
+    headline_id INTEGER NOT NULL REFERENCES headlines(headline_id),
+    player_name TEXT NOT NULL,
+    tournament_key INTEGER,
+    year INTEGER NOT NULL,
+    queried_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS headline_sentiment (
+    headline_id INTEGER NOT NULL REFERENCES headlines(headline_id),
+    model_version TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    prob_positive REAL,
+    prob_neutral REAL,
+    prob_negative REAL,
+    scored_at TEXT NOT NULL,
+    PRIMARY KEY (headline_id, model_version)
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    headline_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lsh_bucket_lookup ON lsh_buckets (band, bucket);
+-- Tournaments missing from the index have no key, IFNULL keeps their queries unique too
+CREATE UNIQUE INDEX IF NOT EXISTS query_unique ON headline_queries (player_name, IFNULL(tournament_key, -1), year, headline_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS headlines_fts USING fts5(headline, content='headlines', content_rowid='headline_id');
+CREATE TRIGGER IF NOT EXISTS headlines_fts_insert AFTER INSERT ON headlines BEGIN
+    INSERT INTO headlines_fts(rowid, headline) VALUES (new.headline_id, new.headline);
+END;
+"""
+
+# Writes from several sessions are serialised, reads go straight to the database
+_write_lock = threading.Lock()
+
+def connect(db_path=HEADLINE_DB):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+# Lower case words only, so punctuation and spacing differences are the same headline
+def normalise_headline(text):
+    return " ".join(re.sub(r"[^\w]+", " ", str(text).lower()).split())
+
+# MinHash signature over character shingles of the normalised headline
+def minhash_signature(normalised):
+    text = f" {normalised} "
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    values = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+    # Every hash function applied to every shingle in one step, the minimum per function is the signature
+    hashed = (np.outer(HASH_A, values) + HASH_B[:, None]) % MERSENNE_PRIME
+    return hashed.min(axis=1)
+
+def band_buckets(signature):
+    bands = signature.reshape(-1, BAND_ROWS)
+    return [zlib.crc32(band.tobytes()) for band in bands]
+
+# Cluster for a new headline, the cluster of its most similar existing headline above the threshold,
+# otherwise a new cluster of its own
+def find_cluster(connection, signature):
+    candidates = set()
+    for band, bucket in enumerate(band_buckets(signature)):
+        rows = connection.execute("SELECT headline_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket))
+        candidates.update(row[0] for row in rows)
+    if not candidates:
+        return None
+
+    placeholders = ",".join("?" * len(candidates))
+    rows = connection.execute(
+        f"SELECT cluster_id, minhash FROM headlines WHERE headline_id IN ({placeholders})", list(candidates)
+    ).fetchall()
+    best_cluster, best_similarity = None, CLUSTER_THRESHOLD
+    for cluster_id, stored in rows:
+        similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint64) == signature))
+        if similarity >= best_similarity:
+            best_cluster, best_similarity = cluster_id, similarity
+    return best_cluster
+
+# Add scraped headlines for an analysis, headlines already in the store are only linked to the new query
+# Returns the DataFrame with headline_id and cluster_id columns added
+def add_headlines(headlines_df, player_name, tournament, year, db_path=HEADLINE_DB):
+    tournament_key = resolve_tournament_key(tournament)
+    now = datetime.now().isoformat(timespec="seconds")
+    headline_ids, cluster_ids = [], []
+
+    with _write_lock, closing(connect(db_path)) as connection, connection:
+        for row in headlines_df.itertuples(index=False):
+            normalised = normalise_headline(row.Headline)
+            existing = connection.execute(
+                "SELECT headline_id, cluster_id FROM headlines WHERE normalised = ?", (normalised,)
+            ).fetchone()
+
+            if existing is None:
+                signature = minhash_signature(normalised)
+                cluster_id = find_cluster(connection, signature)
+                cursor = connection.execute(
+                    "INSERT INTO headlines (normalised, headline, url, source, first_seen, cluster_id, minhash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (normalised, row.Headline, getattr(row, "URL", None), getattr(row, "Source", None), now,
+                     cluster_id, signature.tobytes()),
+                )
+                headline_id = cursor.lastrowid
+                if cluster_id is None:
+                    cluster_id = headline_id
+                    connection.execute("UPDATE headlines SET cluster_id = ? WHERE headline_id = ?", (cluster_id, headline_id))
+                connection.executemany(
+                    "INSERT INTO lsh_buckets (band, bucket, headline_id) VALUES (?, ?, ?)",
+                    [(band, bucket, headline_id) for band, bucket in enumerate(band_buckets(signature))],
+                )
+            else:
+                headline_id, cluster_id = existing
+
+            connection.execute(
+                "INSERT OR IGNORE INTO headline_queries (headline_id, player_name, tournament_key, year, queried_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (headline_id, player_name, tournament_key, int(year), now),
+            )
+            headline_ids.append(headline_id)
+            cluster_ids.append(cluster_id)
+
+    stored = headlines_df.copy()
+    stored["headline_id"] = headline_ids
+    stored["cluster_id"] = cluster_ids
+    return stored
+
+# Cache the model's sentiment for stored headlines, one row per headline and model version
+# headlines_df needs headline_id and Sentiment, plus "Prob Positive" etc when available
+def record_sentiment(headlines_df, model_version, db_path=HEADLINE_DB):
+    scored = headlines_df.dropna(subset=["headline_id", "Sentiment"])
+    scored = scored[scored["Sentiment"] != ""]
+    if scored.empty:
+        return 0
+
+    now = datetime.now().isoformat(timespec="seconds")
+    probability = lambda row, label: None if pd.isna(row.get(f"Prob {label}")) else float(row.get(f"Prob {label}"))
+    rows = [
+        (int(row["headline_id"]), str(model_version), row["Sentiment"],
+         probability(row, "Positive"), probability(row, "Neutral"), probability(row, "Negative"), now)
+        for _, row in scored.iterrows()
+    ]
+    with _write_lock, closing(connect(db_path)) as connection, connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO headline_sentiment "
+            "(headline_id, model_version, sentiment, prob_positive, prob_neutral, prob_negative, scored_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    return len(rows)
+
+# Headlines already stored for an analysis, in the shape scrape_bbc_sport returns
+def stored_headlines(player_name, tournament, year, db_path=HEADLINE_DB):
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=["Headline", "Source", "URL", "Sentiment", "headline_id", "cluster_id"])
+    with closing(connect(db_path)) as connection:
+        stored = pd.read_sql_query(
+            "SELECT h.headline AS Headline, h.source AS Source, h.url AS URL, '' AS Sentiment, "
+            "h.headline_id, h.cluster_id FROM headlines h "
+            "JOIN headline_queries q ON q.headline_id = h.headline_id "
+            "WHERE q.player_name = ? AND q.tournament_key IS ? AND q.year = ? ORDER BY h.headline_id",
+            connection, params=(player_name, resolve_tournament_key(tournament), int(year)),
+        )
+    stored["URL"] = stored["URL"].fillna("")
+    return stored
+
+# Full-text search over every stored headline, e.g. search_headlines("sinner AND injury")
+# Optionally narrowed to the headlines returned for one player, tournament or year
+def search_headlines(query, player_name=None, tournament=None, year=None, limit=100, db_path=HEADLINE_DB):
+    if not os.path.exists(db_path):
+        return pd.DataFrame()
+    conditions, params = ["headlines_fts MATCH ?"], [query]
+    if player_name is not None:
+        conditions.append("q.player_name = ?")
+        params.append(player_name)
+    if tournament is not None:
+        conditions.append("q.tournament_key = ?")
+        params.append(resolve_tournament_key(tournament))
+    if year is not None:
+        conditions.append("q.year = ?")
+        params.append(int(year))
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query(
+            "SELECT DISTINCT h.headline_id, h.headline AS Headline, h.url AS URL, h.source AS Source, "
+            "h.first_seen, h.cluster_id, bm25(headlines_fts) AS rank FROM headlines_fts "
+            "JOIN headlines h ON h.headline_id = headlines_fts.rowid "
+            "LEFT JOIN headline_queries q ON q.headline_id = h.headline_id "
+            f"WHERE {' AND '.join(conditions)} ORDER BY rank LIMIT ?",
+            connection, params=params + [limit],
+        )
+
+# Scored headlines for every analysis, one row per story so rewordings don't count twice
+# Uses the latest sentiment recorded for each headline, same columns as the old sentiment history
+def sentiment_history(collapse_clusters=True, db_path=HEADLINE_DB):
+    columns = ["player_name", "tournament_key", "year", "Headline", "Sentiment", "model_version", "scored_at", "cluster_id"]
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=columns)
+    with closing(connect(db_path)) as connection:
+        history = pd.read_sql_query(
+            "SELECT q.player_name, q.tournament_key, q.year, h.headline AS Headline, s.sentiment AS Sentiment, "
+            "s.model_version, s.scored_at, h.cluster_id FROM headline_queries q "
+            "JOIN headlines h ON h.headline_id = q.headline_id "
+            "JOIN headline_sentiment s ON s.headline_id = q.headline_id "
+            "ORDER BY s.scored_at",
+            connection,
+        )
+    history = history.drop_duplicates(["player_name", "tournament_key", "year", "Headline"], keep="last")
+    if collapse_clusters:
+        history = history.drop_duplicates(["player_name", "tournament_key", "year", "cluster_id"], keep="last")
+    return history[columns]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the stored headline corpus")
+    parser.add_argument("query", help="FTS5 query, e.g. 'alcaraz AND final'")
+    parser.add_argument("--player")
+    parser.add_argument("--tournament")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    results = search_headlines(args.query, args.player, args.tournament, args.year, args.limit)
+    print(results.to_string(index=False) if not results.empty else "No matching headlines")
@@ -0,0 +1,184 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+#############################
+# BACKGROUND JOB QUEUE
+#############################
+
+# Long running work (scraping, scoring) is submitted to a shared worker pool instead of running in a
+# Streamlit script, so it survives reruns and widget interaction, and every session queues on the same workers
+# Sessions keep the job ID and poll the job's status, progress events and result
+
+# Scraping is network bound and scoring mostly runs in numpy, so a few threads keep every session moving
+DEFAULT_WORKERS = 4
+
+# Finished jobs are forgotten after this long, their sessions will have collected the result by then
+FINISHED_JOB_TTL_SECONDS = 60 * 60
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATUSES = {DONE, FAILED, CANCELLED}
+
+# Raised inside a job to stop it once cancellation has been requested
+class JobCancelled(Exception):
+    pass
+
+# Handle a running job uses to report progress and check for cancellation
+class JobContext:
+    def __init__(self, job):
+        self._job = job
+
+    # Progress is a fraction from 0 to 1, every report is kept as an event
+    def report(self, progress, message=""):
+        with self._job.lock:
+            self._job.progress = max(0.0, min(1.0, float(progress)))
+            self._job.message = message
+            self._job.events.append({"time": time.time(), "progress": self._job.progress, "message": message})
+
+    def cancelled(self):
+        return self._job.cancel_requested.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled()
+
+class Job:
+    def __init__(self, kind, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self.lock = threading.Lock()
+
+    # Copy of the job's state that is safe to read while it runs
+    def snapshot(self):
+        with self.lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "label": self.label,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "error": self.error,
+                "submitted_at": self.submitted_at,
+                "finished_at": self.finished_at,
+            }
+
+class JobQueue:
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    # Queue func(context, *args, **kwargs) and return its job ID
+    def submit(self, kind, func, *args, label="", **kwargs):
+        job = Job(kind, label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        # Jobs cancelled while queued never start
+        if job.cancel_requested.is_set():
+            self._finish(job, CANCELLED, message="Cancelled before starting")
+            return
+        with job.lock:
+            job.status = RUNNING
+            job.message = "Running"
+        try:
+            result = func(JobContext(job), *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED, message="Cancelled")
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+            self._finish(job, FAILED, error=str(e), message="Failed")
+        else:
+            # A job that noticed cancellation and returned early still counts as cancelled
+            if job.cancel_requested.is_set():
+                self._finish(job, CANCELLED, result=result, message="Cancelled")
+            else:
+                self._finish(job, DONE, result=result, message="Complete", progress=1.0)
+
+    def _finish(self, job, status, result=None, error=None, message="", progress=None):
+        with job.lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.message = message
+            if progress is not None:
+                job.progress = progress
+            job.finished_at = time.time()
+            job.events.append({"time": job.finished_at, "progress": job.progress, "message": message})
+
+    # Forget finished jobs whose results have had time to be collected, called with the lock held
+    def _prune(self):
+        cutoff = time.time() - FINISHED_JOB_TTL_SECONDS
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Status snapshot of one job, None if the ID is unknown or has been pruned
+    def status(self, job_id):
+        job = self._job(job_id)
+        return None if job is None else job.snapshot()
+
+    # Progress events after the first `since`, so a poller only receives what's new
+    def events(self, job_id, since=0):
+        job = self._job(job_id)
+        if job is None:
+            return []
+        with job.lock:
+            return list(job.events[since:])
+
+    def result(self, job_id):
+        job = self._job(job_id)
+        return None if job is None else job.result
+
+    # Request cancellation, a queued job is skipped and a running job stops at its next check
+    def cancel(self, job_id):
+        job = self._job(job_id)
+        if job is None:
+            return False
+        job.cancel_requested.set()
+        return True
+
+    def jobs(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in jobs]
+
+    def shutdown(self, cancel_running=False):
+        if cancel_running:
+            for job in self.jobs():
+                self.cancel(job["id"])
+        self._executor.shutdown(wait=True)
+
+# One queue per process, shared by every dashboard session
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import closing
+from datetime import datetime
+import pandas as pd
+from WebscrapingFunc import scrape_bbc_sport, load_ignored_headlines
+from SentimentModel import load_model_bundle
+from ActiveLearning import score_corpus
+from HeadlineStore import normalise_headline
+from DataRetrievalFunc import load_match_data
+from StatsCube import year_fingerprint
+from Pipeline import retrieve_stats, select_baseline
+from BiasDetection import performance_scores, sentiment_scores
+
+logger = logging.getLogger(__name__)
+
+#############################
+# LIVE TOURNAMENT TRACKING
+#############################
+
+# Tracked players are rescraped on an interval during a tournament
+# Only headlines not seen before are scored, and running counts are kept so each update
+# costs time for the new headlines alone, every update appends one point to the player's series
+LIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Scraped Headlines", "live")
+TRACKERS_FILE = os.path.join(LIVE_DIR, "trackers.json")
+# Headlines each tracker has already scored, one row per tracker and normalised headline hash
+# Headlines are normalised the way the headline store does it, so both agree on what counts as the same headline
+# Rows are only ever inserted, so an update checks its own batch instead of reloading everything seen so far
+SEEN_DB = os.path.join(LIVE_DIR, "seen.db")
+
+# Newest results are on the first pages, so a couple is enough between updates
+LIVE_PAGES = 2
+DEFAULT_INTERVAL_MINUTES = 60
+
+SERIES_COLUMNS = [
+    "timestamp", "headlines", "new_headlines", "positive", "neutral", "negative",
+    "sentiment_score", "performance_score", "bias_score",
+]
+
+SEEN_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_headlines (
+    tracker TEXT NOT NULL,
+    headline_hash TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    PRIMARY KEY (tracker, headline_hash)
+) WITHOUT ROWID;
+"""
+
+_trackers_lock = threading.Lock()
+
+# File name friendly identifier, e.g. "jannik-sinner_wimbledon_2024"
+def tracker_id(player_name, tournament, year):
+    slug = lambda text: re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+    return f"{slug(player_name)}_{slug(tournament)}_{year}"
+
+def state_path(tracker):
+    return os.path.join(LIVE_DIR, f"{tracker}_state.json")
+
+def series_path(tracker):
+    return os.path.join(LIVE_DIR, f"{tracker}_series.csv")
+
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=1)
+    os.replace(tmp_path, path)
+
+def load_trackers():
+    if not os.path.exists(TRACKERS_FILE):
+        return {}
+    with open(TRACKERS_FILE, encoding="utf-8") as file:
+        return json.load(file)
+
+def add_tracker(player_name, tournament, year):
+    with _trackers_lock:
+        os.makedirs(LIVE_DIR, exist_ok=True)
+        trackers = load_trackers()
+        tracker = tracker_id(player_name, tournament, year)
+        trackers[tracker] = {"player_name": player_name, "tournament": tournament, "year": int(year)}
+        write_json(TRACKERS_FILE, trackers)
+    return tracker
+
+def remove_tracker(tracker):
+    with _trackers_lock:
+        trackers = load_trackers()
+        if trackers.pop(tracker, None) is not None:
+            write_json(TRACKERS_FILE, trackers)
+
+def connect_seen(db_path=SEEN_DB):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SEEN_SCHEMA)
+    return connection
+
+def headline_hash(normalised):
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()
+
+# Which of the hashes the tracker has already scored
+def seen_hashes(tracker, hashes, db_path=SEEN_DB):
+    hashes = list(hashes)
+    seen = set()
+    with closing(connect_seen(db_path)) as connection:
+        # Checked in chunks to stay under SQLite's bound parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = connection.execute(
+                f"SELECT headline_hash FROM seen_headlines WHERE tracker = ? AND headline_hash IN ({', '.join('?' * len(chunk))})",
+                [tracker, *chunk],
+            ).fetchall()
+            seen.update(row[0] for row in rows)
+    return seen
+
+def mark_seen(tracker, hashes, db_path=SEEN_DB):
+    now = datetime.now().isoformat(timespec="seconds")
+    with closing(connect_seen(db_path)) as connection, connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO seen_headlines (tracker, headline_hash, first_seen) VALUES (?, ?, ?)",
+            [(tracker, hash_value, now) for hash_value in hashes],
+        )
+
+# Running aggregates for a tracker, everything an update needs without rereading its history
+def load_state(tracker):
+    if not os.path.exists(state_path(tracker)):
+        return {"counts": {"Positive": 0, "Neutral": 0, "Negative": 0}, "performance": None, "stats_signature": None}
+    with open(state_path(tracker), encoding="utf-8") as file:
+        state = json.load(file)
+    # Older states kept the seen headlines in the JSON, they are moved into the seen table once
+    # Those were only lowercased and whitespace collapsed, so they are normalised again before hashing
+    if "seen" in state:
+        mark_seen(tracker, {headline_hash(normalise_headline(normalised)) for normalised in state.pop("seen")})
+        write_json(state_path(tracker), state)
+    return state
+
+def load_series(tracker):
+    if not os.path.exists(series_path(tracker)):
+        return pd.DataFrame(columns=SERIES_COLUMNS)
+    return pd.read_csv(series_path(tracker), parse_dates=["timestamp"])
+
+# Performance score from the player's matches so far, only recalculated when the match data has changed
+# Stats and tour averages come from the pipeline's stages, so the score matches a full analysis of the same data
+def current_performance(config, state):
+    # Loading the year ingests a new match file into the store before it is fingerprinted
+    if load_match_data(config["year"]).empty:
+        return None
+    # New matches only arrive with a new version of the year's match file
+    signature = year_fingerprint(config["year"])
+    if state["performance"] is not None and state["stats_signature"] == signature:
+        return state["performance"]
+
+    stats = retrieve_stats(config["player_name"], config["tournament"], config["year"])
+    tour_averages = select_baseline(config["tournament"], config["year"])
+    if stats.tournament_stats is None or not tour_averages:
+        performance = None
+    else:
+        performance = float(performance_scores(pd.DataFrame([{**stats.tournament_stats, **tour_averages}]))[0])
+
+    state["performance"] = performance
+    state["stats_signature"] = signature
+    return performance
+
+# Scrape, score the new headlines and append a point to the tracker's series
+def update_tracker(tracker, config, bundle=None, max_pages=LIVE_PAGES):
+    bundle = load_model_bundle() if bundle is None else bundle
+    state = load_state(tracker)
+
+    scraped = scrape_bbc_sport(config["player_name"], config["tournament"], config["year"], max_pages, load_ignored_headlines())
+    new_headlines = pd.DataFrame(columns=["Headline"])
+    new_hashes = []
+    if not scraped.empty:
+        hashes = scraped["Headline"].map(normalise_headline).map(headline_hash)
+        # Repeats within the batch are dropped on the normalised text as well as headlines seen in earlier updates
+        is_new = ~hashes.isin(seen_hashes(tracker, hashes.unique())) & ~hashes.duplicated()
+        new_headlines = scraped[is_new]
+        new_hashes = hashes[is_new].tolist()
+
+    # Only the headlines not seen before are featurised and scored
+    if not new_headlines.empty:
+        scored = score_corpus(new_headlines[["Headline"]].reset_index(drop=True), bundle)
+        for sentiment, count in scored["Predicted"].value_counts().items():
+            state["counts"][sentiment] = state["counts"].get(sentiment, 0) + int(count)
+
+    counts = state["counts"]
+    sentiment_score = float(sentiment_scores([counts["Positive"]], [counts["Negative"]])[0])
+    performance_score = current_performance(config, state)
+
+    point = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "headlines": sum(counts.values()),
+        "new_headlines": len(new_headlines),
+        "positive": counts["Positive"],
+        "neutral": counts["Neutral"],
+        "negative": counts["Negative"],
+        "sentiment_score": sentiment_score,
+        "performance_score": performance_score,
+        "bias_score": None if performance_score is None else sentiment_score - performance_score,
+    }
+
+    # Headlines are marked seen before the counts and series are written, so an update interrupted in between
+    # can at worst leave a few headlines uncounted, never count them twice on the next update
+    mark_seen(tracker, new_hashes)
+    os.makedirs(LIVE_DIR, exist_ok=True)
+    write_json(state_path(tracker), state)
+    pd.DataFrame([point], columns=SERIES_COLUMNS).to_csv(
+        series_path(tracker), mode="a", header=not os.path.exists(series_path(tracker)), index=False
+    )
+
+    logger.info(f"{tracker}: {len(new_headlines)} new headlines, sentiment {sentiment_score:.2f}")
+    return point
+
+def update_all(max_pages=LIVE_PAGES):
+    bundle = load_model_bundle()
+    return {tracker: update_tracker(tracker, config, bundle, max_pages) for tracker, config in load_trackers().items()}
+
+# Update every tracked player, then wait for the next interval
+# iterations=None keeps watching until stopped
+def watch(interval_minutes=DEFAULT_INTERVAL_MINUTES, iterations=None, max_pages=LIVE_PAGES):
+    completed = 0
+    while iterations is None or completed < iterations:
+        try:
+            update_all(max_pages)
+        except Exception as e:
+            # One bad update shouldn't stop the watch, it is tried again next interval
+            logger.error(f"Live update failed: {str(e)}")
+        completed += 1
+        if iterations is None or completed < iterations:
+            time.sleep(interval_minutes * 60)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Track media sentiment against performance during a tournament")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = commands.add_parser("add", help="Start tracking a player at a tournament")
+    add_parser.add_argument("player_name")
+    add_parser.add_argument("tournament")
+    add_parser.add_argument("year", type=int)
+
+    remove_parser = commands.add_parser("remove", help="Stop tracking")
+    remove_parser.add_argument("tracker")
+
+    commands.add_parser("list", help="Show tracked players")
+
+    watch_parser = commands.add_parser("watch", help="Update every tracked player on an interval")
+    watch_parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_MINUTES, help="Minutes between updates")
+    watch_parser.add_argument("--iterations", type=int, default=None, help="Stop after this many updates")
+    watch_parser.add_argument("--pages", type=int, default=LIVE_PAGES, help="Search result pages to scrape per update")
+
+    args = parser.parse_args()
+    if args.command == "add":
+        print(f"Tracking {add_tracker(args.player_name, args.tournament, args.year)}")
+    elif args.command == "remove":
+        remove_tracker(args.tracker)
+    elif args.command == "list":
+        for tracker, config in load_trackers().items():
+            print(f"{tracker}: {config['player_name']} at {config['tournament']} {config['year']}")
+    else:
+        watch(args.interval, args.iterations, args.pages)
@@ -0,0 +1,143 @@
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from MatchStore import available_years, ingest_all, store_path
+from PlayerIndex import PlayerMatchIndex, summarise_block
+from StatsCube import aggregate_player_stats
+from TournamentIndex import resolve_tournament_key
+
+#############################
+# MULTI-YEAR MATCH QUERIES
+#############################
+
+# Every year in the match store is scanned as one lazy dataset
+# Filters are pushed down to the Parquet reader so row groups that can't match are skipped,
+# and only the requested columns are read from disk
+
+# Columns needed to rebuild a player's matches in the long player-match format
+CAREER_COLUMNS = [
+    "tourney_id", "tournament_key", "tourney_name", "surface", "tourney_level", "tourney_date", "match_num", "round",
+    "best_of", "score", "minutes",
+    "winner_id", "winner_name", "winner_seed", "winner_rank", "winner_rank_points",
+    "loser_id", "loser_name", "loser_seed", "loser_rank", "loser_rank_points",
+    "w_ace", "w_df", "w_svpt", "w_1stIn", "w_1stWon", "w_2ndWon", "w_SvGms", "w_bpSaved", "w_bpFaced",
+    "l_ace", "l_df", "l_svpt", "l_1stIn", "l_1stWon", "l_2ndWon", "l_SvGms", "l_bpSaved", "l_bpFaced",
+]
+
+# Player names to IDs across every year, built from a four column scan and kept for the process
+# One lookup per tuple of datasets, each remembering the years it was built from
+_player_ids = {}
+_query_lock = threading.Lock()
+
+# Lazy dataset over every ingested year, nothing is read until a scan
+# Other archives such as "wta" or "atp_qual_chall" can be scanned alongside or instead of the main tour
+def match_dataset(datasets=("atp",)):
+    ingest_all(datasets)
+    # Years skipped as malformed have no store file and are left out of the scan
+    paths = [store_path(year, dataset) for dataset in datasets for year in available_years(dataset)
+             if os.path.exists(store_path(year, dataset))]
+    return ds.dataset(paths, format="parquet")
+
+def player_ids(names, datasets=("atp",)):
+    datasets = tuple(datasets)
+    with _query_lock:
+        years = [available_years(dataset) for dataset in datasets]
+        cached = _player_ids.get(datasets)
+        if cached is None or cached[0] != years:
+            lookup = {}
+            table = match_dataset(datasets).to_table(columns=["winner_id", "winner_name", "loser_id", "loser_name"])
+            for side in ("winner", "loser"):
+                ids = table.column(f"{side}_id").to_pylist()
+                player_names = table.column(f"{side}_name").to_pylist()
+                lookup.update(zip(player_names, ids))
+            cached = (years, lookup)
+            _player_ids[datasets] = cached
+    lookup = cached[1]
+    return [lookup[name] for name in names if name in lookup]
+
+# Build the pushdown filter from the optional query arguments
+def build_filter(schema, players=None, levels=None, surfaces=None, tournaments=None, date_from=None, date_to=None,
+                 datasets=("atp",)):
+    conditions = []
+
+    # Players are matched by ID so the filter works on plain integer columns
+    if players is not None:
+        ids = player_ids(players, datasets)
+        conditions.append(ds.field("winner_id").isin(ids) | ds.field("loser_id").isin(ids))
+
+    if levels is not None:
+        conditions.append(ds.field("tourney_level").isin(list(levels)))
+    if surfaces is not None:
+        conditions.append(ds.field("surface").isin(list(surfaces)))
+    # Tournament names and aliases are filtered through their integer keys
+    if tournaments is not None:
+        keys = [resolve_tournament_key(name) for name in tournaments]
+        conditions.append(ds.field("tournament_key").isin([key for key in keys if key is not None]))
+
+    date_type = schema.field("tourney_date").type
+    if date_from is not None:
+        conditions.append(ds.field("tourney_date") >= pa.scalar(pd.Timestamp(date_from).to_pydatetime(), type=date_type))
+    if date_to is not None:
+        conditions.append(ds.field("tourney_date") <= pa.scalar(pd.Timestamp(date_to).to_pydatetime(), type=date_type))
+
+    if not conditions:
+        return None
+
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition
+    return combined
+
+# Scan matches across every year, returning only the requested columns of the matching rows
+# e.g. scan_matches(players=["Jannik Sinner"], levels=["G"], date_from="2021-01-01", columns=["tourney_name", "round"])
+def scan_matches(columns=None, players=None, levels=None, surfaces=None, tournaments=None, date_from=None, date_to=None,
+                 datasets=("atp",)):
+    dataset = match_dataset(datasets)
+    filter_expression = build_filter(dataset.schema, players, levels, surfaces, tournaments, date_from, date_to, datasets)
+    return dataset.to_table(columns=columns, filter=filter_expression).to_pandas()
+
+# One player's matches across the requested span in the long player-match format
+def career_matches(player_name, levels=None, surfaces=None, tournaments=None, date_from=None, date_to=None,
+                   datasets=("atp",)):
+    matches = scan_matches(CAREER_COLUMNS, [player_name], levels, surfaces, tournaments, date_from, date_to, datasets)
+    if matches.empty:
+        return pd.DataFrame()
+    return PlayerMatchIndex(matches).player_matches(player_name)
+
+# Career span stats, same keys as the yearly stats with a "Career" prefix
+def career_stats(player_name, levels=None, surfaces=None, tournaments=None, date_from=None, date_to=None,
+                 datasets=("atp",)):
+    block = career_matches(player_name, levels, surfaces, tournaments, date_from, date_to, datasets)
+    if block.empty:
+        return None
+
+    stats = summarise_block(block, "Career")
+    stats["First Match"] = block["tourney_date"].min()
+    stats["Last Match"] = block["tourney_date"].max()
+    stats["Tournaments Played"] = block["tourney_id"].nunique()
+    return stats
+
+# Trend series for the bias analysis, one row per season or per tournament played
+def trend_series(player_name, by="year", levels=None, surfaces=None, tournaments=None, date_from=None, date_to=None,
+                 datasets=("atp",)):
+    block = career_matches(player_name, levels, surfaces, tournaments, date_from, date_to, datasets)
+    if block.empty:
+        return pd.DataFrame()
+
+    block = block.assign(year=block["tourney_date"].dt.year, tourney_name=block["tourney_name"].astype(str))
+    if by == "tournament":
+        keys = ["player_id", "year", "tourney_name"]
+    else:
+        keys = ["player_id", "year"]
+
+    series = aggregate_player_stats(block, keys, "Period")
+
+    # Average ranking going into the matches shows how expectations moved over time
+    series["Avg Rank"] = block.groupby(keys, sort=False, observed=True)["rank"].mean()
+    if by == "tournament":
+        series["Start Date"] = block.groupby(keys, sort=False, observed=True)["tourney_date"].min()
+        series = series.sort_values("Start Date")
+
+    return series.reset_index().drop(columns=["player_id"])
@@ -0,0 +1,297 @@
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from TournamentIndex import register_tournaments
+from SharedCache import MATCH_FRAMES, path_fingerprint, invalidate
+
+logger = logging.getLogger(__name__)
+
+#############################
+# COLUMNAR MATCH STORE
+#############################
+
+# Raw Sackmann CSVs live in Statistics, typed Parquet copies are written to Statistics/store
+STATISTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Statistics")
+STORE_DIR = os.path.join(STATISTICS_DIR, "store")
+STORE_MANIFEST = os.path.join(STORE_DIR, "manifest.json")
+
+# Every Sackmann archive the store can ingest, by dataset name
+# "atp" is the main tour and the default everywhere, the dashboard's stats all come from it
+DATASET_FILES = {
+    "atp": "atp_matches_{year}.csv",
+    "atp_qual_chall": "atp_matches_qual_chall_{year}.csv",
+    "atp_futures": "atp_matches_futures_{year}.csv",
+    "wta": "wta_matches_{year}.csv",
+    "wta_qual_itf": "wta_matches_qual_itf_{year}.csv",
+}
+DATASET_PATTERNS = {
+    dataset: re.compile("^" + re.escape(file_name).replace(re.escape("{year}"), r"(\d{4})") + "$")
+    for dataset, file_name in DATASET_FILES.items()
+}
+
+# Bumped whenever the stored columns change so older store files are re-ingested
+STORE_FORMAT = 3
+
+# Low cardinality text columns stored as categories
+CATEGORY_COLUMNS = [
+    "tourney_id", "tourney_name", "surface", "tourney_level", "round",
+    "winner_entry", "winner_hand", "winner_ioc",
+    "loser_entry", "loser_hand", "loser_ioc",
+]
+
+# Player names share one set of categories so winner_name and loser_name compare directly
+PLAYER_NAME_COLUMNS = ["winner_name", "loser_name"]
+
+# Smallest integer type that fits each column, nullable as retirements and walkovers leave gaps
+INTEGER_DTYPES = {
+    "draw_size": "Int16", "match_num": "Int16", "best_of": "Int8", "minutes": "Int16",
+    "winner_id": "Int32", "winner_seed": "Int16", "winner_ht": "Int16",
+    "loser_id": "Int32", "loser_seed": "Int16", "loser_ht": "Int16",
+    "w_ace": "Int16", "w_df": "Int16", "w_svpt": "Int16", "w_1stIn": "Int16", "w_1stWon": "Int16",
+    "w_2ndWon": "Int16", "w_SvGms": "Int16", "w_bpSaved": "Int16", "w_bpFaced": "Int16",
+    "l_ace": "Int16", "l_df": "Int16", "l_svpt": "Int16", "l_1stIn": "Int16", "l_1stWon": "Int16",
+    "l_2ndWon": "Int16", "l_SvGms": "Int16", "l_bpSaved": "Int16", "l_bpFaced": "Int16",
+    "winner_rank": "Int16", "winner_rank_points": "Int32",
+    "loser_rank": "Int16", "loser_rank_points": "Int32",
+}
+
+FLOAT_DTYPES = {"winner_age": "float32", "loser_age": "float32"}
+
+# Columns a file must have to be ingested, everything else is optional
+# Older archives have no serve stats or rankings, missing optional columns are filled with nulls
+REQUIRED_COLUMNS = [
+    "tourney_id", "tourney_name", "surface", "tourney_level", "tourney_date", "match_num", "round",
+    "winner_id", "winner_name", "loser_id", "loser_name", "score",
+]
+OPTIONAL_COLUMNS = [column for column in CATEGORY_COLUMNS + PLAYER_NAME_COLUMNS + list(INTEGER_DTYPES) + list(FLOAT_DTYPES)
+                    if column not in REQUIRED_COLUMNS]
+
+class MatchSchemaError(ValueError):
+    pass
+
+# Loaded years are kept in the shared match frame cache, keyed by (dataset, year) and the Parquet file's fingerprint
+# This lock only serialises ingests
+_store_lock = threading.Lock()
+
+def csv_path(year, dataset="atp"):
+    return os.path.join(STATISTICS_DIR, DATASET_FILES[dataset].format(year=year))
+
+def store_path(year, dataset="atp"):
+    return os.path.join(STORE_DIR, f"{dataset}_{year}.v{STORE_FORMAT}.parquet")
+
+# Years with a raw CSV available for a dataset
+def available_years(dataset="atp"):
+    years = []
+    for file_name in os.listdir(STATISTICS_DIR):
+        match = DATASET_PATTERNS[dataset].match(file_name)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+# Every (dataset, year) with a raw CSV, across all datasets
+def available_files():
+    return [(dataset, year) for dataset in DATASET_FILES for year in available_years(dataset)]
+
+# Check a file's header before parsing it, so a malformed file fails with the columns it's missing
+def validate_schema(file_path):
+    columns = pd.read_csv(file_path, nrows=0).columns
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise MatchSchemaError(f"{os.path.basename(file_path)} is missing required columns: {', '.join(missing)}")
+    return list(columns)
+
+# Parse one CSV into a typed DataFrame
+def read_typed_csv(file_path):
+    columns = validate_schema(file_path)
+
+    # Every text column is read as a plain string first, numeric columns straight into their final type
+    dtypes = {**INTEGER_DTYPES, **FLOAT_DTYPES, **{column: "string" for column in CATEGORY_COLUMNS + PLAYER_NAME_COLUMNS}}
+    df = pd.read_csv(file_path, dtype={column: dtype for column, dtype in dtypes.items() if column in columns})
+
+    # Every store file has the same columns whatever the archive had
+    for column in OPTIONAL_COLUMNS:
+        if column not in df.columns:
+            df[column] = pd.Series(pd.NA, index=df.index, dtype=dtypes[column])
+
+    # tourney_date is stored as YYYYMMDD
+    df["tourney_date"] = pd.to_datetime(df["tourney_date"].astype("string"), format="%Y%m%d")
+
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype("category")
+
+    player_names = pd.CategoricalDtype(sorted(set(df["winner_name"].dropna()) | set(df["loser_name"].dropna())))
+    for column in PLAYER_NAME_COLUMNS:
+        df[column] = df[column].astype(player_names)
+
+    return df
+
+# Arrow table with the same dictionary index width in every file
+# pandas picks int8 or int16 codes depending on how many categories a year has,
+# fixing them at int32 lets all years be scanned together as one dataset
+def to_arrow_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type)) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ], metadata=table.schema.metadata)
+    return table.cast(schema)
+
+# Tournament names and first editions in a file, read without parsing the whole file
+def file_editions(file_path):
+    validate_schema(file_path)
+    columns = ["tourney_name", "tourney_id", "tourney_level", "surface", "tourney_date"]
+    editions = pd.read_csv(file_path, usecols=columns, dtype="string").drop_duplicates("tourney_name")
+    editions["tourney_date"] = pd.to_datetime(editions["tourney_date"], format="%Y%m%d")
+    return editions
+
+# Convert one CSV into Parquet, written to a temporary file first so readers never see half a file
+# tournament_keys maps every tourney_name in the file to its key, looked up beforehand
+# so files can be converted in worker processes without them all writing to the tournament table
+def convert_file(year, dataset, tournament_keys):
+    df = read_typed_csv(csv_path(year, dataset))
+
+    # Integer tournament key from the tournament dimension table, used for every tournament filter
+    df["tournament_key"] = df["tourney_name"].astype(str).map(tournament_keys).astype("Int32")
+
+    tmp_path = store_path(year, dataset) + ".tmp"
+    pq.write_table(to_arrow_table(df), tmp_path)
+    os.replace(tmp_path, store_path(year, dataset))
+    return df
+
+def ingest_year(year, dataset="atp"):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tournament_keys = register_tournaments(file_editions(csv_path(year, dataset)), year, dataset)
+    df = convert_file(year, dataset, tournament_keys)
+    record_ingest(year, dataset)
+    # Anything cached from the year's previous data is dropped straight away rather than on its next use
+    invalidate(year)
+
+    logger.info(f"Ingested {len(df)} {dataset} matches for {year} into the match store")
+    return df
+
+# Size and modification time of each ingested CSV, a file is only re-ingested when these change
+def read_store_manifest():
+    if not os.path.exists(STORE_MANIFEST):
+        return {}
+    with open(STORE_MANIFEST, encoding="utf-8") as file:
+        return json.load(file)
+
+def file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns, STORE_FORMAT]
+
+_manifest_lock = threading.Lock()
+
+def record_ingest(year, dataset):
+    with _manifest_lock:
+        manifest = read_store_manifest()
+        manifest[os.path.basename(csv_path(year, dataset))] = file_fingerprint(csv_path(year, dataset))
+        tmp_path = STORE_MANIFEST + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(tmp_path, STORE_MANIFEST)
+
+# Only re-ingest when the CSV has changed since it was last ingested
+def needs_ingest(year, dataset="atp", manifest=None):
+    if not os.path.exists(store_path(year, dataset)):
+        return True
+    manifest = read_store_manifest() if manifest is None else manifest
+    return manifest.get(os.path.basename(csv_path(year, dataset))) != file_fingerprint(csv_path(year, dataset))
+
+# Ingest every new or changed file across the requested datasets, defaulting to all of them
+# Tournaments are registered in this process first, then files are parsed and written in parallel, one per worker
+# A malformed file is logged and skipped so it doesn't stop the rest of the archive from being ingested
+# Returns the (dataset, year) files ingested and a dict of the skipped ones with why they were skipped
+def ingest_all(datasets=None, max_workers=None):
+    manifest = read_store_manifest()
+    pending = [(dataset, year) for dataset, year in available_files()
+               if (datasets is None or dataset in datasets) and needs_ingest(year, dataset, manifest)]
+    if not pending:
+        return [], {}
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    ingested = []
+    skipped = {}
+
+    def skip(dataset, year, error):
+        logger.error(f"Skipped {os.path.basename(csv_path(year, dataset))}: {error}")
+        skipped[(dataset, year)] = str(error)
+
+    tournament_keys = {}
+    for dataset, year in pending:
+        try:
+            tournament_keys[(dataset, year)] = register_tournaments(file_editions(csv_path(year, dataset)), year, dataset)
+        except MatchSchemaError as error:
+            skip(dataset, year, error)
+    pending = [file for file in pending if file in tournament_keys]
+
+    # A single file isn't worth starting worker processes for
+    if len(pending) == 1:
+        dataset, year = pending[0]
+        try:
+            convert_file(year, dataset, tournament_keys[(dataset, year)])
+            record_ingest(year, dataset)
+            ingested.append((dataset, year))
+        except MatchSchemaError as error:
+            skip(dataset, year, error)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(convert_file, year, dataset, tournament_keys[(dataset, year)]): (dataset, year)
+                for dataset, year in pending
+            }
+            for future in as_completed(futures):
+                dataset, year = futures[future]
+                # Result is only needed to surface any error raised in the worker
+                try:
+                    future.result()
+                except MatchSchemaError as error:
+                    skip(dataset, year, error)
+                    continue
+                record_ingest(year, dataset)
+                ingested.append((dataset, year))
+
+    logger.info(f"Ingested {len(ingested)} files into the match store, skipped {len(skipped)}")
+    return ingested, skipped
+
+# Load a year's matches, parsed once per process and then served from memory
+# Every caller gets a shallow copy of the shared DataFrame, so adding, dropping or replacing columns is safe,
+# but the values are shared and must be treated as read-only, copy the frame before changing values in place
+# Raises FileNotFoundError if there is no data for the year
+def load_year(year, dataset="atp"):
+    if not os.path.exists(csv_path(year, dataset)) and not os.path.exists(store_path(year, dataset)):
+        raise FileNotFoundError(csv_path(year, dataset))
+
+    with _store_lock:
+        if os.path.exists(csv_path(year, dataset)) and needs_ingest(year, dataset):
+            ingest_year(year, dataset)
+
+    # A stat is all a repeat load costs, the DataFrame is reused while the file is unchanged
+    # Memory mapped read avoids copying the file through an intermediate buffer
+    path = store_path(year, dataset)
+    df = MATCH_FRAMES.get(
+        (dataset, year), path_fingerprint(path), lambda: pq.read_table(path, memory_map=True).to_pandas()
+    )
+    return df.copy(deep=False)
+
+# Drop loaded years from memory, e.g. after the CSVs have been replaced
+def clear_loaded_years():
+    MATCH_FRAMES.invalidate()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Ingest Sackmann match archives in Statistics into the match store")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASET_FILES), help="Only ingest these datasets")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to one per CPU")
+    args = parser.parse_args()
+    ingested, skipped = ingest_all(args.datasets, args.workers)
+    print(f"Ingested files: {ingested or 'none, store is up to date'}")
+    for (dataset, year), reason in skipped.items():
+        print(f"Skipped {dataset} {year}: {reason}")
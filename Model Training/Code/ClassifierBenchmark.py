@@ -0,0 +1,175 @@
+# Classifier leaderboard for the VADER + TF-IDF feature set
+# SentimentAnalysisTesting (Test Case 4) compared classifiers with LazyPredict on accuracy only
+# In the app every headline goes through predict, so latency and model size matter as much as accuracy
+# For each candidate this records:
+    # Accuracy and weighted F1 on the 30% test split
+    # Fit time
+    # Batch predict latency (whole test set) and single headline predict latency
+    # Pickled model size and peak memory while fitting and predicting
+# A Pareto front over F1, end to end headline latency (featurising plus single predict) and size is then reported,
+# optionally restricted to models that fit within a latency budget on the same latency
+
+import time
+import pickle
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, RidgeClassifier, SGDClassifier
+from sklearn.svm import LinearSVC
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from sklearn.metrics import accuracy_score, f1_score
+from SentimentAnalysisV2 import TRAINING_DATASET, load_training_dataset
+
+# Number of single headline predictions timed per model, median and 95th percentile are reported
+SINGLE_PREDICT_REPEATS = 200
+
+# Candidates, all trained on exactly the same features
+# Logistic regression with 100 iterations is the currently deployed model
+CANDIDATES = {
+    "LogisticRegression": lambda: LogisticRegression(max_iter=100),
+    "LinearSVC": lambda: LinearSVC(),
+    "RidgeClassifier": lambda: RidgeClassifier(),
+    "SGDClassifier": lambda: SGDClassifier(random_state=42),
+    "GaussianNB": lambda: GaussianNB(),
+    "KNeighbors": lambda: KNeighborsClassifier(),
+    "DecisionTree": lambda: DecisionTreeClassifier(random_state=42),
+    "RandomForest": lambda: RandomForestClassifier(random_state=42),
+    "ExtraTrees": lambda: ExtraTreesClassifier(random_state=42),
+}
+
+# Function to extract VADER sentiment scores, same column order as the deployed model
+def extract_vader_scores(texts):
+    analyser = SentimentIntensityAnalyzer()
+    return np.array([
+        [scores['pos'], scores['neg'], scores['neu'], scores['compound']]
+        for scores in (analyser.polarity_scores(text) for text in texts)
+    ])
+
+# Build the VADER + TF-IDF feature matrices exactly as SentimentAnalysisV2 does
+def build_features(train_texts, test_texts):
+    vectoriser = TfidfVectorizer(ngram_range=(1,1), max_features= 750)
+    X_train_tfidf = vectoriser.fit_transform(train_texts)
+
+    # Time featurising the test set to give the per headline cost every model pays on top of predict
+    start = time.perf_counter()
+    X_test_vader = extract_vader_scores(test_texts)
+    X_test_tfidf = vectoriser.transform(test_texts)
+    featurise_ms = (time.perf_counter() - start) * 1000 / len(test_texts)
+
+    X_train = np.hstack((extract_vader_scores(train_texts), X_train_tfidf.toarray()))
+    X_test = np.hstack((X_test_vader, X_test_tfidf.toarray()))
+    return X_train, X_test, featurise_ms
+
+# Fit and time one candidate
+def benchmark_classifier(name, make_model, X_train, y_train, X_test, y_test):
+    model = make_model()
+
+    # Peak memory covers fitting and predicting, tracemalloc only sees Python/NumPy allocations
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    # Batch prediction over the whole test set
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    batch_seconds = time.perf_counter() - start
+
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Single headline prediction, how the dashboard used to call the model
+    single_row = X_test[:1]
+    single_times = []
+    for _ in range(SINGLE_PREDICT_REPEATS):
+        start = time.perf_counter()
+        model.predict(single_row)
+        single_times.append(time.perf_counter() - start)
+    single_times = np.array(single_times) * 1000
+
+    return {
+        "Model": name,
+        "Accuracy": accuracy_score(y_test, y_pred),
+        "F1": f1_score(y_test, y_pred, average="weighted"),
+        "Fit Time (s)": fit_seconds,
+        "Batch Predict (ms/headline)": batch_seconds * 1000 / len(X_test),
+        "Single Predict p50 (ms)": np.median(single_times),
+        "Single Predict p95 (ms)": np.percentile(single_times, 95),
+        "Model Size (KB)": len(pickle.dumps(model)) / 1024,
+        "Peak Memory (MB)": peak_bytes / (1024 * 1024),
+    }
+
+# Flag models that no other model beats on F1, end to end latency and size at the same time
+def pareto_front(leaderboard):
+    f1 = leaderboard["F1"].to_numpy()
+    latency = leaderboard["End to End (ms/headline)"].to_numpy()
+    size = leaderboard["Model Size (KB)"].to_numpy()
+
+    # dominated[i, j] is True when model j is at least as good as model i everywhere and better somewhere
+    at_least_as_good = (f1[None, :] >= f1[:, None]) & (latency[None, :] <= latency[:, None]) & (size[None, :] <= size[:, None])
+    strictly_better = (f1[None, :] > f1[:, None]) | (latency[None, :] < latency[:, None]) | (size[None, :] < size[:, None])
+    dominated = (at_least_as_good & strictly_better).any(axis=1)
+
+    return ~dominated
+
+def run_benchmark(dataset_file, latency_budget_ms=None, output_file="Classifier Leaderboard.csv"):
+    # Load the same corpus the model is trained on, labelling page headlines included, and split 70/30 as before
+    df = load_training_dataset(dataset_file)
+    train_df, test_df = train_test_split(df, test_size=0.3, random_state=42, stratify=df["Labelled Rating"])
+
+    X_train, X_test, featurise_ms = build_features(train_df["Statement"], test_df["Statement"])
+    y_train, y_test = train_df["Labelled Rating"].to_numpy(), test_df["Labelled Rating"].to_numpy()
+    print(f"Feature extraction (VADER + TF-IDF): {featurise_ms:.3f} ms/headline, paid by every model")
+
+    rows = []
+    for name, make_model in CANDIDATES.items():
+        print(f"Benchmarking {name}...")
+        rows.append(benchmark_classifier(name, make_model, X_train, y_train, X_test, y_test))
+
+    leaderboard = pd.DataFrame(rows)
+
+    # Total per headline cost in the app once featurisation is included
+    # The Pareto front and the latency budget are both judged on this one figure
+    leaderboard["End to End (ms/headline)"] = leaderboard["Single Predict p50 (ms)"] + featurise_ms
+    leaderboard["Pareto Optimal"] = pareto_front(leaderboard)
+
+    if latency_budget_ms is not None:
+        leaderboard["Within Budget"] = leaderboard["End to End (ms/headline)"] <= latency_budget_ms
+
+    leaderboard = leaderboard.sort_values(["Pareto Optimal", "F1"], ascending=False).reset_index(drop=True)
+    leaderboard.to_csv(output_file, index=False)
+
+    print("\nClassifier Leaderboard:")
+    print(leaderboard.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+
+    print("\nPareto front (F1 vs end to end latency vs model size):")
+    print(leaderboard[leaderboard["Pareto Optimal"]][["Model", "F1", "End to End (ms/headline)", "Model Size (KB)"]].to_string(index=False))
+
+    if latency_budget_ms is not None:
+        within = leaderboard[leaderboard["Within Budget"]]
+        if within.empty:
+            print(f"\nNo model fits within {latency_budget_ms} ms per headline")
+        else:
+            best = within.sort_values("F1", ascending=False).iloc[0]
+            print(f"\nBest model within {latency_budget_ms} ms per headline: {best['Model']} (F1 {best['F1']:.2f})")
+
+    return leaderboard
+
+# MAIN FUNCTIONS TO RUN
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare classifiers on accuracy and inference cost")
+    parser.add_argument("--dataset", default=TRAINING_DATASET)
+    parser.add_argument("--latency-budget-ms", type=float, default=None)
+    parser.add_argument("--output", default="Classifier Leaderboard.csv")
+    args = parser.parse_args()
+
+    run_benchmark(args.dataset, args.latency_budget_ms, args.output)
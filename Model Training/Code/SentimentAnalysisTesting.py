@@ -82,6 +82,7 @@ print(classification_report(y_test, y_pred_vader))
 # Already applied bi-grams & stop-word removal above
 
 # Test Case 4: LazyPredict to find the best classifier
+# (ClassifierBenchmark.py compares the same classifiers on latency, size and memory as well as accuracy)
 # clf = LazyClassifier(verbose=0, ignore_warnings=True, custom_metric=None)
 # models, predictions = clf.fit(X_train_combined, X_test_combined, y_train, y_test)
 # print("LazyPredict Classifier Results:")
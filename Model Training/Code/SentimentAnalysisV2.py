@@ -11,29 +11,78 @@
 
 # Dataset is currently 1500 headlines generated by ChatGPT
 # 500 pos, 500 neg, 500 neu
+# Headlines labelled on the dashboard's labelling page are added on top of it
 
 # Used for reading in the data
 import pandas as pd
+import numpy as np
 # Scikit learn used for ML
 from sklearn.model_selection import train_test_split
+# Repeated stratified k-fold for cross-validated evaluation
+from sklearn.model_selection import RepeatedStratifiedKFold
 # VADER classification
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 # TD-IDF Vectorising
 from sklearn.feature_extraction.text import TfidfVectorizer
+# Hashed feature space alternative to the learned TF-IDF vocabulary
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix, diags, hstack
 # Logistic Regression
 from sklearn.linear_model import LogisticRegression
 # Label encoder used for encoding pos,neg, neut in training
 from sklearn.preprocessing import LabelEncoder
 # For model evaluation
 from sklearn.metrics import accuracy_score, f1_score, classification_report
+from sklearn.metrics import confusion_matrix
+# Folds are evaluated in parallel across cores
+from joblib import Parallel, delayed
+# Plotting the aggregated confusion matrix
+import seaborn as sns
+import matplotlib.pyplot as plt
 #  For saving the model
 import pickle
+# Metrics saved alongside the model files for the model registry manifest
+import json
+# Labelled headlines path is resolved from this file so it is found from any directory
+import os
+
+# 1500 headline corpus the model is trained on, read from the folder the script is run in like the split files
+TRAINING_DATASET = "DatasetTesting.xlsx"
+
+# Headlines labelled on the dashboard's labelling page, the same file ActiveLearning.LABEL_LOG appends to
+ACTIVE_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TrainingTestingDatasets", "Active Labels.csv")
+
+# Which feature space to train, "tfidf" (learned vocabulary) or "hashed" (fixed width signed hashing)
+FEATURE_MODE = "tfidf"
+
+# Set to True to also score the model with repeated stratified k-fold before the usual 70/30 split
+# The model that is saved is always the one trained on the 70/30 split
+RUN_CROSS_VALIDATION = False
+
+# Width of the hashed feature space, stays the same however large the training corpus grows
+HASHED_N_FEATURES = 2 ** 12
+
+# Training corpus with the labelling page's headlines added on top
+# A headline labelled more than once keeps its latest label, and corpus headlines are never replaced
+def load_training_dataset(file_path, labels_file=ACTIVE_LABELS):
+    df = pd.read_excel(file_path, sheet_name="Dataset")
+    if not os.path.exists(labels_file):
+        return df
+
+    labels = pd.read_csv(labels_file)
+    labelled = pd.DataFrame({"Statement": labels["Headline"], "Labelled Rating": labels["Label"]})
+    normalise = lambda statements: statements.astype(str).str.lower().str.split().str.join(" ")
+    labelled = labelled[~normalise(labelled["Statement"]).duplicated(keep="last")]
+    labelled = labelled[~normalise(labelled["Statement"]).isin(set(normalise(df["Statement"])))]
+    print(f"Added {len(labelled)} headlines from the labelling page")
+    return pd.concat([df, labelled], ignore_index=True)
 
 def shuffle_and_split_dataset(file_path):
     # Load dataset
-    df = pd.read_excel(file_path, sheet_name="Dataset")
+    df = load_training_dataset(file_path)
     
-    # Display initial class distribution to ensure 500/500/500
+    # Display initial class distribution, 500/500/500 plus any headlines from the labelling page
     print("Initial Class Distribution:\n", df["Labelled Rating"].value_counts())
 
     # Shuffle dataset
@@ -79,6 +128,22 @@ def apply_tfidf(df, text_column="Statement"):
 
     return tfidf_df, vectoriser
 
+def hashed_tfidf_features(hashed_counts, idf_weights):
+    # Weight the hashed counts by the IDF array and L2 normalise each row, same as TfidfVectorizer
+    return normalize(hashed_counts @ diags(idf_weights))
+
+def apply_hashing(df, text_column="Statement"):
+    # Hashing vectoriser has no vocabulary to learn
+    # alternate_sign gives signed hashing so colliding words tend to cancel rather than pile up
+    hasher = HashingVectorizer(n_features=HASHED_N_FEATURES, ngram_range=(1,1), alternate_sign=True, norm=None)
+    hashed_counts = hasher.transform(df[text_column])
+
+    # IDF weights per hashed column, smoothed in the same way as TfidfVectorizer
+    document_frequency = np.asarray((hashed_counts != 0).sum(axis=0)).ravel()
+    idf_weights = np.log((1 + len(df)) / (1 + document_frequency)) + 1
+
+    return hashed_tfidf_features(hashed_counts, idf_weights), hasher, idf_weights
+
 def train_model(train_file):
     # Load the training dataset
     df = pd.read_excel(train_file)
@@ -120,6 +185,36 @@ def train_model(train_file):
     print("Final model trained and saved successfully.")
     return model, vectoriser, label_encoder
 
+def train_hashed_model(train_df):
+    # Hashed version of train_model
+    # Features are built in memory as a sparse matrix rather than via the processed Excel file
+    hashed_matrix, hasher, idf_weights = apply_hashing(train_df)
+    X_train = hstack([csr_matrix(train_df[['pos', 'neg', 'neu', 'compound']].to_numpy()), hashed_matrix]).tocsr()
+
+    # Encode sentiment labels as numerical values
+    label_encoder = LabelEncoder()
+    y_train = label_encoder.fit_transform(train_df["Labelled Rating"])
+
+    # Same logistic regression set up as the TF-IDF model
+    model = LogisticRegression(max_iter=100)
+    model.fit(X_train, y_train)
+
+    # Save model, hashing settings, label encoder and IDF weights
+    # No feature order is needed as every headline maps into the same fixed width space
+    with open("final_model_hashed.pkl", "wb") as model_file:
+        pickle.dump(model, model_file)
+
+    with open("hashing_vectoriser.pkl", "wb") as hasher_file:
+        pickle.dump(hasher, hasher_file)
+
+    with open("label_encoder_hashed.pkl", "wb") as encoder_file:
+        pickle.dump(label_encoder, encoder_file)
+
+    np.save("idf_weights_hashed.npy", idf_weights)
+
+    print("Hashed model trained and saved successfully.")
+    return model, hasher, label_encoder, idf_weights
+
 def test_model(model, vectoriser, label_encoder, test_file="Test_DatasetImprovedFinal.xlsx"):
     # Load test dataset
     test_df = pd.read_excel(test_file)
@@ -142,6 +237,25 @@ def test_model(model, vectoriser, label_encoder, test_file="Test_DatasetImproved
 
     return y_true, y_pred
 
+def test_hashed_model(model, hasher, idf_weights, label_encoder, test_file="Test_DatasetImprovedFinal.xlsx"):
+    # Load test dataset
+    test_df = pd.read_excel(test_file)
+
+    # Extract VADER sentiment scores
+    test_df = apply_vader(test_df)
+
+    # Hashed features need no vocabulary lookup or reindexing
+    hashed_matrix = hashed_tfidf_features(hasher.transform(test_df["Statement"]), idf_weights)
+    X_test = hstack([csr_matrix(test_df[['pos', 'neg', 'neu', 'compound']].to_numpy()), hashed_matrix]).tocsr()
+
+    # Convert labels to numerical values
+    y_true = label_encoder.transform(test_df["Labelled Rating"])
+
+    # Predict sentiment
+    y_pred = model.predict(X_test)
+
+    return y_true, y_pred
+
 def evaluate_model(y_true, y_pred, label_encoder):
     # Calculate accuracy
     accuracy = accuracy_score(y_true, y_pred)
@@ -154,13 +268,115 @@ def evaluate_model(y_true, y_pred, label_encoder):
     print("\nClassification Report:")
     print(classification_report(y_true, y_pred, target_names=label_encoder.classes_))
 
+    return {"accuracy": accuracy, "f1_weighted": f1}
+
+def save_metrics(metrics, file_path="metrics.json"):
+    # Picked up by ModelRegistry.register_model when the model files are registered as a new version
+    with open(file_path, "w") as metrics_file:
+        json.dump(metrics, metrics_file, indent=2)
+
+
+# CROSS-VALIDATED EVALUATION
+# The single 70/30 split gives one number with unknown variance
+# Repeated stratified k-fold gives mean and standard deviation over every fold
+
+def featurise_fold(statements, vader_matrix, train_idx, test_idx, feature_mode):
+    # The text features are fitted on the training fold only so nothing leaks from the test fold
+    if feature_mode == "hashed":
+        train_text_features, hasher, idf_weights = apply_hashing(pd.DataFrame({"Statement": statements[train_idx]}))
+        test_text_features = hashed_tfidf_features(hasher.transform(statements[test_idx]), idf_weights)
+    else:
+        vectoriser = TfidfVectorizer(ngram_range=(1,1), max_features= 750)
+        train_text_features = vectoriser.fit_transform(statements[train_idx])
+        test_text_features = vectoriser.transform(statements[test_idx])
+
+    # VADER first, matching the trained model's column order
+    X_train = hstack([csr_matrix(vader_matrix[train_idx]), train_text_features]).tocsr()
+    X_test = hstack([csr_matrix(vader_matrix[test_idx]), test_text_features]).tocsr()
+    return X_train, X_test
+
+def evaluate_fold(statements, vader_matrix, y, train_idx, test_idx, n_classes, feature_mode):
+    # Each fold is featurised once, trained and scored inside its own worker
+    X_train, X_test = featurise_fold(statements, vader_matrix, train_idx, test_idx, feature_mode)
+
+    model = LogisticRegression(max_iter=100)
+    model.fit(X_train, y[train_idx])
+    y_pred = model.predict(X_test)
+
+    return {
+        "accuracy": accuracy_score(y[test_idx], y_pred),
+        "f1_weighted": f1_score(y[test_idx], y_pred, average="weighted"),
+        "confusion_matrix": confusion_matrix(y[test_idx], y_pred, labels=list(range(n_classes))),
+    }
+
+def cross_validate_model(file_path, n_splits=5, n_repeats=1, n_jobs=-1, feature_mode=FEATURE_MODE):
+    # Load the full dataset, the folds replace the fixed 70/30 split
+    df = load_training_dataset(file_path)
+
+    # VADER scores don't depend on the fold so they are worked out once for every headline
+    df = apply_vader(df)
+    vader_matrix = df[['pos', 'neg', 'neu', 'compound']].to_numpy()
+    statements = df["Statement"].to_numpy()
+
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(df["Labelled Rating"])
+    n_classes = len(label_encoder.classes_)
+
+    # Stratified so every fold keeps the dataset's class balance
+    splitter = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=42)
+
+    # Folds are independent so they run side by side, wall clock is roughly one fold on a multi-core machine
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(statements, vader_matrix, y, train_idx, test_idx, n_classes, feature_mode)
+        for train_idx, test_idx in splitter.split(statements, y)
+    )
+
+    accuracies = np.array([result["accuracy"] for result in fold_results])
+    f1_scores = np.array([result["f1_weighted"] for result in fold_results])
+
+    # Summed over folds every headline is counted once per repeat
+    total_confusion_matrix = np.sum([result["confusion_matrix"] for result in fold_results], axis=0)
+
+    print(f"{n_repeats}x{n_splits}-fold cross-validation ({feature_mode} features)")
+    print(f"Model Accuracy: {accuracies.mean():.3f} +/- {accuracies.std():.3f}")
+    print(f"F1 Score: {f1_scores.mean():.3f} +/- {f1_scores.std():.3f}")
+
+    return {
+        "accuracy_mean": accuracies.mean(),
+        "accuracy_std": accuracies.std(),
+        "f1_mean": f1_scores.mean(),
+        "f1_std": f1_scores.std(),
+        "fold_accuracies": accuracies,
+        "fold_f1_scores": f1_scores,
+        "confusion_matrix": total_confusion_matrix,
+        "labels": label_encoder.classes_,
+    }
+
+def plot_cv_confusion_matrix(cv_results, file_name="Confusion Matrix Cross Validated"):
+    # Row normalised so each cell is the share of that actual class across every fold
+    cm = cv_results["confusion_matrix"]
+    cm_pct = cm / cm.sum(axis=1, keepdims=True) * 100
+    labels = cv_results["labels"]
+
+    plt.figure(figsize=(6, 4))
+    sns.heatmap(cm_pct, annot=True, fmt=".1f", cmap="Blues", xticklabels=labels, yticklabels=labels)
+    plt.xlabel("Predicted")
+    plt.ylabel("Actual")
+    plt.title(f"Confusion Matrix % (F1 {cv_results['f1_mean']:.2f} +/- {cv_results['f1_std']:.2f})")
+    plt.savefig(file_name)
+    plt.show()
 
 # MAIN FUNCTIONS TO RUN
 
 if __name__ == "__main__":
 
+    # 0) Optionally score with 5-fold cross-validation repeated 3 times, folds run in parallel
+    if RUN_CROSS_VALIDATION:
+        cv_results = cross_validate_model(TRAINING_DATASET, n_splits=5, n_repeats=3)
+        plot_cv_confusion_matrix(cv_results)
+
     # 1) Shuffle the whole dataset
-    shuffle_and_split_dataset("DatasetTesting.xlsx")
+    shuffle_and_split_dataset(TRAINING_DATASET)
     print("Shuffled dataset")
 
     # 2) Load training dataset
@@ -171,24 +387,34 @@ if __name__ == "__main__":
     train_df = apply_vader(train_df)
     print("VADER applied successfully")
 
-    # # 4) Apply TF-IDF
-    tfidf_df, vectoriser = apply_tfidf(train_df)
-    print("TF-IDF applied successfully")
+    # Hashed variant skips the TF-IDF vocabulary and processed Excel file entirely
+    if FEATURE_MODE == "hashed":
+        model, hasher, label_encoder, idf_weights = train_hashed_model(train_df)
+        y_true, y_pred = test_hashed_model(model, hasher, idf_weights, label_encoder)
+        save_metrics(evaluate_model(y_true, y_pred, label_encoder))
+
+    else:
+        # # 4) Apply TF-IDF
+        tfidf_df, vectoriser = apply_tfidf(train_df)
+        print("TF-IDF applied successfully")
 
-    # # 5) Combine VADER and TF-IDF features 
-    final_train_df = pd.concat([train_df[['Labelled Rating','pos', 'neg', 'neu', 'compound']], tfidf_df], axis=1)
-    print("Features combined for final training excel")
+        # # 5) Combine VADER and TF-IDF features 
+        final_train_df = pd.concat([train_df[['Labelled Rating','pos', 'neg', 'neu', 'compound']], tfidf_df], axis=1)
+        print("Features combined for final training excel")
 
-    # # 6) Save processed dataset into Excel
-    final_train_df.to_excel("Train_Dataset_FinalImproved.xlsx", index=False)
-    print("VADER and TF-IDF processing completed and saved successfully")
+        # # 6) Save processed dataset into Excel
+        final_train_df.to_excel("Train_Dataset_FinalImproved.xlsx", index=False)
+        print("VADER and TF-IDF processing completed and saved successfully")
 
-    # 7) Train model using preprocessed dataset
-    model, vectoriser, label_encoder = train_model("Train_Dataset_FinalImproved.xlsx")
+        # 7) Train model using preprocessed dataset
+        model, vectoriser, label_encoder = train_model("Train_Dataset_FinalImproved.xlsx")
     
-    # 8) Test model on 30% test set (450 heasdlines)
-    y_true, y_pred = test_model(model, vectoriser, label_encoder)
-    print("Testing done and dusted")
+        # 8) Test model on 30% test set (450 heasdlines)
+        y_true, y_pred = test_model(model, vectoriser, label_encoder)
+        print("Testing done and dusted")
+
+        # 9) Evaluate the model on Accuracy and F1 score
+        save_metrics(evaluate_model(y_true, y_pred, label_encoder))
 
-    # 9) Evaluate the model on Accuracy and F1 score
-    evaluate_model(y_true, y_pred, label_encoder)
+    # 10) Register the saved files as a new model version from the repository root, e.g.
+    # python ModelRegistry.py register "Model Training/Code" --mode tfidf --activate
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#############################
+# MODEL REGISTRY
+#############################
+
+# Every registered model lives in its own versioned folder (v0001, v0002, ...) inside the registry
+# The ACTIVE file holds the name of the version the app should serve
+REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Model Training", "Registry")
+ACTIVE_POINTER = "ACTIVE"
+MANIFEST_FILE = "manifest.json"
+
+# Optional metrics file written by the training script next to the model files
+METRICS_FILE = "metrics.json"
+
+# Artifact files making up each model variant, keyed by the component name used when loading
+MODEL_ARTIFACTS = {
+    "tfidf": {
+        "model": "final_model_improved.pkl",
+        "vectoriser": "tfidf_vectoriser_improved.pkl",
+        "label_encoder": "label_encoder_improved.pkl",
+        "feature_order": "feature_order.pkl",
+    },
+    "hashed": {
+        "model": "final_model_hashed.pkl",
+        "hasher": "hashing_vectoriser.pkl",
+        "label_encoder": "label_encoder_hashed.pkl",
+        "idf_weights": "idf_weights_hashed.npy",
+    },
+}
+
+# Registrations in this process take the lock to pick their version number, and each number is reserved
+# by creating its staging folder, so a registration from another process can't claim the same number
+_registry_lock = threading.Lock()
+
+# Function to checksum an artifact so corrupted or swapped files are caught before loading
+def file_checksum(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+# Write a small text/json file atomically, readers either see the old or the new contents
+def atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+# List registered versions, oldest first
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if name.startswith("v") and os.path.isfile(os.path.join(registry_dir, name, MANIFEST_FILE))
+    )
+
+def read_manifest(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, MANIFEST_FILE), encoding="utf-8") as file:
+        return json.load(file)
+
+# Next version number after the highest registered or staged one, returned with its newly created staging folder
+def reserve_version(registry_dir=REGISTRY_DIR):
+    with _registry_lock:
+        staged = [name[len(".staging-"):] for name in os.listdir(registry_dir) if name.startswith(".staging-v")]
+        taken = [int(version[1:]) for version in list_versions(registry_dir) + staged if version[1:].isdigit()]
+        next_number = max(taken, default=0) + 1
+        while True:
+            version = f"v{next_number:04d}"
+            staging_dir = os.path.join(registry_dir, f".staging-{version}")
+            try:
+                # Fails if another process reserved the same number first
+                os.mkdir(staging_dir)
+                return version, staging_dir
+            except FileExistsError:
+                next_number += 1
+
+# Copy a trained model's files into a new versioned folder with a manifest
+def register_model(source_dir, feature_mode, metrics=None, notes="", registry_dir=REGISTRY_DIR, activate=False):
+    if feature_mode not in MODEL_ARTIFACTS:
+        raise ValueError(f"Unknown feature mode '{feature_mode}', expected one of {list(MODEL_ARTIFACTS)}")
+
+    os.makedirs(registry_dir, exist_ok=True)
+
+    # Metrics can be passed in or picked up from the training script's metrics file
+    metrics_path = os.path.join(source_dir, METRICS_FILE)
+    if metrics is None and os.path.exists(metrics_path):
+        with open(metrics_path, encoding="utf-8") as file:
+            metrics = json.load(file)
+
+    # Files are copied into a hidden staging folder first and renamed into place in one step
+    # so the watcher can never pick up a half written version
+    version, staging_dir = reserve_version(registry_dir)
+
+    artifacts = {}
+    for component, file_name in MODEL_ARTIFACTS[feature_mode].items():
+        source_path = os.path.join(source_dir, file_name)
+        if not os.path.exists(source_path):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise FileNotFoundError(f"Missing model artifact for '{component}': {source_path}")
+        staged_path = os.path.join(staging_dir, file_name)
+        shutil.copy2(source_path, staged_path)
+        # Checksums are of the registered copy, the file the app will actually load
+        artifacts[component] = {
+            "file": file_name,
+            "sha256": file_checksum(staged_path),
+            "bytes": os.path.getsize(staged_path),
+        }
+
+    manifest = {
+        "version": version,
+        "feature_mode": feature_mode,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "source_dir": os.path.abspath(source_dir),
+        "metrics": metrics or {},
+        "notes": notes,
+        "artifacts": artifacts,
+    }
+    atomic_write(os.path.join(staging_dir, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    os.rename(staging_dir, os.path.join(registry_dir, version))
+
+    logger.info(f"Registered model {version} ({feature_mode})")
+
+    if activate:
+        set_active_version(version, registry_dir)
+
+    return version
+
+# Read the active pointer, None if no model has been activated yet
+def get_active_version(registry_dir=REGISTRY_DIR):
+    pointer_path = os.path.join(registry_dir, ACTIVE_POINTER)
+    if not os.path.exists(pointer_path):
+        return None
+    with open(pointer_path, encoding="utf-8") as file:
+        version = file.read().strip()
+    return version or None
+
+# Point the app at a different version, the pointer is replaced atomically
+def set_active_version(version, registry_dir=REGISTRY_DIR):
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Model version '{version}' is not registered")
+    atomic_write(os.path.join(registry_dir, ACTIVE_POINTER), version)
+    logger.info(f"Active model set to {version}")
+
+# Load every component of a registered version after checking the checksums
+# Returns a bundle dictionary with the model, label encoder and feature mode specific components
+def load_model_version(version, registry_dir=REGISTRY_DIR):
+    manifest = read_manifest(version, registry_dir)
+    version_dir = os.path.join(registry_dir, version)
+
+    bundle = {
+        "version": version,
+        "feature_mode": manifest["feature_mode"],
+        "metrics": manifest.get("metrics", {}),
+    }
+
+    for component, artifact in manifest["artifacts"].items():
+        artifact_path = os.path.join(version_dir, artifact["file"])
+        if file_checksum(artifact_path) != artifact["sha256"]:
+            raise ValueError(f"Checksum mismatch for {artifact['file']} in model {version}")
+
+        if artifact["file"].endswith(".npy"):
+            bundle[component] = np.load(artifact_path)
+        else:
+            with open(artifact_path, "rb") as file:
+                bundle[component] = pickle.load(file)
+
+    return bundle
+
+#############################
+# HOT SWAPPING IN THE RUNNING APP
+#############################
+
+# Keeps the active model loaded and watches the pointer for changes
+# New versions are loaded on the watcher thread and only swapped in once fully ready,
+# so sessions mid-analysis keep using the old model and nobody waits on a cold load
+class ActiveModelWatcher:
+    def __init__(self, registry_dir=REGISTRY_DIR, poll_interval=5):
+        self.registry_dir = registry_dir
+        self.poll_interval = poll_interval
+        self._bundle = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # Load whatever is active right now before serving anything
+        self._load_active()
+
+        self._thread = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._thread.start()
+
+    # The currently served bundle, never blocks on a load in progress
+    def current(self):
+        return self._bundle
+
+    def current_version(self):
+        bundle = self._bundle
+        return bundle["version"] if bundle is not None else None
+
+    def stop(self):
+        self._stop.set()
+
+    def _load_active(self):
+        version = get_active_version(self.registry_dir)
+        if version is None or version == self.current_version():
+            return
+
+        try:
+            started = time.perf_counter()
+            new_bundle = load_model_version(version, self.registry_dir)
+        except Exception as e:
+            # A broken version is never swapped in, the previous model keeps serving
+            logger.error(f"Failed to load model {version}, keeping {self.current_version()}: {e}")
+            return
+
+        # Swapping a single reference is atomic, callers see either the old or the new bundle
+        with self._lock:
+            self._bundle = new_bundle
+        logger.info(f"Swapped in model {version} (loaded in {time.perf_counter() - started:.2f}s)")
+
+    def _watch(self):
+        pointer_path = os.path.join(self.registry_dir, ACTIVE_POINTER)
+        last_mtime = None
+        while not self._stop.wait(self.poll_interval):
+            try:
+                mtime = os.stat(pointer_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != last_mtime:
+                last_mtime = mtime
+                self._load_active()
+
+#############################
+# COMMAND LINE
+#############################
+
+# python ModelRegistry.py register "Model Training/Finalised Model" --mode hashed --activate
+# python ModelRegistry.py activate v0002
+# python ModelRegistry.py list
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Manage versioned sentiment model artifacts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    register_parser = subparsers.add_parser("register", help="Register the model files in a folder as a new version")
+    register_parser.add_argument("source_dir")
+    register_parser.add_argument("--mode", choices=list(MODEL_ARTIFACTS), default="tfidf")
+    register_parser.add_argument("--notes", default="")
+    register_parser.add_argument("--activate", action="store_true")
+
+    activate_parser = subparsers.add_parser("activate", help="Make a registered version the active model")
+    activate_parser.add_argument("version")
+
+    subparsers.add_parser("list", help="List registered versions")
+
+    args = parser.parse_args()
+
+    if args.command == "register":
+        print(register_model(args.source_dir, args.mode, notes=args.notes, activate=args.activate))
+    elif args.command == "activate":
+        set_active_version(args.version)
+    else:
+        active = get_active_version()
+        for version in list_versions():
+            manifest = read_manifest(version)
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  {manifest['feature_mode']:<6}  {manifest['created']}  {manifest['metrics']}")
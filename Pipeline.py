@@ -0,0 +1,283 @@
+from __future__ import annotations
+import json
+import logging
+import argparse
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+# pandas is only needed for the annotations here, the stages import it with the modules that use it
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+#############################
+# ANALYSIS PIPELINE
+#############################
+
+# The dashboard's scrape -> sentiment -> stats -> bias workflow without any UI
+# Each stage is a plain function that returns its results or raises PipelineError naming the stage,
+# so the same code serves the Streamlit pages, batch jobs, worker processes and benchmarks
+# Each stage imports the modules it needs when it first runs, so importing the pipeline is cheap
+# and a page can render before any stage has been used, Warmup preloads them in the background
+
+# Tour averages the player can be compared against, by CLI name and dashboard label
+BASELINE_SCOPES = {
+    "tournament": "This tournament",
+    "surface": "Same surface",
+    "grand_slams": "All Grand Slams",
+}
+
+class PipelineError(Exception):
+    def __init__(self, stage, message):
+        super().__init__(message)
+        self.stage = stage
+        self.message = message
+
+@dataclass
+class AnalysisRequest:
+    player_name: str
+    tournament: str
+    year: int
+    max_pages: int = 3
+    # Reuse headlines in the headline store instead of scraping
+    use_stored: bool = False
+    # Leave out headlines that never mention the player
+    mentions_only: bool = False
+    baseline: str = "tournament"
+    # Count rewordings of the same story once, using the headline store's clusters
+    collapse_clusters: bool = True
+
+@dataclass
+class StageError:
+    stage: str
+    message: str
+
+@dataclass
+class PlayerStats:
+    player_matches: Optional[pd.DataFrame]
+    tournament_stats: Optional[dict]
+    yearly_stats: Optional[dict]
+    # Per match stats from the player's point of view, resampled for the bias confidence interval
+    match_stats: pd.DataFrame
+
+    # Dictionary form the dashboard keeps in session state
+    def as_dict(self):
+        return {
+            "player_matches": self.player_matches,
+            "tournament_stats": self.tournament_stats,
+            "yearly_stats": self.yearly_stats,
+            "match_stats": self.match_stats,
+        }
+
+def empty_headlines():
+    import pandas as pd
+    return pd.DataFrame()
+
+@dataclass
+class AnalysisResult:
+    request: AnalysisRequest
+    headlines: pd.DataFrame = field(default_factory=empty_headlines)
+    sentiment_results: Optional[dict] = None
+    stats: Optional[PlayerStats] = None
+    tour_averages: dict = field(default_factory=dict)
+    bias: Optional[dict] = None
+    model_version: Optional[str] = None
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    # JSON friendly summary of the analysis for reports and the CLI
+    def summary(self):
+        import pandas as pd
+        counts = {sentiment: len(headlines) for sentiment, headlines in (self.sentiment_results or {}).items()}
+        tournament_stats = (self.stats.tournament_stats if self.stats is not None else None) or {}
+        summary = {
+            "player_name": self.request.player_name,
+            "tournament": self.request.tournament,
+            "year": self.request.year,
+            "baseline": self.request.baseline,
+            "collapse_clusters": self.request.collapse_clusters,
+            "model_version": self.model_version,
+            "headlines": len(self.headlines),
+            "sentiment_counts": counts,
+            "tournament_stats": {name: value for name, value in tournament_stats.items() if pd.api.types.is_scalar(value)},
+            "errors": [{"stage": error.stage, "message": error.message} for error in self.errors],
+        }
+        if self.bias is not None:
+            summary.update({
+                "sentiment_score": self.bias["sentiment_score"],
+                "performance_score": self.bias["performance_score"],
+                "bias_score": self.bias["bias_score"],
+                "bias_level": self.bias["bias_level"],
+                "bias_description": self.bias["bias_description"],
+                "uncertainty": self.bias["uncertainty"],
+            })
+        return summary
+
+# Classifier probabilities of every scored headline, one row per headline in SENTIMENT_CLASSES order
+def headline_probabilities(headlines_df):
+    from BiasDetection import SENTIMENT_CLASSES
+    columns = [f"Prob {label}" for label in SENTIMENT_CLASSES]
+    if headlines_df is None or not set(columns) <= set(headlines_df.columns):
+        return None
+    return headlines_df[columns].dropna().to_numpy()
+
+# Headlines for the analysis, tagged with the players they mention and added to the headline store
+# progress(pages_done, max_pages, headlines_found) and cancelled() are passed through to the scraper
+def scrape_headlines(request: AnalysisRequest, progress: Optional[Callable] = None,
+                     cancelled: Optional[Callable] = None) -> pd.DataFrame:
+    from WebscrapingFunc import scrape_bbc_sport, load_ignored_headlines
+    from HeadlineStore import add_headlines, stored_headlines
+    from EntityLinking import link_headlines
+
+    ignored_headlines = load_ignored_headlines()
+    if request.use_stored:
+        headlines = stored_headlines(request.player_name, request.tournament, request.year)
+        headlines = headlines[~headlines["Headline"].isin(ignored_headlines)]
+    else:
+        headlines = scrape_bbc_sport(request.player_name, request.tournament, request.year, request.max_pages,
+                                     ignored_headlines, progress=progress, cancelled=cancelled)
+        # Every scraped headline is added to the corpus, repeats only gain a link to this analysis
+        if not headlines.empty:
+            headlines = add_headlines(headlines, request.player_name, request.tournament, request.year)
+
+    # Tag each headline with the players it mentions and the match between them
+    if not headlines.empty:
+        headlines = link_headlines(headlines, request.tournament, request.year, request.player_name)
+    return headlines
+
+# Headlines the search returned that mention the player
+def filter_mentions(headlines, player_name):
+    if "Players" not in headlines.columns:
+        return headlines
+    return headlines[headlines["Players"].map(lambda players: player_name in players)]
+
+# One headline per story, rewordings the headline store clustered together are counted once
+# Headlines without a cluster are all kept
+def collapse_rewordings(headlines):
+    if "cluster_id" not in headlines.columns:
+        return headlines
+    clustered = headlines["cluster_id"].notna()
+    return headlines[~clustered | ~headlines["cluster_id"].duplicated()]
+
+# Sentiment of every headline, recorded in the headline store against the model version
+# Returns the results by sentiment and the headlines with Sentiment and probability columns added
+def score_headlines(headlines: pd.DataFrame) -> tuple:
+    from SentimentModel import analyse_headlines_sentiment, load_model_bundle
+    from HeadlineStore import record_sentiment
+
+    sentiment_results, scored = analyse_headlines_sentiment(headlines.copy())
+    if sentiment_results is None:
+        raise PipelineError("sentiment", "Failed to load sentiment analysis model. Please check if model files exist.")
+    # Scored headlines are kept so every analysis can be rescanned in bulk later
+    if "headline_id" in scored.columns:
+        record_sentiment(scored, load_model_bundle()["version"])
+    return sentiment_results, scored
+
+# Tournament and season stats for the player, with pre-tournament ratings, draw percentile and opponent strength
+def retrieve_stats(player_name: str, tournament: str, year: int) -> PlayerStats:
+    from DataRetrievalFunc import load_match_data, get_player_tournament_stats, get_player_tournament_block
+    from StatsCube import lookup_yearly_stats, lookup_opponent_strength
+    from EloRatings import lookup_pre_tournament_elo
+    from DrawSimulator import round_percentile
+
+    df = load_match_data(year)
+    if df.empty:
+        raise PipelineError("stats", f"ATP {year} match data file not found. Please ensure the CSV is in the correct directory.")
+
+    player_matches, tournament_stats = get_player_tournament_stats(df, player_name, tournament)
+    match_stats = get_player_tournament_block(df, player_name, tournament)
+    if tournament_stats is not None:
+        # Ratings the player took into the tournament, used to set expectations for unseeded players
+        tournament_stats.update(lookup_pre_tournament_elo(player_name, tournament, year))
+        # Round reached as a percentile of the player's simulated outcomes in the actual draw
+        tournament_stats.update(round_percentile(player_name, tournament, year, tournament_stats["Round Reached"]))
+        # Rankings of the opponents faced, from the stats cube
+        tournament_stats.update(lookup_opponent_strength(player_name, tournament, year))
+    # Season stats are a keyed lookup into the precomputed stats cube
+    return PlayerStats(player_matches, tournament_stats, lookup_yearly_stats(player_name, year), match_stats)
+
+# Tour averages for this tournament or a broader field from the precomputed baselines
+def select_baseline(tournament: str, year: int, scope: str = "tournament") -> dict:
+    from StatsCube import lookup_tour_averages
+    from TournamentIndex import resolve_tournament_key, tournament_record
+    from TourBaselines import get_tour_baseline
+
+    tournament_info = tournament_record(resolve_tournament_key(tournament))
+    # Every tour-level match played on the tournament's surface that year, not only Grand Slams
+    if scope == "surface" and tournament_info is not None:
+        return get_tour_baseline(year=year, surface=tournament_info["surface"])
+    if scope == "grand_slams":
+        return get_tour_baseline(year=year, level="G")
+    return lookup_tour_averages(tournament, year)
+
+def detect_bias(stats: PlayerStats, tour_averages: dict, sentiment_results: dict, headlines: pd.DataFrame) -> dict:
+    from BiasDetection import bias_detection
+
+    if not any(sentiment_results.values()):
+        raise PipelineError("bias", "No headlines found for sentiment analysis. Cannot perform bias detection.")
+    if stats.player_matches is None or stats.tournament_stats is None:
+        raise PipelineError("bias", "No performance data available for the player at this tournament. Cannot perform bias detection.")
+    if not tour_averages:
+        raise PipelineError("bias", "Cannot perform bias analysis: Tour averages not available.")
+    return bias_detection(stats.tournament_stats, tour_averages, sentiment_results,
+                          headline_probabilities(headlines), stats.match_stats)
+
+# Run every stage in order, stopping at the first stage that fails
+# The result holds whatever the completed stages produced, and the error of the stage that failed
+def run_pipeline(request: AnalysisRequest, progress: Optional[Callable] = None,
+                 cancelled: Optional[Callable] = None) -> AnalysisResult:
+    from SentimentModel import load_model_bundle
+
+    result = AnalysisResult(request)
+    try:
+        result.headlines = scrape_headlines(request, progress, cancelled)
+        if request.mentions_only:
+            result.headlines = filter_mentions(result.headlines, request.player_name)
+        if request.collapse_clusters:
+            result.headlines = collapse_rewordings(result.headlines)
+        if result.headlines.empty:
+            raise PipelineError("scrape", "No headlines found. Try adjusting your search parameters.")
+
+        result.sentiment_results, result.headlines = score_headlines(result.headlines)
+        result.model_version = load_model_bundle()["version"]
+
+        result.stats = retrieve_stats(request.player_name, request.tournament, request.year)
+        result.tour_averages = select_baseline(request.tournament, request.year, request.baseline)
+        result.bias = detect_bias(result.stats, result.tour_averages, result.sentiment_results, result.headlines)
+    except PipelineError as e:
+        logger.warning(f"{e.stage} stage failed: {e.message}")
+        result.errors.append(StageError(e.stage, e.message))
+    return result
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run a media bias analysis for one player, tournament and year")
+    parser.add_argument("player_name")
+    parser.add_argument("tournament")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--pages", type=int, default=3, help="Search result pages to scrape")
+    parser.add_argument("--stored", action="store_true", help="Use stored headlines instead of scraping")
+    parser.add_argument("--mentions-only", action="store_true", help="Only analyse headlines that mention the player")
+    parser.add_argument("--baseline", choices=list(BASELINE_SCOPES), default="tournament")
+    parser.add_argument("--keep-rewordings", action="store_true", help="Count every rewording of a story separately")
+    parser.add_argument("--json", help="Write the analysis summary to this file")
+    parser.add_argument("--headlines", help="Write the scored headlines to this CSV")
+    args = parser.parse_args()
+
+    result = run_pipeline(AnalysisRequest(
+        args.player_name, args.tournament, args.year, args.pages, args.stored, args.mentions_only, args.baseline,
+        not args.keep_rewordings
+    ))
+    summary = result.summary()
+    print(json.dumps(summary, indent=1, default=str))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=1, default=str)
+    if args.headlines and not result.headlines.empty:
+        result.headlines.to_csv(args.headlines, index=False)
+    raise SystemExit(0 if result.ok else 1)
@@ -0,0 +1,183 @@
+import threading
+import numpy as np
+import pandas as pd
+
+#############################
+# PLAYER MATCH INDEX
+#############################
+
+# Each match row is reshaped into two rows, one from the winner's point of view and one from the loser's
+# Long column name: (column used for the winner's row, column used for the loser's row)
+PERSPECTIVE_COLUMNS = {
+    "player_id": ("winner_id", "loser_id"),
+    "player_name": ("winner_name", "loser_name"),
+    "seed": ("winner_seed", "loser_seed"),
+    "entry": ("winner_entry", "loser_entry"),
+    "rank": ("winner_rank", "loser_rank"),
+    "rank_points": ("winner_rank_points", "loser_rank_points"),
+    "opponent_id": ("loser_id", "winner_id"),
+    "opponent_name": ("loser_name", "winner_name"),
+    "opponent_seed": ("loser_seed", "winner_seed"),
+    "opponent_rank": ("loser_rank", "winner_rank"),
+    "opponent_rank_points": ("loser_rank_points", "winner_rank_points"),
+    "aces": ("w_ace", "l_ace"),
+    "dfs": ("w_df", "l_df"),
+    "svpt": ("w_svpt", "l_svpt"),
+    "first_in": ("w_1stIn", "l_1stIn"),
+    "first_won": ("w_1stWon", "l_1stWon"),
+    "second_won": ("w_2ndWon", "l_2ndWon"),
+    "sv_gms": ("w_SvGms", "l_SvGms"),
+    "bpSaved": ("w_bpSaved", "l_bpSaved"),
+    "bpFaced": ("w_bpFaced", "l_bpFaced"),
+}
+
+# Columns that are the same from both players' points of view
+SHARED_COLUMNS = [
+    "tourney_id", "tournament_key", "tourney_name", "surface", "tourney_level", "tourney_date",
+    "match_num", "round", "best_of", "score", "minutes",
+]
+
+# Serve stats are averaged, so they are stored as floats with NaN for missing values like the raw CSVs
+STAT_COLUMNS = ["minutes", "aces", "dfs", "svpt", "first_in", "first_won", "second_won", "sv_gms", "bpSaved", "bpFaced"]
+
+ROUND_ORDER = {
+    "R128": 1, "R64": 2, "R32": 3, "R16": 4,
+    "QF": 5, "SF": 6, "F": 7, "W": 8
+}
+
+# One player's matches are a contiguous block of the long table, found through the offsets
+class PlayerMatchIndex:
+    def __init__(self, df):
+        self.source = df
+
+        # Position of each match in the source DataFrame so the raw rows can be returned
+        match_row = np.arange(len(df))
+
+        perspectives = []
+        for side, won in ((0, True), (1, False)):
+            view = pd.DataFrame({
+                long_column: df[columns[side]].reset_index(drop=True)
+                for long_column, columns in PERSPECTIVE_COLUMNS.items()
+                if columns[side] in df.columns
+            })
+            for column in SHARED_COLUMNS:
+                if column in df.columns:
+                    view[column] = df[column].reset_index(drop=True)
+            view["won"] = won
+            view["match_row"] = match_row
+            perspectives.append(view)
+
+        long_df = pd.concat(perspectives, ignore_index=True)
+        long_df["player_id"] = long_df["player_id"].astype("int64")
+        long_df["opponent_id"] = long_df["opponent_id"].astype("int64")
+        for column in STAT_COLUMNS:
+            if column in long_df.columns:
+                long_df[column] = long_df[column].astype("float64")
+
+        # Grouped by player, in date then match order within each player
+        long_df = long_df.sort_values(["player_id", "tourney_date", "match_num"], kind="stable").reset_index(drop=True)
+        self.matches_df = long_df
+
+        # Start and end offsets of each player's block
+        player_ids = long_df["player_id"].to_numpy()
+        unique_ids, starts = np.unique(player_ids, return_index=True)
+        ends = np.append(starts[1:], len(player_ids))
+        self.offsets = {int(player_id): (int(start), int(end)) for player_id, start, end in zip(unique_ids, starts, ends)}
+
+        # Player names to IDs, the raw data only identifies a player by name in the dropdown
+        self.name_to_id = dict(zip(long_df["player_name"].astype(str), long_df["player_id"].astype(int)))
+
+    def player_id(self, player_name):
+        return self.name_to_id.get(player_name)
+
+    # All of a player's matches as one contiguous slice, empty if the player has none
+    def player_matches(self, player):
+        player_id = self.player_id(player) if isinstance(player, str) else player
+        start, end = self.offsets.get(player_id, (0, 0))
+        return self.matches_df.iloc[start:end]
+
+    # Raw match rows from the source DataFrame for a block of the index, in match order
+    def source_rows(self, block):
+        return self.source.iloc[block["match_row"].to_numpy()]
+
+# Indexes are built once per loaded DataFrame and shared by every session
+_indexes = {}
+_index_lock = threading.Lock()
+
+# Only a handful of years are ever loaded, older entries are dropped beyond this
+MAX_CACHED_INDEXES = 16
+
+# Keyed on the DataFrame's row index, which every shallow copy load_year hands out shares,
+# so all copies of a loaded year reuse one player index
+def get_player_index(df):
+    key = id(df.index)
+    with _index_lock:
+        cached = _indexes.get(key)
+        # The row index is kept alongside the player index so its id can't be reused by another object
+        if cached is not None and cached[0] is df.index:
+            return cached[1]
+
+    index = PlayerMatchIndex(df)
+
+    with _index_lock:
+        if len(_indexes) >= MAX_CACHED_INDEXES:
+            _indexes.pop(next(iter(_indexes)))
+        _indexes[key] = (df.index, index)
+    return index
+
+# Furthest round reached in a block of a single tournament's matches
+def furthest_round(block):
+    # Winning the final means the player won the tournament
+    if ((block["round"] == "F") & block["won"]).any():
+        return "W"
+    reached = max(block["round"].astype(str), key=lambda round_name: ROUND_ORDER.get(round_name, 0))
+    return reached if reached in ROUND_ORDER else "R128"
+
+# Reduce a block of player matches to the summary stats shown on the dashboard
+# prefix is "Tournament" or "Yearly" to match the existing stat names
+def summarise_block(block, prefix):
+    total = len(block)
+    wins = int(block["won"].sum())
+
+    return {
+        "Total Matches": total,
+        "Wins": wins,
+        "Losses": total - wins,
+        "Win Rate": wins / total * 100,
+        "Avg Match Duration": block["minutes"].mean(),
+        f"{prefix} Aces": block["aces"].mean(),
+        f"{prefix} Double Faults": block["dfs"].mean(),
+        "Break Points Faced": block["bpFaced"].mean(),
+        # Calculated by dividing amount of break points saved by amount of break points faced
+        "Break Points Saved Percentage": block["bpSaved"].mean() / block["bpFaced"].mean() * 100,
+    }
+
+#############################
+# TOUR AVERAGE BASELINES
+#############################
+
+# Additive totals behind the tour averages, every player-match row counts once
+# Because they are plain sums, finer groups can be rolled up into coarser ones without rescanning matches
+def baseline_sums(long_df, keys):
+    grouped = long_df.groupby(keys, sort=False, observed=True)
+    return grouped.agg(
+        player_matches=("won", "size"),
+        stats_matches=("aces", "count"),
+        aces=("aces", "sum"),
+        dfs=("dfs", "sum"),
+        bp_faced=("bpFaced", "sum"),
+        bp_saved=("bpSaved", "sum"),
+    )
+
+# Tour averages from the totals, same keys as calculate_tour_averages
+# Break points saved % is total saved over total faced rather than an average of per-match ratios
+def averages_from_sums(sums):
+    stats_matches = sums["stats_matches"].where(sums["stats_matches"] > 0)
+    return pd.DataFrame({
+        "aces": sums["aces"] / stats_matches,
+        "double_faults": sums["dfs"] / stats_matches,
+        "break_points_faced": sums["bp_faced"] / stats_matches,
+        "break_points_saved": sums["bp_saved"] / stats_matches,
+        "break_points_saved_pct": (sums["bp_saved"] / sums["bp_faced"].where(sums["bp_faced"] > 0) * 100).fillna(0),
+        "player_matches": sums["player_matches"],
+    })
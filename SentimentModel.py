@@ -1,35 +1,93 @@
 import pickle
+import logging
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import streamlit as st
+from ModelRegistry import ActiveModelWatcher
+
+logger = logging.getLogger(__name__)
 
 #############################
 # SENTIMENT ANALYSIS FUNCTIONS
 #############################
 
-# Load trained model and components
-@st.cache_resource
+# Folder holding the finalised model files
+MODEL_DIR = "C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Model Training/Finalised Model"
+
+# Feature space the deployed model was trained on
+# "tfidf" uses the learned TF-IDF vocabulary and needs feature_order.pkl to align columns
+# "hashed" uses a fixed width signed hashing space with the IDF weights stored as an array
+FEATURE_MODE = "tfidf"
+
+# vaderSentiment, scipy and scikit-learn are imported where they are first used
+# so pages that only need the model version don't pay for them at startup
+
+# Load trained model and components, once per process
+@lru_cache(maxsize=None)
 def load_model():
     try:
-        with open("C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Model Training/Finalised Model/final_model_improved.pkl", "rb") as model_file:
+        with open(f"{MODEL_DIR}/final_model_improved.pkl", "rb") as model_file:
             model = pickle.load(model_file)
-        with open("C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Model Training/Finalised Model/tfidf_vectoriser_improved.pkl", "rb") as vectorizer_file:
+        with open(f"{MODEL_DIR}/tfidf_vectoriser_improved.pkl", "rb") as vectorizer_file:
             vectoriser = pickle.load(vectorizer_file)
-        with open("C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Model Training/Finalised Model/label_encoder_improved.pkl", "rb") as encoder_file:
+        with open(f"{MODEL_DIR}/label_encoder_improved.pkl", "rb") as encoder_file:
             label_encoder = pickle.load(encoder_file)
-        with open("C:/Users/tobyl/OneDrive/Documents/4th Year/Dissertation/Repository/Model Training/Finalised Model/feature_order.pkl", "rb") as feature_order:
+        with open(f"{MODEL_DIR}/feature_order.pkl", "rb") as feature_order:
             feature_order = pickle.load(feature_order)
         return model, vectoriser, label_encoder, feature_order
     except FileNotFoundError as e:
-        st.error(f"Model file not found: {e}")
+        logger.error(f"Model file not found: {e}")
+        return None, None, None, None
+
+# Load the hashed feature variant of the model
+# No vocabulary or feature order is needed, just the hashing settings and the IDF array
+@lru_cache(maxsize=None)
+def load_hashed_model():
+    try:
+        with open(f"{MODEL_DIR}/final_model_hashed.pkl", "rb") as model_file:
+            model = pickle.load(model_file)
+        with open(f"{MODEL_DIR}/hashing_vectoriser.pkl", "rb") as hasher_file:
+            hasher = pickle.load(hasher_file)
+        with open(f"{MODEL_DIR}/label_encoder_hashed.pkl", "rb") as encoder_file:
+            label_encoder = pickle.load(encoder_file)
+        idf_weights = np.load(f"{MODEL_DIR}/idf_weights_hashed.npy")
+        return model, hasher, label_encoder, idf_weights
+    except FileNotFoundError as e:
+        logger.error(f"Model file not found: {e}")
         return None, None, None, None
 
+# One registry watcher per server process, shared by every session
+# It polls the ACTIVE pointer and swaps newly activated models in without a restart
+@lru_cache(maxsize=None)
+def get_model_watcher():
+    return ActiveModelWatcher()
+
+# Get the model currently being served as a bundle dictionary
+# The registry's active version is used when there is one, otherwise the fixed model files
+def load_model_bundle():
+    bundle = get_model_watcher().current()
+    if bundle is not None:
+        return bundle
+
+    if FEATURE_MODE == "hashed":
+        model, hasher, label_encoder, idf_weights = load_hashed_model()
+        bundle = {"hasher": hasher, "idf_weights": idf_weights}
+    else:
+        model, vectoriser, label_encoder, feature_order = load_model()
+        bundle = {"vectoriser": vectoriser, "feature_order": feature_order}
+
+    bundle.update({"version": None, "feature_mode": FEATURE_MODE, "model": model, "label_encoder": label_encoder})
+    return bundle
+
+# VADER reads its lexicon file when it is created, so one analyser is shared instead of one per headline
+@lru_cache(maxsize=None)
+def get_vader_analyser():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
 # Function to extract VADER sentiment scores
 def extract_vader_scores(text):
-    # Initialise a vader analyser
-    analyser = SentimentIntensityAnalyzer()
-    scores = analyser.polarity_scores(text)
+    scores = get_vader_analyser().polarity_scores(text)
     # Returns a dictionary matching the models vader extraction methodology
     return {
         'pos': scores['pos'], 
@@ -38,43 +96,64 @@ def extract_vader_scores(text):
         'compound': scores['compound']
     }
 
+# Build VADER + TF-IDF features using the learned vocabulary
+def build_tfidf_features(headlines, vectoriser, feature_order):
+    # Extract VADER scores
+    vader_df = pd.DataFrame([extract_vader_scores(headline) for headline in headlines])
+
+    # Extract TF-IDF features for the whole batch in one transform
+    tfidf_matrix = vectoriser.transform(headlines)
+    features_df = pd.DataFrame(tfidf_matrix.toarray(), columns=vectoriser.get_feature_names_out())
+
+    # Reindex to match original feature order, filling missing columns with 0
+    features_df = features_df.reindex(columns=feature_order, fill_value=0)
+
+    # Add VADER scores to features, VADER added first to match the trained model
+    return pd.concat([vader_df, features_df], axis=1)
+
+# Build features for a batch of headlines with whichever feature space the bundle's model uses
+def build_features(headlines, bundle):
+    if bundle["feature_mode"] == "hashed":
+        return build_hashed_features(headlines, bundle["hasher"], bundle["idf_weights"])
+    return build_tfidf_features(headlines, bundle["vectoriser"], bundle["feature_order"])
+
+# Build VADER + hashed TF-IDF features for a whole batch of headlines at once
+# Every headline lands in the same fixed width space so no column alignment is needed
+def build_hashed_features(headlines, hasher, idf_weights):
+    from scipy.sparse import csr_matrix, diags, hstack
+    from sklearn.preprocessing import normalize
+
+    # VADER columns in the same order as training
+    vader_matrix = np.array([
+        list(extract_vader_scores(headline).values()) for headline in headlines
+    ])
+
+    # Signed hashed term counts, weighted by the stored IDF array and L2 normalised like TfidfVectorizer
+    hashed_counts = hasher.transform(headlines)
+    hashed_tfidf = normalize(hashed_counts @ diags(idf_weights))
+
+    # VADER added first to match the trained model
+    return hstack([csr_matrix(vader_matrix), hashed_tfidf]).tocsr()
+
 # Function to analyse sentiment of headlines
 def analyse_headlines_sentiment(headlines_df):
-    model, vectoriser, label_encoder, feature_order = load_model()
+    # Bundle is fetched once so a model swap mid-analysis can't mix components from two versions
+    bundle = load_model_bundle()
     
-    if model is None or vectoriser is None or label_encoder is None or feature_order is None:
-        st.error("Failed to load sentiment analysis model. Please check if model files exist.")
+    if bundle["model"] is None or bundle["label_encoder"] is None:
+        logger.error("Failed to load sentiment analysis model. Please check if model files exist.")
         return None, headlines_df
+
+    model = bundle["model"]
+    label_encoder = bundle["label_encoder"]
     
     results = {"Positive": [], "Neutral": [], "Negative": []}
     
     # Process each headline
-    processed_features = []
-    vader_scores_list = []
+    headlines = headlines_df["Headline"].dropna().tolist()
     
-    for headline in headlines_df["Headline"].dropna():
-        # Extract VADER scores
-        vader_scores = extract_vader_scores(headline)
-        vader_scores_list.append(vader_scores)
-        
-        # Extract TF-IDF features
-        tfidf_features = vectoriser.transform([headline]).toarray()[0]
-        
-        # Create a DataFrame for this headline's TF-IDF features
-        headline_tfidf_df = pd.DataFrame([tfidf_features], columns=vectoriser.get_feature_names_out())
-        
-        # Reindex to match original feature order, filling missing columns with 0
-        headline_tfidf_df = headline_tfidf_df.reindex(columns=feature_order, fill_value=0)
-        
-        processed_features.append(headline_tfidf_df)
-    
-    # Combine all features
-    if processed_features:
-        features_df = pd.concat(processed_features, ignore_index=True)
-        
-        # Add VADER scores to features, VADER added first to match the trained model
-        vader_df = pd.DataFrame(vader_scores_list)
-        final_features = pd.concat([vader_df, features_df], axis=1)
+    if headlines:
+        final_features = build_features(headlines, bundle)
         
         # Predict sentiment and get confidence score
         probs = model.predict_proba(final_features)
@@ -84,9 +163,12 @@ def analyse_headlines_sentiment(headlines_df):
         sentiments = label_encoder.inverse_transform(predictions)
         
         # Update results and headline sentiments and their confidence scores
-        for headline, sentiment, confidence in zip(headlines_df["Headline"].dropna(), sentiments, confidences):
+        for headline, sentiment, confidence, headline_probs in zip(headlines, sentiments, confidences, probs):
             results[sentiment].append(f"{headline} ({confidence:.2%} confidence)")
             idx = headlines_df.index[headlines_df['Headline'] == headline][0]
             headlines_df.at[idx, 'Sentiment'] = sentiment
+            # Probability of every class is kept for the bias confidence intervals
+            for label, prob in zip(label_encoder.classes_, headline_probs):
+                headlines_df.at[idx, f"Prob {label}"] = prob
     
-    return results, headlines_df
\ No newline at end of file
+    return results, headlines_df
@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import OrderedDict
+
+#############################
+# SHARED IN-PROCESS CACHES
+#############################
+
+# Size bounded caches shared by every dashboard session in the process
+# Each entry is stored with the fingerprint of the file it was built from and is rebuilt when that changes,
+# so concurrent sessions and widget reruns reuse one copy in memory until the data itself changes
+# Keys are tuples ending in the year they belong to, so a year can be invalidated across every cache
+
+# Every cache by name, for invalidation and stats across all of them
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Size and modification time of a file, None if it doesn't exist
+def path_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+class SharedCache:
+    def __init__(self, name, max_entries):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (fingerprint, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One build lock per key, so sessions asking for the same missing entry wait for a single build
+        self._build_locks = {}
+        with _caches_lock:
+            _caches[name] = self
+
+    # Cached value for key while its fingerprint is unchanged, otherwise build() is called and its result cached
+    def get(self, key, fingerprint, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another session may have built it while this one waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == fingerprint:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+
+            value = build()
+
+            with self._lock:
+                self._entries[key] = (fingerprint, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+            return value
+
+    # Drop one key, every key matching a predicate, or everything
+    def invalidate(self, key=None, predicate=None):
+        with self._lock:
+            if key is None and predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key] if key is not None else [cached for cached in self._entries if predicate(cached)]
+            removed = 0
+            for cached in keys:
+                if self._entries.pop(cached, None) is not None:
+                    removed += 1
+            return removed
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+# Drop every cached entry for a year, or everything when year is None, e.g. after a match file is replaced
+def invalidate(year=None):
+    with _caches_lock:
+        caches = list(_caches.values())
+    if year is None:
+        return sum(cache.invalidate() for cache in caches)
+    return sum(cache.invalidate(predicate=lambda key: key[-1] == year) for cache in caches)
+
+def cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+# Caches used by the dashboard
+# Match DataFrames per (dataset, year), Grand Slam player lists per (dataset, year) and tour averages per (tournament_key, year)
+MATCH_FRAMES = SharedCache("match_frames", max_entries=16)
+GRAND_SLAM_PLAYERS = SharedCache("grand_slam_players", max_entries=64)
+TOUR_AVERAGES = SharedCache("tour_averages", max_entries=1024)
+# Saved analyses per (analysis key,), tied to the time each was saved
+ANALYSES = SharedCache("analyses", max_entries=32)
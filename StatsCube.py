@@ -0,0 +1,266 @@
+import os
+import json
+import logging
+import threading
+import pandas as pd
+from MatchStore import STORE_DIR, available_years, csv_path, load_year, store_path
+from PlayerIndex import PlayerMatchIndex, ROUND_ORDER, baseline_sums, averages_from_sums
+from TournamentIndex import resolve_tournament_key
+from SharedCache import TOUR_AVERAGES
+
+logger = logging.getLogger(__name__)
+
+#############################
+# MATERIALISED STATS CUBE
+#############################
+
+# Pre-aggregated stats for every player x tournament x year, player x year and tournament x year
+# plus the strength of the opponents each player faced at every tournament
+# Stored next to the match store and updated year by year when a match file is added or changed
+CUBE_DIR = os.path.join(STORE_DIR, "cube")
+CUBE_MANIFEST = os.path.join(CUBE_DIR, "manifest.json")
+CUBE_TABLES = ["player_tournament", "player_year", "tour_averages", "opponent_strength"]
+
+# Bumped whenever the table layouts change so an old cube is rebuilt rather than appended to
+CUBE_FORMAT = 4
+
+ROUND_NAMES = {value: key for key, value in ROUND_ORDER.items()}
+
+# Loaded cube shared by every session, reloaded when the manifest changes
+_cube = None
+_cube_lock = threading.Lock()
+
+def table_path(table):
+    return os.path.join(CUBE_DIR, f"{table}.parquet")
+
+# Long player-match rows for one year, with the year as a column
+def year_player_matches(year):
+    long_df = PlayerMatchIndex(load_year(year)).matches_df
+    long_df["year"] = year
+    long_df["tournament_key"] = long_df["tournament_key"].astype(int)
+    return long_df
+
+# Per group summary matching the keys returned by get_player_tournament_stats / get_player_yearly_stats
+def aggregate_player_stats(long_df, keys, prefix):
+    grouped = long_df.groupby(keys, sort=False, observed=True)
+
+    stats = grouped.agg(
+        player_name=("player_name", "first"),
+        total=("won", "size"),
+        wins=("won", "sum"),
+        minutes=("minutes", "mean"),
+        aces=("aces", "mean"),
+        dfs=("dfs", "mean"),
+        bp_faced=("bpFaced", "mean"),
+        bp_saved=("bpSaved", "mean"),
+    )
+
+    cube = pd.DataFrame({
+        "player_name": stats["player_name"].astype(str),
+        "Total Matches": stats["total"],
+        "Wins": stats["wins"].astype(int),
+        "Losses": stats["total"] - stats["wins"].astype(int),
+        "Win Rate": stats["wins"] / stats["total"] * 100,
+        "Avg Match Duration": stats["minutes"],
+        f"{prefix} Aces": stats["aces"],
+        f"{prefix} Double Faults": stats["dfs"],
+        "Break Points Faced": stats["bp_faced"],
+        "Break Points Saved Percentage": stats["bp_saved"] / stats["bp_faced"] * 100,
+    })
+    return cube
+
+def build_player_tournament(long_df):
+    keys = ["player_id", "tournament_key", "year"]
+    cube = aggregate_player_stats(long_df, keys, "Tournament")
+
+    # Seed from the player's first match, 0 when unseeded
+    seeds = long_df.groupby(keys, sort=False, observed=True)["seed"].first()
+    cube["Seed"] = seeds.fillna(0).astype(int)
+
+    # Furthest round as a number, winning the final counts as W
+    round_values = long_df["round"].astype(str).map(ROUND_ORDER).fillna(0).astype(int)
+    round_values = round_values.where(~((long_df["round"] == "F") & long_df["won"]), ROUND_ORDER["W"])
+    furthest = round_values.groupby([long_df[key] for key in keys], sort=False, observed=True).max()
+    cube["Round Reached"] = furthest.clip(lower=1).map(ROUND_NAMES)
+
+    return cube.reset_index()
+
+def build_player_year(long_df):
+    return aggregate_player_stats(long_df, ["player_id", "year"], "Yearly").reset_index()
+
+# Same figures as calculate_tour_averages, for every tournament in the year at once
+def build_tour_averages(long_df):
+    return averages_from_sums(baseline_sums(long_df, ["tournament_key", "year"])).reset_index()
+
+# Who each player faced at each tournament, from the opponents' rankings at the time of the match
+def build_opponent_strength(long_df):
+    keys = ["player_id", "tournament_key", "year"]
+    opponent_rank = long_df["opponent_rank"].astype("float64")
+    won = long_df["won"].to_numpy()
+    rows = long_df.assign(
+        opponent_rank=opponent_rank,
+        opponent_rank_points=long_df["opponent_rank_points"].astype("float64"),
+        beaten_rank=opponent_rank.where(won),
+        lost_to_rank=opponent_rank.where(~won),
+        top_10_win=won & (opponent_rank <= 10).to_numpy(),
+    )
+    grouped = rows.groupby(keys, sort=False, observed=True)
+
+    strength = grouped.agg(
+        player_name=("player_name", "first"),
+        opponents=("opponent_id", "size"),
+        avg_rank=("opponent_rank", "mean"),
+        best_rank=("opponent_rank", "min"),
+        avg_points=("opponent_rank_points", "mean"),
+        best_win=("beaten_rank", "min"),
+        lost_to=("lost_to_rank", "min"),
+        top_10_wins=("top_10_win", "sum"),
+    )
+
+    return pd.DataFrame({
+        "player_name": strength["player_name"].astype(str),
+        "Opponents Faced": strength["opponents"],
+        "Avg Opponent Rank": strength["avg_rank"],
+        "Best Opponent Rank": strength["best_rank"],
+        "Avg Opponent Rank Points": strength["avg_points"],
+        "Best Win Rank": strength["best_win"],
+        "Lost To Rank": strength["lost_to"],
+        "Top 10 Wins": strength["top_10_wins"].astype(int),
+    }).reset_index()
+
+# Fingerprint of a year's store file, a year is rebuilt whenever this changes
+def year_fingerprint(year):
+    stat = os.stat(store_path(year))
+    return [stat.st_size, stat.st_mtime_ns]
+
+# Fingerprints of the years currently in the cube, empty if there is no cube in the current format
+def read_manifest():
+    if not os.path.exists(CUBE_MANIFEST):
+        return {}
+    with open(CUBE_MANIFEST, encoding="utf-8") as file:
+        manifest = json.load(file)
+    if manifest.get("format") != CUBE_FORMAT:
+        return {}
+    return manifest["years"]
+
+# Build or incrementally update the cube
+# Only years that are new or whose match file changed are recomputed, every other row is kept
+def update_cube(rebuild=False):
+    os.makedirs(CUBE_DIR, exist_ok=True)
+    manifest = {} if rebuild else read_manifest()
+    # Nothing from an older format cube can be carried over
+    rebuild = rebuild or not manifest
+
+    # load_year ingests any new or changed CSV into the store first
+    years = available_years()
+    for year in years:
+        load_year(year)
+
+    stale_years = [year for year in years if manifest.get(str(year)) != year_fingerprint(year)]
+    removed_years = [int(year) for year in manifest if int(year) not in years]
+    if not stale_years and not removed_years:
+        return []
+
+    fresh = {table: [] for table in CUBE_TABLES}
+    for year in stale_years:
+        long_df = year_player_matches(year)
+        fresh["player_tournament"].append(build_player_tournament(long_df))
+        fresh["player_year"].append(build_player_year(long_df))
+        fresh["tour_averages"].append(build_tour_averages(long_df))
+        fresh["opponent_strength"].append(build_opponent_strength(long_df))
+
+    # Rows for rebuilt or removed years are replaced, everything else is carried over
+    dropped_years = set(stale_years) | set(removed_years)
+    for table in CUBE_TABLES:
+        frames = fresh[table]
+        if not rebuild and os.path.exists(table_path(table)):
+            existing = pd.read_parquet(table_path(table))
+            frames = [existing[~existing["year"].isin(dropped_years)]] + frames
+        combined = pd.concat(frames, ignore_index=True)
+
+        tmp_path = table_path(table) + ".tmp"
+        combined.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, table_path(table))
+
+    manifest = {"format": CUBE_FORMAT, "years": {str(year): year_fingerprint(year) for year in years}}
+    tmp_manifest = CUBE_MANIFEST + ".tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_manifest, CUBE_MANIFEST)
+
+    logger.info(f"Stats cube updated for years {stale_years}")
+    return stale_years
+
+# Modification times of the raw match files, a change means the cube needs an incremental update
+def source_signature():
+    return tuple((year, os.path.getmtime(csv_path(year))) for year in available_years())
+
+# Load the cube into memory with keyed indexes for lookups
+def get_cube():
+    global _cube
+    with _cube_lock:
+        signature = source_signature()
+        if _cube is not None and _cube["source_signature"] == signature:
+            return _cube
+
+        update_cube()
+
+        player_tournament = pd.read_parquet(table_path("player_tournament"))
+        player_year = pd.read_parquet(table_path("player_year"))
+        tour_averages = pd.read_parquet(table_path("tour_averages"))
+        opponent_strength = pd.read_parquet(table_path("opponent_strength"))
+
+        _cube = {
+            "source_signature": signature,
+            "player_tournament": player_tournament.set_index(["player_name", "tournament_key", "year"]).sort_index(),
+            "player_year": player_year.set_index(["player_name", "year"]).sort_index(),
+            "tour_averages": tour_averages.set_index(["tournament_key", "year"]).sort_index(),
+            "opponent_strength": opponent_strength.set_index(["player_name", "tournament_key", "year"]).sort_index(),
+        }
+        return _cube
+
+# First row for a key as a plain dictionary of Python values, None if the key isn't in the table
+def lookup_row(table, key):
+    if key not in table.index:
+        return None
+    row = table.loc[[key]].iloc[0]
+    return {column: value.item() if hasattr(value, "item") else value for column, value in row.items()}
+
+def lookup_tournament_stats(player_name, tournament, year):
+    # Any name or alias of the tournament resolves to its integer key
+    tournament_key = resolve_tournament_key(tournament)
+    stats = lookup_row(get_cube()["player_tournament"], (player_name, tournament_key, year))
+    if stats is not None:
+        stats.pop("player_id")
+    return stats
+
+def lookup_yearly_stats(player_name, year):
+    stats = lookup_row(get_cube()["player_year"], (player_name, year))
+    if stats is not None:
+        stats.pop("player_id")
+    return stats
+
+# Same keys as calculate_tour_averages, the player-match count is only needed to build the cube
+def tour_averages_row(tournament_key, year):
+    averages = lookup_row(get_cube()["tour_averages"], (tournament_key, year)) or {}
+    averages.pop("player_matches", None)
+    return averages
+
+# Served from the shared cache until the match data changes, the dashboard asks for it on every rerun
+# A copy is returned so callers can't change the cached averages
+def lookup_tour_averages(tournament, year):
+    tournament_key = resolve_tournament_key(tournament)
+    averages = TOUR_AVERAGES.get((tournament_key, year), source_signature(), lambda: tour_averages_row(tournament_key, year))
+    return dict(averages)
+
+def lookup_opponent_strength(player_name, tournament, year):
+    tournament_key = resolve_tournament_key(tournament)
+    strength = lookup_row(get_cube()["opponent_strength"], (player_name, tournament_key, year))
+    if strength is not None:
+        strength.pop("player_id")
+    return strength or {}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    updated = update_cube()
+    print(f"Stats cube years rebuilt: {updated or 'none, cube is up to date'}")
@@ -0,0 +1,145 @@
+import os
+import json
+import logging
+import argparse
+import threading
+from itertools import combinations
+import pandas as pd
+from MatchStore import STORE_DIR, available_years, csv_path
+from PlayerIndex import baseline_sums, averages_from_sums
+from StatsCube import year_player_matches
+from TournamentIndex import resolve_tournament_key
+
+logger = logging.getLogger(__name__)
+
+#############################
+# TOUR AVERAGE BASELINES
+#############################
+
+# Tour averages for every tournament, surface, level and round, alone or combined, per year and overall
+# e.g. "Wimbledon R16", "Grass courts", "all Grand Slam QFs" or "Wimbledon" across every year
+BASELINES_FILE = os.path.join(STORE_DIR, "baselines.parquet")
+BASELINES_MANIFEST = os.path.join(STORE_DIR, "baselines.json")
+
+# Dimensions a baseline can be narrowed by, None in a key means "any"
+BASELINE_DIMENSIONS = ["tournament_key", "surface", "tourney_level", "round", "year"]
+
+_baselines = None
+_baselines_lock = threading.Lock()
+
+# Raw match files behind the baselines, any change means they are rebuilt
+def source_signature():
+    return [[year, os.path.getmtime(csv_path(year))] for year in available_years()]
+
+# Compute every baseline in one pass over the player-match rows
+def build_baselines():
+    long_df = pd.concat([year_player_matches(year) for year in available_years()], ignore_index=True)
+    for column in ["surface", "tourney_level", "round"]:
+        long_df[column] = long_df[column].astype(str)
+
+    # Single scan to the finest grain, everything coarser is a roll up of these additive totals
+    finest = baseline_sums(long_df, BASELINE_DIMENSIONS).reset_index()
+    total_columns = [column for column in finest.columns if column not in BASELINE_DIMENSIONS]
+
+    rollups = []
+    for size in range(len(BASELINE_DIMENSIONS) + 1):
+        for dimensions in combinations(BASELINE_DIMENSIONS, size):
+            if dimensions:
+                sums = finest.groupby(list(dimensions), sort=False)[total_columns].sum().reset_index()
+            else:
+                sums = finest[total_columns].sum().to_frame().T
+            # Dimensions that are rolled up are stored as None
+            for dimension in BASELINE_DIMENSIONS:
+                if dimension not in dimensions:
+                    sums[dimension] = None
+            rollups.append(sums)
+
+    sums = pd.concat(rollups, ignore_index=True)
+    sums[total_columns] = sums[total_columns].astype(float)
+    baselines = pd.concat([sums[BASELINE_DIMENSIONS], averages_from_sums(sums)], axis=1)
+    return baselines
+
+# Lookup key for one row of the baselines table, rolled up dimensions are None
+# Built in plain Python, a pandas column holding None and integers is inferred as float with NaN for None
+def baseline_key(row):
+    tournament_key, surface, level, round_name, year = (None if pd.isna(value) else value for value in row)
+    return (
+        None if tournament_key is None else int(tournament_key), surface, level, round_name,
+        None if year is None else int(year),
+    )
+
+# Dictionary keyed by (tournament_key, surface, level, round, year) for constant time lookups
+def index_baselines(baselines):
+    averages = baselines.drop(columns=BASELINE_DIMENSIONS).to_dict("records")
+    keys = [baseline_key(row) for row in baselines[BASELINE_DIMENSIONS].itertuples(index=False, name=None)]
+    return dict(zip(keys, averages))
+
+# Surface only and level only rollups, per year and across every year, that the lookup must contain
+# Returns the missing keys, any missing means the rollups were built or indexed wrongly
+def missing_rollups(lookup):
+    expected = set()
+    for tournament_key, surface, level, round_name, year in lookup:
+        if tournament_key is not None and year is not None:
+            expected.update({
+                (None, surface, None, None, year), (None, None, level, None, year),
+                (None, surface, None, None, None), (None, None, level, None, None),
+            })
+    return sorted(expected - set(lookup), key=str)
+
+# Baselines from disk when they match the current match files, otherwise rebuilt and saved
+def get_baselines():
+    global _baselines
+    with _baselines_lock:
+        signature = source_signature()
+        if _baselines is not None and _baselines["signature"] == signature:
+            return _baselines["lookup"]
+
+        stored_signature = None
+        if os.path.exists(BASELINES_MANIFEST) and os.path.exists(BASELINES_FILE):
+            with open(BASELINES_MANIFEST, encoding="utf-8") as file:
+                stored_signature = json.load(file)
+
+        if stored_signature == signature:
+            baselines = pd.read_parquet(BASELINES_FILE)
+        else:
+            baselines = build_baselines()
+            os.makedirs(STORE_DIR, exist_ok=True)
+            baselines.to_parquet(BASELINES_FILE, index=False)
+            with open(BASELINES_MANIFEST, "w", encoding="utf-8") as file:
+                json.dump(signature, file)
+            logger.info(f"Built {len(baselines)} tour baselines")
+
+        lookup = index_baselines(baselines)
+        missing = missing_rollups(lookup)
+        if missing:
+            logger.error(f"{len(missing)} surface or level baselines are missing, e.g. {missing[:3]}")
+
+        _baselines = {"signature": signature, "lookup": lookup}
+        return _baselines["lookup"]
+
+# Tour averages for any combination of tournament, surface, level, round and year
+# e.g. get_tour_baseline("Wimbledon", 2023, round="R16") or get_tour_baseline(year=2023, surface="Grass")
+# Returns {} when no matches fall in that combination
+def get_tour_baseline(tournament=None, year=None, surface=None, level=None, round=None):
+    tournament_key = resolve_tournament_key(tournament) if tournament is not None else None
+    if tournament is not None and tournament_key is None:
+        return {}
+    return get_baselines().get((tournament_key, surface, level, round, year), {})
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build the tour baselines and check the surface and level rollups")
+    parser.add_argument("--year", type=int, default=None, help="Year to show example baselines for, defaults to the latest")
+    args = parser.parse_args()
+
+    lookup = get_baselines()
+    missing = missing_rollups(lookup)
+    year = args.year if args.year is not None else max(available_years())
+    for description, baseline in [
+        (f"Grass {year}", get_tour_baseline(year=year, surface="Grass")),
+        (f"Grand Slams {year}", get_tour_baseline(year=year, level="G")),
+        ("Grass, every year", get_tour_baseline(surface="Grass")),
+    ]:
+        print(f"{description}: {baseline or 'not available'}")
+    print(f"{len(lookup)} baselines, {len(missing)} surface or level rollups missing")
+    raise SystemExit(1 if missing else 0)
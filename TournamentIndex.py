@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+
+#############################
+# TOURNAMENT DIMENSION TABLE
+#############################
+
+# Every tournament name seen at ingest gets a permanent integer key
+# The table maps each key to its canonical name, aliases, level, surface and yearly tourney_ids
+TOURNAMENT_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Statistics", "store", "tournaments.json")
+
+# Names people use that differ from the names in the match data
+# Adding a tournament's common names here is all that's needed for it to be found by any of them
+DEFAULT_ALIASES = {
+    "Australian Open": ["AO"],
+    "Roland Garros": ["French Open", "Roland-Garros"],
+    "Wimbledon": ["The Championships"],
+    "Us Open": ["US Open"],
+}
+
+# Name shown in the dashboard when it differs from the data's name
+DISPLAY_NAMES = {
+    "Roland Garros": "French Open",
+    "Us Open": "US Open",
+}
+
+_index = None
+_index_mtime = None
+_index_lock = threading.Lock()
+
+# Lower case with single spaces, used for every name and alias comparison
+def normalise_name(name):
+    return " ".join(str(name).lower().split())
+
+def empty_index():
+    return {"tournaments": {}, "alias_to_key": {}}
+
+# Load the table from disk, reusing the in-memory copy while the file is unchanged
+def load_tournament_index():
+    global _index, _index_mtime
+    with _index_lock:
+        if not os.path.exists(TOURNAMENT_INDEX_FILE):
+            if _index is None:
+                _index = empty_index()
+            return _index
+
+        mtime = os.path.getmtime(TOURNAMENT_INDEX_FILE)
+        if _index is None or _index_mtime != mtime:
+            with open(TOURNAMENT_INDEX_FILE, encoding="utf-8") as file:
+                stored = json.load(file)
+            # JSON keys are strings, tournament keys are used as integers everywhere else
+            _index = {
+                "tournaments": {int(key): record for key, record in stored["tournaments"].items()},
+                "alias_to_key": stored["alias_to_key"],
+            }
+            _index_mtime = mtime
+        return _index
+
+def save_tournament_index(index):
+    global _index, _index_mtime
+    os.makedirs(os.path.dirname(TOURNAMENT_INDEX_FILE), exist_ok=True)
+    tmp_path = TOURNAMENT_INDEX_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"tournaments": {str(key): record for key, record in index["tournaments"].items()},
+                   "alias_to_key": index["alias_to_key"]}, file, indent=1)
+    os.replace(tmp_path, TOURNAMENT_INDEX_FILE)
+    with _index_lock:
+        _index = index
+        _index_mtime = os.path.getmtime(TOURNAMENT_INDEX_FILE)
+
+# Assign keys to every tournament in a file's matches, adding new tournaments to the table
+# editions has one row per tourney_name with its tourney_id, level, surface and start date
+# Returns a dictionary of tourney_name to tournament key
+def register_tournaments(editions, year, dataset="atp"):
+    index = load_tournament_index()
+    changed = False
+
+    # Main tour editions are recorded by year, other datasets share the key but keep their own tourney_ids
+    edition_key = str(year) if dataset == "atp" else f"{dataset} {year}"
+
+    editions = editions.drop_duplicates("tourney_name")
+    for edition in editions.itertuples(index=False):
+        normalised = normalise_name(edition.tourney_name)
+        key = index["alias_to_key"].get(normalised)
+
+        if key is None:
+            key = max(index["tournaments"], default=0) + 1
+            name = str(edition.tourney_name)
+            aliases = DEFAULT_ALIASES.get(name, [])
+            index["tournaments"][key] = {
+                "tournament_key": key,
+                "name": name,
+                "display_name": DISPLAY_NAMES.get(name, name),
+                "aliases": aliases,
+                "level": str(edition.tourney_level),
+                "surface": str(edition.surface),
+                "month": int(edition.tourney_date.month),
+                "tourney_ids": {},
+            }
+            for alias in [name] + aliases:
+                index["alias_to_key"][normalise_name(alias)] = key
+            changed = True
+
+        record = index["tournaments"][key]
+        if record["tourney_ids"].get(edition_key) != str(edition.tourney_id):
+            record["tourney_ids"][edition_key] = str(edition.tourney_id)
+            changed = True
+
+    if changed:
+        save_tournament_index(index)
+
+    return {str(name): index["alias_to_key"][normalise_name(name)] for name in editions["tourney_name"]}
+
+# Integer key for any name or alias of a tournament, None if it isn't in the table
+def resolve_tournament_key(name):
+    return load_tournament_index()["alias_to_key"].get(normalise_name(name))
+
+def tournament_record(key):
+    return load_tournament_index()["tournaments"].get(key)
+
+# Every tournament at a level, in calendar order, e.g. "G" for the Grand Slams
+def tournaments_at_level(level):
+    records = [record for record in load_tournament_index()["tournaments"].values() if record["level"] == level]
+    return sorted(records, key=lambda record: (record["month"], record["name"]))
+
+def grand_slam_tournaments():
+    return tournaments_at_level("G")
+
+# Add another name a tournament can be found by
+def add_alias(name, alias):
+    index = load_tournament_index()
+    key = resolve_tournament_key(name)
+    if key is None:
+        raise ValueError(f"Unknown tournament '{name}'")
+    index["alias_to_key"][normalise_name(alias)] = key
+    if alias not in index["tournaments"][key]["aliases"]:
+        index["tournaments"][key]["aliases"].append(alias)
+    save_tournament_index(index)
+    return key
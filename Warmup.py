@@ -0,0 +1,152 @@
+import re
+import sys
+import time
+import logging
+import argparse
+import importlib
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+#############################
+# STARTUP WARM-UP
+#############################
+
+# Heavy modules are imported by the stage that first needs them, so the first page renders quickly
+# This warm-up then loads them, the sentiment model, the VADER lexicon and the latest year's match data
+# on a background thread when the server starts, so the first analysis doesn't wait for them either
+# Only the standard library is imported at module level, importing this file costs nothing
+
+# Modules the pipeline stages import on first use
+STAGE_MODULES = [
+    "requests", "bs4", "WebscrapingFunc", "HeadlineStore", "EntityLinking",
+    "SentimentModel", "DataRetrievalFunc", "StatsCube", "EloRatings", "DrawSimulator", "TourBaselines", "BiasDetection",
+]
+
+# Modules pages/main.py imports when it loads, everything else is imported by the step that uses it
+PAGE_MODULES = ["streamlit", "TournamentIndex", "JobQueue", "Pipeline", "Warmup"]
+
+# Modules whose import time the report measures, the dashboard pages' imports
+REPORT_MODULES = ["streamlit", "pandas", "pyarrow", "Pipeline", "AnalysisCache", "BiasDisplay"] + STAGE_MODULES
+
+def import_stage_modules():
+    for module in STAGE_MODULES:
+        importlib.import_module(module)
+
+def load_sentiment_model():
+    from SentimentModel import load_model_bundle, get_vader_analyser
+    load_model_bundle()
+    # Reading the lexicon is the slow part of the first VADER score
+    get_vader_analyser().polarity_scores("warm up")
+
+# Latest year of match data with its Grand Slam player list, what the dashboard shows first
+def load_current_year():
+    from MatchStore import available_years
+    from DataRetrievalFunc import grand_slam_players
+    years = available_years()
+    if years:
+        grand_slam_players(max(years))
+
+def load_stats_cube():
+    from StatsCube import get_cube
+    get_cube()
+
+WARMUP_STEPS = [
+    ("imports", import_stage_modules),
+    ("sentiment model", load_sentiment_model),
+    ("current year", load_current_year),
+    ("stats cube", load_stats_cube),
+]
+
+# One warm-up per server process, started by whichever page loads first
+_warmup = {"thread": None, "steps": {}, "finished": False}
+_warmup_lock = threading.Lock()
+
+def run_warmup():
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+            outcome = "ok"
+        except Exception as e:
+            # A failed step is left for the stage that needs it, which reports the error itself
+            logger.warning(f"Warm-up step {name} failed: {str(e)}")
+            outcome = f"failed: {str(e)}"
+        with _warmup_lock:
+            _warmup["steps"][name] = {"seconds": time.perf_counter() - start, "outcome": outcome}
+    with _warmup_lock:
+        _warmup["finished"] = True
+    logger.info(f"Warm-up finished: {warmup_status()['steps']}")
+
+def start_warmup():
+    with _warmup_lock:
+        if _warmup["thread"] is None:
+            _warmup["thread"] = threading.Thread(target=run_warmup, name="warmup", daemon=True)
+            _warmup["thread"].start()
+
+def warmup_status():
+    with _warmup_lock:
+        return {"started": _warmup["thread"] is not None, "finished": _warmup["finished"], "steps": dict(_warmup["steps"])}
+
+# Import time of each module in a fresh interpreter, from python -X importtime
+# Returns (module, self seconds, cumulative seconds, nested) for every module imported, slowest cumulative first,
+# and whether every import succeeded, nested is False for the modules imported directly
+def import_times(modules):
+    command = [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    times = []
+    for line in completed.stderr.splitlines():
+        # e.g. "import time:      1205 |      48210 |   pandas"
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if match:
+            times.append((match.group(4), int(match.group(1)) / 1e6, int(match.group(2)) / 1e6, len(match.group(3)) > 1))
+    return sorted(times, key=lambda entry: entry[2], reverse=True), completed.returncode == 0
+
+# Seconds to import a set of modules together, what a page waits for before it renders, None if any fails
+def combined_import_seconds(modules):
+    times, succeeded = import_times(modules)
+    if not succeeded:
+        return None
+    return sum(cumulative_seconds for _, _, cumulative_seconds, nested in times if not nested)
+
+# Cumulative import time of each report module on its own, and the slowest packages overall
+def import_report(modules=REPORT_MODULES, top=15):
+    lines = ["Import time per module, each in a fresh interpreter:"]
+    # Modules that can't be imported are left out of the combined run so the rest still load together
+    importable = []
+    for module in modules:
+        times, succeeded = import_times([module])
+        times = [entry for entry in times if entry[0] == module]
+        if times and succeeded:
+            importable.append(module)
+            lines.append(f"  {module:<20} {times[0][2]:8.3f}s")
+        else:
+            lines.append(f"  {module:<20} not importable")
+
+    # The main page's own imports against also importing every stage module up front, as it used to
+    page_seconds = combined_import_seconds(PAGE_MODULES)
+    eager_seconds = combined_import_seconds(PAGE_MODULES + ["pandas", "pyarrow", "AnalysisCache", "BiasDisplay"] + STAGE_MODULES)
+    describe = lambda seconds: "not importable" if seconds is None else f"{seconds:8.3f}s"
+    lines.append("\nMain page imports together:")
+    lines.append(f"  {'deferred (current)':<20} {describe(page_seconds)}")
+    lines.append(f"  {'every stage eagerly':<20} {describe(eager_seconds)}")
+
+    lines.append("\nSlowest imports with everything loaded together (self / cumulative):")
+    for module, self_seconds, cumulative_seconds, _ in import_times(importable)[0][:top]:
+        lines.append(f"  {module:<40} {self_seconds:8.3f}s {cumulative_seconds:8.3f}s")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Report where startup time goes and time the warm-up steps")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--skip-warmup", action="store_true", help="Only report import times")
+    args = parser.parse_args()
+
+    print(import_report(top=args.top))
+    if not args.skip_warmup:
+        run_warmup()
+        print("\nWarm-up steps:")
+        for name, step in warmup_status()["steps"].items():
+            print(f"  {name:<20} {step['seconds']:8.3f}s  {step['outcome']}")
@@ -1,11 +1,8 @@
-import requests
 import csv
 import time
 import os
 import pandas as pd
-from bs4 import BeautifulSoup
 import logging
-import streamlit as st
 
 # Setup logging for debugging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -49,7 +46,13 @@ def save_ignored_headlines(new_ignored):
    # logger.info(f"Saved {len(new_ignored)} new ignored headlines")
 
 # Function to scrape BBC Sport headlines with URLs
-def scrape_bbc_sport(player, tournament, year, max_pages, ignored_headlines):
+# progress(pages_done, max_pages, headlines_found) is called after each page, and the scrape stops early
+# with the headlines found so far once cancelled() returns True, both are used by background jobs
+def scrape_bbc_sport(player, tournament, year, max_pages, ignored_headlines, progress=None, cancelled=None):
+    # requests and BeautifulSoup are only imported once a scrape runs, the dashboard starts without them
+    import requests
+    from bs4 import BeautifulSoup
+
     # For more efficient searching on BBC news split the player name
     # Only append the surname to the URL
     player_surname = player.split()[-1] 
@@ -64,6 +67,9 @@ def scrape_bbc_sport(player, tournament, year, max_pages, ignored_headlines):
 
     # Loop through every page user requests to scrape
     for page in range(1, max_pages + 1):
+        if cancelled is not None and cancelled():
+            logger.info(f"Scrape cancelled before page {page}")
+            break
         url = f"{base_url}{search_query}&page={page}"
         
         #logger.info(f"Fetching page {page} from URL: {url}")
@@ -74,7 +80,7 @@ def scrape_bbc_sport(player, tournament, year, max_pages, ignored_headlines):
             #logger.info(f"Response status code: {response.status_code}")
 
             if response.status_code != 200:
-                st.warning(f"Failed to fetch page {page} (Status {response.status_code})")
+                logger.warning(f"Failed to fetch page {page} (Status {response.status_code})")
                 continue
 
             # Parse the returned HTML content using BeautifulSoup
@@ -158,6 +164,9 @@ def scrape_bbc_sport(player, tournament, year, max_pages, ignored_headlines):
         except Exception as e:
             logger.error(f"Error scraping page {page}: {str(e)}")
         
+        if progress is not None:
+            progress(page, max_pages, len(headlines_data))
+        
         logger.info(f"Sleeping for 1 second before next page")
         # To keep with a politeness window
         time.sleep(1)  
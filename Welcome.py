@@ -1,4 +1,8 @@
 import streamlit as st
+from Warmup import start_warmup
+
+# Model, VADER lexicon and the latest match data load in the background while the user reads this page
+start_warmup()
 
 # Title
 st.title("🎾 Tennis Sentiment & Performance Analysis")
@@ -0,0 +1,83 @@
+import streamlit as st
+from SentimentModel import load_model_bundle
+from ActiveLearning import load_headline_corpus, score_corpus, rank_by_uncertainty, append_labels
+
+
+# Configure page
+st.set_page_config(layout="wide", page_title="Headline Labelling Queue")
+
+# Scoring is cached per model version, so the corpus is only re-scored after labels are saved or a new model goes live
+@st.cache_data(show_spinner=False)
+def get_scored_corpus(model_version, _bundle):
+    return score_corpus(load_headline_corpus(), _bundle)
+
+#############################
+# LABELLING QUEUE UI
+#############################
+
+def main():
+    st.title("🏷️ Headline Labelling Queue")
+    st.write(
+        "Headlines from the scraped corpus that the sentiment model is least sure about. "
+        "Labelling these first adds the most to the training dataset per headline labelled."
+    )
+
+    # Confirmation from the previous save survives the rerun
+    if "labelling_message" in st.session_state:
+        st.success(st.session_state.pop("labelling_message"))
+
+    bundle = load_model_bundle()
+    if bundle["model"] is None:
+        st.error("Failed to load sentiment analysis model. Please check if model files exist.")
+        return
+
+    option_cols = st.columns(2)
+    with option_cols[0]:
+        # Margin looks at the top two classes, entropy at all three
+        strategy = st.radio("Rank by:", ["margin", "entropy"], horizontal=True)
+    with option_cols[1]:
+        queue_size = st.slider("Headlines in queue:", 5, 50, 20)
+
+    with st.spinner("Scoring scraped headlines..."):
+        scored = get_scored_corpus(bundle["version"], bundle)
+
+    if scored.empty:
+        st.warning("No unlabelled headlines found in the scraped corpus.")
+        return
+
+    st.caption(f"{len(scored)} unlabelled headlines scored")
+    queue = rank_by_uncertainty(scored, strategy).head(queue_size)
+
+    # All labels are submitted together so the page only reruns once
+    with st.form("labelling_form"):
+        for i, row in queue.iterrows():
+            st.markdown(f"**{row['Headline']}**")
+            st.caption(f"Model guess: {row['Predicted']} (margin {row['Margin']:.2f}, entropy {row['Entropy']:.2f})")
+            st.radio("Label", ["Skip", "Positive", "Neutral", "Negative"], key=f"label_{i}", horizontal=True, label_visibility="collapsed")
+
+        submitted = st.form_submit_button("Save Labels")
+
+    if submitted:
+        labelled_rows = [
+            {
+                "Headline": row["Headline"],
+                "Label": st.session_state[f"label_{i}"],
+                "Predicted": row["Predicted"],
+                "Margin": row["Margin"],
+                "Entropy": row["Entropy"],
+            }
+            for i, row in queue.iterrows()
+            if st.session_state[f"label_{i}"] != "Skip"
+        ]
+        saved = append_labels(labelled_rows)
+
+        # Labelled headlines drop out of the corpus so the queue has to be rebuilt
+        get_scored_corpus.clear()
+        # Label widgets are keyed by queue position, their choices would otherwise carry over to the next queue's headlines
+        for key in [key for key in st.session_state if str(key).startswith("label_")]:
+            del st.session_state[key]
+        st.session_state.labelling_message = f"Added {saved} labelled headlines to the training dataset"
+        st.rerun()
+
+if __name__ == "__main__":
+    main()
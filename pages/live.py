@@ -0,0 +1,80 @@
+import streamlit as st
+import pandas as pd
+from LiveTracker import load_trackers, add_tracker, remove_tracker, load_series, update_tracker
+from TournamentIndex import grand_slam_tournaments
+
+
+# Configure page
+st.set_page_config(layout="wide", page_title="Live Tournament Tracking")
+
+#############################
+# LIVE TRACKING UI
+#############################
+
+def main():
+    st.title("📈 Live Tournament Tracking")
+    st.write(
+        "Media sentiment and performance for tracked players, updated through a tournament. "
+        "Run `python LiveTracker.py watch` to keep every tracked player updated in the background."
+    )
+
+    # Start tracking a new player
+    with st.expander("Track a player"):
+        with st.form("add_tracker"):
+            form_cols = st.columns(3)
+            player_name = form_cols[0].text_input("Player Name:")
+            grand_slams = {record["display_name"]: record["name"] for record in grand_slam_tournaments()}
+            if grand_slams:
+                tournament = grand_slams[form_cols[1].selectbox("Tournament:", list(grand_slams))]
+            else:
+                tournament = form_cols[1].text_input("Tournament:")
+            year = form_cols[2].number_input("Year:", min_value=2018, max_value=2100, value=2024, step=1)
+            if st.form_submit_button("Start Tracking") and player_name:
+                add_tracker(player_name, tournament, int(year))
+                st.rerun()
+
+    trackers = load_trackers()
+    if not trackers:
+        st.info("No players are being tracked yet.")
+        return
+
+    labels = {f"{config['player_name']} - {config['tournament']} {config['year']}": tracker for tracker, config in trackers.items()}
+    tracker = labels[st.selectbox("Tracked player:", list(labels))]
+    config = trackers[tracker]
+
+    action_cols = st.columns(2)
+    with action_cols[0]:
+        if st.button("Update Now"):
+            with st.spinner(f"Checking for new headlines about {config['player_name']}..."):
+                update_tracker(tracker, config)
+            st.rerun()
+    with action_cols[1]:
+        if st.button("Stop Tracking"):
+            remove_tracker(tracker)
+            st.rerun()
+
+    series = load_series(tracker)
+    if series.empty:
+        st.warning("No updates yet. Press Update Now or start the watcher.")
+        return
+
+    # Latest point as metrics, with the change since the previous update
+    latest = series.iloc[-1]
+    previous = series.iloc[-2] if len(series) > 1 else latest
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Headlines", int(latest["headlines"]), int(latest["new_headlines"]))
+    for col, (label, column) in zip(metric_cols[1:], [("Sentiment", "sentiment_score"), ("Performance", "performance_score"), ("Bias", "bias_score")]):
+        if pd.isna(latest[column]):
+            col.metric(label, "-")
+        else:
+            delta = None if pd.isna(previous[column]) else f"{latest[column] - previous[column]:+.2f}"
+            col.metric(label, f"{latest[column]:.2f}", delta)
+
+    st.markdown("#### Sentiment, Performance and Bias Over Time")
+    st.line_chart(series.set_index("timestamp")[["sentiment_score", "performance_score", "bias_score"]])
+
+    st.markdown("#### Update History")
+    st.dataframe(series.iloc[::-1], use_container_width=True)
+
+if __name__ == "__main__":
+    main()
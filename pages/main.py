@@ -1,14 +1,19 @@
 import streamlit as st
-import pandas as pd
-from WebscrapingFunc import scrape_bbc_sport, load_ignored_headlines, save_ignored_headlines
-from SentimentModel import analyse_headlines_sentiment
-from DataRetrievalFunc import load_match_data, get_player_tournament_stats, get_player_yearly_stats, calculate_tour_averages
-from BiasDetection import display_bias_analysis
+from TournamentIndex import grand_slam_tournaments
+from JobQueue import get_job_queue, DONE, CANCELLED, FINISHED_STATUSES
+from Pipeline import (AnalysisRequest, PipelineError, BASELINE_SCOPES, scrape_headlines, filter_mentions,
+                      collapse_rewordings, score_headlines, retrieve_stats, select_baseline, headline_probabilities)
+from Warmup import start_warmup
+# pandas, numpy, pyarrow and the model are imported by the step that first needs them, so the page renders
+# without waiting for them, python Warmup.py --skip-warmup reports the import time this saves
 
 
 # Configure page
 st.set_page_config(layout="wide", page_title="Tennis Analysis Dashboard")
 
+# No-op if the welcome page already started it, covers sessions that open this page directly
+start_warmup()
+
 # Initialise session state
 if 'scraped_headlines' not in st.session_state:
     st.session_state.scraped_headlines = None
@@ -16,6 +21,14 @@ if 'sentiment_results' not in st.session_state:
     st.session_state.sentiment_results = {"Positive": [], "Neutral": [], "Negative": []}
 if 'player_stats' not in st.session_state:
     st.session_state.player_stats = None
+if 'bias_results' not in st.session_state:
+    # Bias results per baseline scope, so switching scope back doesn't rerun the bootstrap
+    st.session_state.bias_results = {}
+if 'analysis_key' not in st.session_state:
+    st.session_state.analysis_key = None
+if 'jobs' not in st.session_state:
+    # IDs of the background jobs this session is waiting on, by step
+    st.session_state.jobs = {"scrape": None, "sentiment": None}
 if 'current_step' not in st.session_state:
     # 1: Inputting parameters, 2: Scraping, 3: Sentiment Analysis, 4: Stats Retrieval
     st.session_state.current_step = 1  
@@ -24,6 +37,61 @@ if 'current_step' not in st.session_state:
 # MAIN APPLICATION UI
 #############################
 
+# Seconds between status checks while a background job runs
+JOB_POLL_INTERVAL = 0.5
+
+# Background job running the pipeline's scrape stage, reporting progress per page
+def scrape_task(context, request):
+    context.report(0, f"Searching BBC Sport for {request.player_name}")
+    headlines = scrape_headlines(
+        request,
+        progress=lambda page, pages, found: context.report(page / (pages + 1), f"Scraped page {page} of {pages}, {found} headlines so far"),
+        cancelled=context.cancelled
+    )
+    context.check_cancelled()
+    return headlines
+
+# Background job running the pipeline's sentiment stage
+def sentiment_task(context, headlines_df):
+    context.report(0.1, f"Scoring {len(headlines_df)} headlines")
+    return score_headlines(headlines_df)
+
+# Progress bar for a running job, only this fragment reruns while the job runs, not the whole page
+# The page is rerun once the job has finished so the step can pick up its result
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def job_progress(step, description):
+    queue = get_job_queue()
+    job_id = st.session_state.jobs[step]
+    status = queue.status(job_id)
+    if status is None or status["status"] in FINISHED_STATUSES:
+        st.rerun()
+    st.progress(status["progress"], text=f"{description} {status['message']}")
+    if st.button("Cancel", key=f"cancel_{step}"):
+        queue.cancel(job_id)
+
+# Progress of this session's job for a step, the rest of the page waits until it finishes
+# Returns the finished job's status and result, the job keeps running on the shared workers across reruns
+def wait_for_job(step, description):
+    queue = get_job_queue()
+    job_id = st.session_state.jobs[step]
+    status = queue.status(job_id)
+    if status is not None and status["status"] not in FINISHED_STATUSES:
+        job_progress(step, description)
+        st.stop()
+    st.session_state.jobs[step] = None
+    return status, queue.result(job_id)
+
+# Save everything the analysis has produced so far, later steps overwrite the earlier save
+def save_current_analysis():
+    from AnalysisCache import save_analysis
+    key, params = st.session_state.analysis_key
+    save_analysis(key, params, {
+        "scraped_headlines": st.session_state.scraped_headlines,
+        "sentiment_results": st.session_state.sentiment_results,
+        "player_stats": st.session_state.player_stats,
+        "bias": st.session_state.bias_results,
+    })
+
 def main():
     st.title("🎾 Tennis Media & Performance Analysis")
     
@@ -56,17 +124,11 @@ def main():
         year = st.selectbox("Select Year:", list(range(2018, 2025)))
 
     with param_cols[1]:
-        # Load match data to get player list for selection
-        # This way dropdown only allows selection of players who there is data on 
-        df = load_match_data(year)
-        if not df.empty:
-            # Filter to only include Grand Slam tournaments
-            # G is the code for grand slam tournament
-            grand_slam_df = df[df['tourney_level'] == 'G']  
-        
-            # Get only players who played in Grand Slams
-            gs_players = sorted(set(grand_slam_df["winner_name"].unique()) | set(grand_slam_df["loser_name"].unique()))
-        
+        # Players who played in Grand Slams that year, so the dropdown only allows players who there is data on
+        # The list is built once per version of the year's match data and shared by every session
+        from DataRetrievalFunc import grand_slam_players
+        gs_players = grand_slam_players(year)
+        if gs_players:
             player_name = st.selectbox("Select Player:", gs_players)
         else:
             # If there is no data for player names manual entry is allowed
@@ -75,25 +137,57 @@ def main():
     
     with param_cols[2]:
         # Select specific tournament, currently limited to grand slams
-        tournament = st.selectbox("Enter Tournament Name:", ['Wimbledon','US Open', 'Australian Open', 'French Open'])
-        # Conversion to match names within stats files
-        if tournament == "French Open":
-            tournament = 'Roland Garros'
-        if tournament == "US Open":
-            tournament = 'Us Open'
+        # Options come from the tournament index, which maps display names like "French Open" to the stats files' names
+        grand_slams = {record["display_name"]: record["name"] for record in grand_slam_tournaments()}
+        if grand_slams:
+            tournament = grand_slams[st.selectbox("Enter Tournament Name:", list(grand_slams))]
+        else:
+            # Index is only empty if no match data has been ingested, same fallback as the player name
+            tournament = st.text_input("Enter Tournament Name:")
     
     with param_cols[3]:
         # Can select between 1 and 5 pages 
         max_pages = st.slider("Pages to Scrape:", 1, 5, 3)
     
+    # Headlines from earlier runs of the same analysis are kept in the headline store
+    use_stored = st.checkbox("Use stored headlines instead of scraping", value=False)
+    # Headlines the search returned that never mention the player can be left out of their sentiment
+    mentions_only = st.checkbox("Only analyse headlines that mention the player", value=False)
+    # Rewordings of the same story would otherwise each count towards the sentiment
+    collapse_clusters = st.checkbox("Count rewordings of the same story once", value=True)
+    # Analyses already run with the same parameters, model and match data are shown from the analysis cache
+    reuse_saved = st.checkbox("Reuse saved analysis when available", value=True)
+    
     # Button to start webscraping based on selected parameters
     if st.button("Start Analysis"):
+        from SentimentModel import load_model_bundle
+        from AnalysisCache import analysis_params, load_analysis
+        from WebscrapingFunc import load_ignored_headlines
         # Move to scraping step
         # All session state data is reset
         st.session_state.current_step = 2  
         st.session_state.scraped_headlines = None
         st.session_state.sentiment_results = {"Positive": [], "Neutral": [], "Negative": []}
         st.session_state.player_stats = None
+        st.session_state.bias_results = {}
+        # Jobs still running for a previous analysis are no longer needed
+        for step, job_id in st.session_state.jobs.items():
+            if job_id is not None:
+                get_job_queue().cancel(job_id)
+        st.session_state.jobs = {"scrape": None, "sentiment": None}
+        # The headline filters are part of the key, a filtered analysis is never restored for an unfiltered one
+        st.session_state.analysis_key = analysis_params(
+            player_name, tournament, year, max_pages, "stored" if use_stored else "scraped", load_model_bundle()["version"],
+            mentions_only, collapse_clusters, load_ignored_headlines()
+        )
+        saved = load_analysis(st.session_state.analysis_key[0]) if reuse_saved else None
+        if saved is not None:
+            # Every completed step is restored and the workflow resumes after the last one
+            st.session_state.scraped_headlines = saved["scraped_headlines"]
+            st.session_state.sentiment_results = saved["sentiment_results"]
+            st.session_state.player_stats = saved["player_stats"]
+            st.session_state.bias_results = saved["bias"]
+            st.session_state.current_step = 4 if saved["player_stats"] is not None else 3
         # App is rerun to purge previous processes
         st.rerun()
     
@@ -102,14 +196,38 @@ def main():
     # Web scraping section 
     if st.session_state.current_step >= 2:
         st.subheader("Headline Scraping")
+        from WebscrapingFunc import load_ignored_headlines, save_ignored_headlines
+        from AnalysisCache import with_ignored
         # Previously ignored headlines are loaded to avoid rescraping them
         ignored_headlines = load_ignored_headlines()
-        if st.session_state.scraped_headlines is None:
-            # Spinner shown while scraping occurs
-            with st.spinner(f"Scraping headlines for {player_name} at {tournament} {year}..."):
-                # Data frame of scraped results are stored in session state
-                scraped_df = scrape_bbc_sport(player_name, tournament, year, max_pages, ignored_headlines)
-                st.session_state.scraped_headlines = scraped_df
+        request = AnalysisRequest(player_name, tournament, year, max_pages, use_stored)
+        if st.session_state.scraped_headlines is None and use_stored:
+            with st.spinner(f"Loading stored headlines for {player_name} at {tournament} {year}..."):
+                try:
+                    st.session_state.scraped_headlines = scrape_headlines(request)
+                except Exception as e:
+                    st.error(f"Loading stored headlines failed: {str(e)}")
+                    # Allow returning to parameter selection
+                    st.session_state.current_step = 1
+                    return
+        elif st.session_state.scraped_headlines is None:
+            # Scraping runs as a background job, the page polls it until the headlines are ready
+            if st.session_state.jobs["scrape"] is None:
+                st.session_state.jobs["scrape"] = get_job_queue().submit(
+                    "scrape", scrape_task, request,
+                    label=f"{player_name} - {tournament} {year}"
+                )
+            status, scraped_df = wait_for_job("scrape", f"Scraping headlines for {player_name} at {tournament} {year}:")
+            if status is None or status["status"] != DONE:
+                if status is not None and status["status"] == CANCELLED:
+                    st.warning("Scraping was cancelled.")
+                else:
+                    st.error(f"Scraping failed: {status['error'] if status else 'the job was lost'}")
+                # Allow returning to parameter selection
+                st.session_state.current_step = 1
+                return
+            # Data frame of scraped results are stored in session state
+            st.session_state.scraped_headlines = scraped_df
         
         if not st.session_state.scraped_headlines.empty:
             st.success(f"Found {len(st.session_state.scraped_headlines)} relevant headlines")
@@ -128,6 +246,12 @@ def main():
                             st.markdown(f"[{headline}]({url})")
                         else:
                             st.write(headline)
+                        # Players found in the headline, and the match it is about when two of them met
+                        if row.get("Players"):
+                            mentions = f"Mentions: {', '.join(row['Players'])}"
+                            if row.get("Match Round"):
+                                mentions += f" | {row['Match Round']}, won by {row['Match Winner']}"
+                            st.caption(mentions)
                     
                     with col2:
                         if st.button(f"Ignore", key=f"ignore_{i}"):
@@ -135,6 +259,8 @@ def main():
                             # Tjere are then added to ignored headlines csv
                             ignored_headlines.add(headline)
                             save_ignored_headlines([headline])
+                            # The analysis no longer covers this headline, so it is saved under a key that says so
+                            st.session_state.analysis_key = with_ignored(st.session_state.analysis_key[1], ignored_headlines)
                             st.success(f"Marked '{headline}' as irrelevant")
                             
                             # Remove from current results and refresh the app
@@ -144,7 +270,13 @@ def main():
                             st.rerun()
             
             # Continue to sentiment analysis
+            # Filters are the ones chosen when the analysis started, the ones its cache key was made with
             if st.button("Proceed to Sentiment Analysis"):
+                filters = st.session_state.analysis_key[1]
+                if filters["mentions_only"]:
+                    st.session_state.scraped_headlines = filter_mentions(st.session_state.scraped_headlines, player_name)
+                if filters["collapse_clusters"]:
+                    st.session_state.scraped_headlines = collapse_rewordings(st.session_state.scraped_headlines)
                 st.session_state.current_step = 3
                 st.rerun()
         else:
@@ -159,11 +291,19 @@ def main():
         
         # Only run analysis if haven't already
         if all(len(results) == 0 for results in st.session_state.sentiment_results.values()):
-            with st.spinner("Analysing headline sentiment..."):
-                # Sentiment analysis function ran and session state stores the results
-                sentiment_results, updated_headlines = analyse_headlines_sentiment(st.session_state.scraped_headlines)
-                st.session_state.sentiment_results = sentiment_results
-                st.session_state.scraped_headlines = updated_headlines
+            # Scoring runs as a background job, session state stores the results
+            if st.session_state.jobs["sentiment"] is None:
+                st.session_state.jobs["sentiment"] = get_job_queue().submit(
+                    "sentiment", sentiment_task, st.session_state.scraped_headlines,
+                    label=f"{player_name} - {tournament} {year}"
+                )
+            status, result = wait_for_job("sentiment", "Analysing headline sentiment:")
+            if status is None or status["status"] != DONE:
+                st.error(f"Sentiment analysis did not complete: {status['error'] if status and status['error'] else 'the job was stopped'}")
+                st.session_state.current_step = 2
+                return
+            st.session_state.sentiment_results, st.session_state.scraped_headlines = result
+            save_current_analysis()
         
         # Display results in three columns, positive (tick), neutral (dash), negative (cross)
         sentiment_cols = st.columns(3)
@@ -206,20 +346,18 @@ def main():
     if st.session_state.current_step >= 4:
         st.markdown("---")
         st.subheader("Player Performance Statistics")
+        import pandas as pd
+        from HeadToHead import head_to_head_before
         
         # Retrieve stats if not already done
         if st.session_state.player_stats is None:
-            df = load_match_data(year)
-            if not df.empty:
-                with st.spinner(f"Retrieving statistics for {player_name} at {tournament} {year}..."):
-                    player_matches, tournament_stats = get_player_tournament_stats(df, player_name, tournament)
-                    yearly_stats = get_player_yearly_stats(df, player_name)
+            with st.spinner(f"Retrieving statistics for {player_name} at {tournament} {year}..."):
+                try:
                     # All stats are stored in session state
-                    st.session_state.player_stats = {
-                        "player_matches": player_matches,
-                        "tournament_stats": tournament_stats,
-                        "yearly_stats": yearly_stats
-                    }
+                    st.session_state.player_stats = retrieve_stats(player_name, tournament, year).as_dict()
+                    save_current_analysis()
+                except PipelineError as e:
+                    st.error(e.message)
         
         if st.session_state.player_stats is not None:
             player_matches = st.session_state.player_stats["player_matches"]
@@ -263,11 +401,23 @@ def main():
                     for i, (metric, value) in enumerate(tournament_detailed_metrics.items()):
                         metrics_grid[i % 2].metric(metric, value)
                     
+                    # Strength of the draw the player faced
+                    if "Avg Opponent Rank" in tournament_stats:
+                        st.markdown("#### Opponent Strength")
+                        opponent_metrics = {
+                            "Avg Opponent Rank": f"{tournament_stats['Avg Opponent Rank']:.0f}",
+                            "Best Win Rank": "-" if pd.isna(tournament_stats["Best Win Rank"]) else f"{tournament_stats['Best Win Rank']:.0f}",
+                            "Top 10 Wins": tournament_stats["Top 10 Wins"]
+                        }
+                        opponent_cols = st.columns(3)
+                        for i, (metric, value) in enumerate(opponent_metrics.items()):
+                            opponent_cols[i].metric(metric, value)
+                    
                     # Tournament matches dataframe
                     st.markdown("#### Tournament Matches")
                     display_columns = [
                         "Tournament", "Round", "Surface", 
-                        "Winner", "Loser", "Score"
+                        "Winner", "Loser", "Score", "H2H Before"
                     ]
                     
                     # Rename columns for better readability
@@ -279,6 +429,8 @@ def main():
                         "loser_name": "Loser",
                         "score": "Score"
                     })
+                    # Player's head to head record against each opponent going into the match
+                    tournament_matches["H2H Before"] = head_to_head_before(player_name, player_matches)
                     
                     # Display matches
                     st.dataframe(tournament_matches[display_columns], use_container_width=True)
@@ -329,20 +481,31 @@ def main():
             total_headlines = positive_count + neutral_count + negative_count
             
             if total_headlines > 0 and player_matches is not None:
+                from BiasDisplay import display_bias_analysis
                 
                 # Get tour averages for bias detection
-                tour_averages = calculate_tour_averages(df, tournament)
+                # The player can be compared against this tournament or a broader field from the precomputed baselines
+                scopes = {label: scope for scope, label in BASELINE_SCOPES.items()}
+                baseline_scope = st.radio("Compare against:", list(scopes), horizontal=True)
+                tour_averages = select_baseline(tournament, year, scopes[baseline_scope])
         
                 if tour_averages:
-                    # Display bias analysis
-                        display_bias_analysis(
+                    # Display bias analysis, saved results for this scope are shown without recomputing
+                        saved_bias = st.session_state.bias_results.get(baseline_scope)
+                        bias_results = display_bias_analysis(
                             tournament_stats,
                             tour_averages,
                             st.session_state.sentiment_results,
                             player_name,
                             tournament,
-                            year
+                            year,
+                            headline_probabilities(st.session_state.scraped_headlines),
+                            st.session_state.player_stats["match_stats"],
+                            saved_bias
                         )
+                        if saved_bias is None:
+                            st.session_state.bias_results[baseline_scope] = bias_results
+                            save_current_analysis()
                 else:
                     st.warning(f"Cannot perform bias analysis: Tour averages not available for {tournament} {year}.")
             else: